@@ -0,0 +1,229 @@
+"""
+Benchmarks de desempenho do sistema de predição
+Execute a partir da raiz do projeto:
+
+    uv run benchmark.py            # todos
+    uv run benchmark.py floresta   # apenas um
+"""
+import argparse
+import statistics
+import sys
+import time
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+warnings.filterwarnings('ignore')
+
+# Adicionar src ao path
+sys.path.append('src')
+
+
+def cronometrar(funcao, repeticoes=50):
+    """Mediana do tempo (s) de várias execuções de funcao()"""
+    funcao()  # Aquecimento
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def projetos_de_exemplo(n):
+    """n projetos no formato da API, replicados a partir do CSV de treino"""
+    df = pd.read_csv('data/Project Management Dataset.csv')
+    projetos = []
+    for _, row in df.iterrows():
+        projetos.append({
+            'project_cost': float(row[' Project Cost '].replace(',', '')),
+            'project_benefit': float(row[' Project Benefit '].replace(',', '')),
+            'start_date': pd.to_datetime(row['Start Date']).strftime('%Y-%m-%d'),
+            'end_date': pd.to_datetime(row['End Date']).strftime('%Y-%m-%d'),
+            'project_type': row['Project Type'],
+            'region': row['Region'],
+            'department': row['Department'],
+            'complexity': row['Complexity'],
+            'phase': row['Phase'],
+            'year': int(row['Year']),
+            'month': int(row['Month'])
+        })
+    return [projetos[i % len(projetos)] for i in range(n)]
+
+
+def benchmark_floresta():
+    """Floresta plana (NumPy / numba) contra o predict_proba do sklearn"""
+    from model import forest
+    from model.predict import PreditorProjetos
+
+    print("\n🌲 FLORESTA PLANA x SKLEARN")
+    print("=" * 60)
+    modelo = joblib.load('models/modelo_projetos.pkl')
+    preditor = PreditorProjetos(caminho_bundle=None)
+    X, _ = preditor.preparar_lote(projetos_de_exemplo(100_000))
+    X_lote = X + np.random.default_rng(42).normal(scale=1e-3, size=X.shape)
+    linha = X_lote[:1]
+
+    motores = {'sklearn': modelo}
+    arrays = forest.achatar_floresta(modelo)
+    motores['numpy'] = forest.FlorestaPlana(arrays, motor='numpy')
+    if forest.numba is not None:
+        motores['numba'] = forest.FlorestaPlana(arrays, motor='numba')
+    else:
+        print("   (numba não instalado: kernel compilado ignorado)")
+
+    referencia = modelo.predict_proba(X_lote)
+    print(f"   {'motor':<8} {'1 linha (ms)':>14} {'100k linhas (s)':>17} {'linhas/s':>12} {'dif. máx.':>10}")
+    for nome, motor in motores.items():
+        latencia = cronometrar(lambda: motor.predict_proba(linha), repeticoes=200)
+        inicio = time.perf_counter()
+        proba = motor.predict_proba(X_lote)
+        duracao = time.perf_counter() - inicio
+        diferenca = np.abs(proba - referencia).max()
+        print(f"   {nome:<8} {latencia * 1000:>14.3f} {duracao:>17.3f} {len(X_lote) / duracao:>12,.0f} {diferenca:>10.1e}")
+
+
+def benchmark_rotulos(n=500_000):
+    """Rotulagem com DataFrame.apply linha a linha x tabela de regras vetorizada"""
+    from model.train import definir_sucesso, rotular_sucesso
+
+    print("\n🏷️  ROTULAGEM DE SUCESSO")
+    print("=" * 60)
+    df = pd.read_csv('data/Project Management Dataset.csv')
+    data = pd.DataFrame({
+        'Status': np.resize(df['Status'].to_numpy(), n),
+        'Completion': np.resize((df['Completion%'].str.rstrip('%').astype(float) / 100).to_numpy(), n)
+    })
+
+    inicio = time.perf_counter()
+    antes = data.apply(definir_sucesso, axis=1).to_numpy()
+    duracao_apply = time.perf_counter() - inicio
+
+    duracao_vetorizado = cronometrar(lambda: rotular_sucesso(data['Status'], data['Completion']), repeticoes=5)
+    depois = rotular_sucesso(data['Status'], data['Completion'])
+
+    assert np.array_equal(antes, depois)
+    print(f"   {n:,} projetos (rótulos idênticos)")
+    print(f"   apply linha a linha: {n / duracao_apply:>14,.0f} linhas/s")
+    print(f"   np.select:           {n / duracao_vetorizado:>14,.0f} linhas/s "
+          f"({duracao_apply / duracao_vetorizado:.0f}x)")
+
+
+def benchmark_dados(repeticoes=2_000):
+    """Limpeza do CSV x leitura do cache Parquet dos dados limpos"""
+    import os
+    import tempfile
+    from model import dataset, train
+
+    print("\n📦 CACHE PARQUET DOS DADOS LIMPOS")
+    print("=" * 60)
+    if dataset.pyarrow is None:
+        print("   (pyarrow não instalado)")
+        return
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'projetos.csv')
+        df = pd.read_csv(train.CAMINHO_DADOS)
+        pd.concat([df] * repeticoes).to_csv(caminho, index=False)
+
+        inicio = time.perf_counter()
+        train.carregar_dados(caminho, diretorio_cache=pasta)
+        duracao_csv = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        train.carregar_dados(caminho, diretorio_cache=pasta)
+        duracao_cache = time.perf_counter() - inicio
+
+        cache = dataset.caminho_cache(caminho, pasta)
+        print(f"   {len(df) * repeticoes:,} linhas: CSV {os.path.getsize(caminho) / 1e6:,.1f} MB, "
+              f"Parquet {os.path.getsize(cache) / 1e6:,.1f} MB")
+    print(f"   limpeza do CSV:  {duracao_csv:.2f} s")
+    print(f"   cache Parquet:   {duracao_cache:.2f} s (inclui hash do CSV, {duracao_csv / duracao_cache:.0f}x)")
+
+
+def benchmark_threshold(n=2_000_000):
+    """Cinco thresholds com o sklearn x curva completa em uma ordenação"""
+    from sklearn.metrics import f1_score, precision_score, recall_score
+    from model.threshold import curva_threshold, escolher_threshold
+
+    print("\n🎯 OTIMIZAÇÃO DE THRESHOLD")
+    print("=" * 60)
+    rng = np.random.default_rng(42)
+    y = rng.integers(0, 2, size=n)
+    proba = np.clip(0.3 * y + rng.random(n) * 0.7, 0, 1)
+
+    inicio = time.perf_counter()
+    for threshold in [0.3, 0.4, 0.5, 0.6, 0.7]:
+        y_pred = (proba >= threshold).astype(int)
+        f1_score(y, y_pred), precision_score(y, y_pred), recall_score(y, y_pred)
+    duracao_sklearn = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    curva = curva_threshold(y, proba)
+    escolher_threshold(curva)
+    duracao_curva = time.perf_counter() - inicio
+
+    print(f"   {n:,} projetos")
+    print(f"   sklearn, 5 thresholds:          {duracao_sklearn:6.2f} s")
+    print(f"   curva, {len(curva['threshold']):,} thresholds: {duracao_curva:6.2f} s")
+
+
+def benchmark_respostas(n=1_000):
+    """Resposta do /predict-batch: caminho padrão do FastAPI x orjson/msgpack e modo compacto"""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from model.predict import PreditorProjetos
+    from api import respostas
+
+    print("\n📨 CODIFICAÇÃO DAS RESPOSTAS")
+    print("=" * 60)
+    resultados = PreditorProjetos().prever_lote(projetos_de_exemplo(n))
+    for i, resultado in enumerate(resultados):
+        resultado['projeto_id'] = i
+    completo = {'total_projetos': n, 'processados_com_sucesso': n,
+                'resultados': [respostas.detalhar(r) for r in resultados]}
+
+    def compacto():
+        return {'total_projetos': n, 'processados_com_sucesso': n,
+                'resultados': [respostas.compactar(r) for r in resultados]}
+
+    casos = {'FastAPI (jsonable_encoder + json)': lambda: JSONResponse(jsonable_encoder(completo)).body}
+    if respostas.orjson is not None:
+        casos['orjson'] = lambda: respostas.orjson.dumps(completo)
+        casos['orjson, compacto'] = lambda: respostas.orjson.dumps(compacto())
+    else:
+        print("   ⏭️  orjson não instalado")
+    casos['json, compacto'] = lambda: respostas.json.dumps(compacto(), ensure_ascii=False).encode('utf-8')
+    if respostas.msgpack is not None:
+        casos['msgpack'] = lambda: respostas.msgpack.packb(completo)
+        casos['msgpack, compacto'] = lambda: respostas.msgpack.packb(compacto())
+    else:
+        print("   ⏭️  msgpack não instalado")
+
+    print(f"   {n:,} resultados")
+    base = None
+    for nome, funcao in casos.items():
+        duracao = cronometrar(funcao, repeticoes=20)
+        tamanho = len(funcao())
+        base = base or (duracao, tamanho)
+        print(f"   {nome:34s} {duracao * 1000:7.2f} ms ({base[0] / duracao:5.1f}x)  "
+              f"{tamanho / 1024:8.1f} KiB ({tamanho / base[1]:.0%})")
+
+
+BENCHMARKS = {
+    'floresta': benchmark_floresta,
+    'rotulos': benchmark_rotulos,
+    'dados': benchmark_dados,
+    'threshold': benchmark_threshold,
+    'respostas': benchmark_respostas,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de desempenho")
+    parser.add_argument('nomes', nargs='*', choices=[[]] + list(BENCHMARKS),
+                        help="Benchmarks a executar (padrão: todos)")
+    args = parser.parse_args()
+
+    for nome in args.nomes or BENCHMARKS:
+        BENCHMARKS[nome]()
@@ -1,12 +1,27 @@
+import sys
 import pandas as pd
 
+# Adicionar src ao path
+sys.path.append('src')
+
+from model.dataset import caminho_cache, pyarrow, salvar_dados_limpos
+from model.train import CAMINHO_DADOS, preparar_dados, tipar_dados_limpos
+
 # Carregar dados originais
-df_original = pd.read_csv('data/Project Management Dataset.csv')
+df_original = pd.read_csv(CAMINHO_DADOS)
 
 # Salvar como projetos.csv (simulando que está na pasta data/)
 df_original.to_csv('data/projetos.csv', index=False)
 print("✅ Arquivo data/projetos.csv criado!")
 
+# Dados limpos no mesmo formato colunar do cache do treino
+if pyarrow is not None:
+    cache = caminho_cache(CAMINHO_DADOS)
+    salvar_dados_limpos(tipar_dados_limpos(preparar_dados(df_original)), cache)
+    print(f"✅ Arquivo {cache} criado!")
+else:
+    print("ℹ️  pyarrow não instalado: dados limpos em Parquet não gerados")
+
 # Criar base de usuários exemplo
 usuarios_data = {
     'Usuario_ID': [1, 2, 3, 4, 5],
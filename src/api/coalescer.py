@@ -0,0 +1,117 @@
+"""
+Agrupamento de requisições de predição (micro-batching)
+
+Requisições /predict que chegam dentro de uma janela curta são pontuadas
+juntas com uma única chamada a PreditorProjetos.prever_lote, e cada
+resultado é devolvido à requisição que o aguarda. Cada requisição traz o
+preditor que ela tomou no início: se uma recarga acontecer no meio da
+janela, o lote é dividido e cada parte é pontuada pelo seu preditor.
+"""
+import asyncio
+from collections import Counter
+
+
+class AgrupadorPredicoes:
+    """Agrupa predições individuais em lotes para o modelo"""
+
+    def __init__(self, espera_maxima_ms=2.0, tamanho_maximo=64, executar=None):
+        """
+        Args:
+            espera_maxima_ms (float): Tempo máximo que uma requisição espera pelo lote
+            tamanho_maximo (int): Número de projetos que dispara o lote imediatamente
+            executar (callable): Corrotina executar(funcao, *args) que roda o lote
+                fora do event loop (ex.: ExecutorPredicoes.executar)
+        """
+        self.executar = executar
+        self.espera_maxima = espera_maxima_ms / 1000
+        self.tamanho_maximo = tamanho_maximo
+        self._pendentes = []
+        self._temporizador = None
+        # O event loop guarda as tasks só por referência fraca: os lotes em
+        # execução ficam aqui até terminar, senão podem ser coletados no meio
+        self._lotes_em_execucao = set()
+
+        # Métricas
+        self.lotes_processados = 0
+        self.projetos_processados = 0
+        self.tamanhos_lote = Counter()
+
+    async def prever(self, dados_projeto, preditor):
+        """
+        Enfileira um projeto e aguarda o resultado do lote em que ele entrar
+
+        Args:
+            dados_projeto (dict): Dados do projeto
+            preditor (PreditorProjetos): Preditor que deve pontuar este projeto
+
+        Raises:
+            ValueError: Se o projeto não puder ser pontuado
+        """
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._pendentes.append((dados_projeto, preditor, futuro))
+
+        if len(self._pendentes) >= self.tamanho_maximo:
+            self._disparar()
+        elif self._temporizador is None:
+            self._temporizador = loop.call_later(self.espera_maxima, self._disparar)
+
+        return await futuro
+
+    def _disparar(self):
+        """Fecha o lote atual e agenda sua execução"""
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+
+        lote, self._pendentes = self._pendentes, []
+        if lote:
+            tarefa = asyncio.ensure_future(self._executar(lote))
+            self._lotes_em_execucao.add(tarefa)
+            tarefa.add_done_callback(self._lotes_em_execucao.discard)
+
+    async def _executar(self, lote):
+        """Pontua o lote (uma chamada por preditor) e distribui os resultados para quem aguarda"""
+        grupos = {}
+        for dados, preditor, futuro in lote:
+            grupos.setdefault(id(preditor), (preditor, []))[1].append((dados, futuro))
+        await asyncio.gather(*(self._executar_grupo(preditor, itens) for preditor, itens in grupos.values()))
+
+    async def _executar_grupo(self, preditor, itens):
+        """Pontua os projetos de um mesmo preditor com uma chamada a prever_lote"""
+        self.lotes_processados += 1
+        self.projetos_processados += len(itens)
+        self.tamanhos_lote[len(itens)] += 1
+
+        dados_lote = [dados for dados, _ in itens]
+        try:
+            if self.executar is not None:
+                resultados = await self.executar(preditor.prever_lote, dados_lote)
+            else:
+                resultados = preditor.prever_lote(dados_lote)
+        except Exception as e:
+            for _, futuro in itens:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+
+        for (_, futuro), resultado in zip(itens, resultados):
+            if futuro.done():  # Requisição cancelada pelo cliente
+                continue
+            if 'erro' in resultado:
+                futuro.set_exception(ValueError(resultado['erro']))
+            else:
+                futuro.set_result(resultado)
+
+    def metricas(self):
+        """Retorna as métricas de tamanho dos lotes realizados"""
+        return {
+            'espera_maxima_ms': self.espera_maxima * 1000,
+            'tamanho_maximo': self.tamanho_maximo,
+            'lotes_processados': self.lotes_processados,
+            'projetos_processados': self.projetos_processados,
+            'tamanho_medio_lote': (self.projetos_processados / self.lotes_processados
+                                   if self.lotes_processados else 0.0),
+            'maior_lote': max(self.tamanhos_lote, default=0),
+            'distribuicao_tamanhos': {str(k): v for k, v in sorted(self.tamanhos_lote.items())}
+        }
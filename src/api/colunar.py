@@ -0,0 +1,156 @@
+"""
+Entrada e saída colunar (Arrow IPC / Parquet) para o /predict-arrow
+
+A tabela recebida é convertida coluna a coluna para arrays NumPy (as
+categóricas mantêm o dictionary encoding do Arrow: índices + valores
+distintos), validada por validar_colunas e pontuada pelo caminho vetorizado
+do preditor. Os resultados voltam como um record batch Arrow. Em nenhum
+ponto um projeto vira um objeto Python.
+"""
+import json
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # Endpoint colunar é opcional
+    pa = None
+
+from .validacao import CAMPOS_CATEGORICOS, CAMPOS_OBRIGATORIOS, DESCRICAO_ERROS
+
+
+MIDIA_ARROW = 'application/vnd.apache.arrow.stream'
+MIDIA_PARQUET = 'application/vnd.apache.parquet'
+
+FORMATOS_COLUNARES = ('arrow', 'parquet')
+
+# Colunas do record batch de resposta (além de projeto_id e erros)
+COLUNAS_RESULTADO = ('sucesso', 'probabilidade_sucesso', 'probabilidade_fracasso', 'confianca', 'roi_esperado')
+
+
+def formato_colunar(content_type):
+    """Formato do upload pelo Content-Type ('arrow', 'parquet' ou None)"""
+    tipo = (content_type or '').split(';')[0].strip().lower()
+    if tipo in (MIDIA_ARROW, 'application/vnd.apache.arrow.file', 'application/x-arrow'):
+        return 'arrow'
+    if tipo in (MIDIA_PARQUET, 'application/x-parquet'):
+        return 'parquet'
+    return None
+
+
+def ler_tabela(corpo, formato):
+    """
+    Lê o corpo da requisição como tabela Arrow
+
+    Raises:
+        ValueError: Se o corpo não for um stream/arquivo Arrow ou Parquet válido
+    """
+    buffer = pa.py_buffer(corpo)
+    try:
+        if formato == 'parquet':
+            return pq.read_table(pa.BufferReader(buffer))
+        try:
+            return pa.ipc.open_stream(buffer).read_all()
+        except pa.ArrowInvalid:
+            # Formato de arquivo do Arrow (Feather v2) em vez de stream
+            return pa.ipc.open_file(buffer).read_all()
+    except pa.ArrowInvalid as e:
+        raise ValueError(f"Corpo não é {formato} válido: {e}")
+
+
+def _numerica(tabela, campo):
+    """Coluna como float64 (nulos viram NaN; ausente: toda NaN)"""
+    if campo not in tabela.column_names:
+        return np.full(tabela.num_rows, np.nan)
+    try:
+        coluna = pc.cast(tabela.column(campo), pa.float64())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        raise ValueError(f"Coluna {campo} deve ser numérica (tipo recebido: {tabela.schema.field(campo).type})")
+    return coluna.to_numpy()
+
+
+def _data(tabela, campo):
+    """Coluna de datas (string ISO, date ou timestamp) como datetime64[s]; inválidas viram NaT"""
+    coluna = tabela.column(campo)
+    if pa.types.is_dictionary(coluna.type):
+        coluna = pc.cast(coluna, pa.string())
+    if pa.types.is_string(coluna.type) or pa.types.is_large_string(coluna.type):
+        coluna = pc.strptime(coluna, format='%Y-%m-%d', unit='s', error_is_null=True)
+    try:
+        coluna = pc.cast(coluna, pa.timestamp('s'))
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        raise ValueError(f"Coluna {campo} deve ser data ou texto YYYY-MM-DD (tipo recebido: {coluna.type})")
+    return coluna.to_numpy().astype('datetime64[s]')
+
+
+def _categorica(tabela, campo):
+    """Coluna categórica como (índices, valores distintos); nulo vira índice -1"""
+    coluna = tabela.column(campo)
+    if not (pa.types.is_string(coluna.type) or pa.types.is_large_string(coluna.type)):
+        try:
+            coluna = pc.cast(coluna, pa.string())
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            raise ValueError(f"Coluna {campo} deve ser texto (tipo recebido: {coluna.type})")
+    codificada = coluna.combine_chunks().dictionary_encode()
+    indices = codificada.indices.fill_null(-1).to_numpy().astype(np.int64)
+    return indices, codificada.dictionary.to_pylist()
+
+
+def colunas_da_tabela(tabela):
+    """
+    Converte a tabela para o formato colunar de validar_colunas
+
+    Raises:
+        ValueError: Se faltar uma coluna obrigatória ou o tipo não for convertível
+    """
+    faltando = [campo for campo in CAMPOS_OBRIGATORIOS if campo not in tabela.column_names]
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(faltando)}")
+
+    colunas = {campo: _numerica(tabela, campo) for campo in ('project_cost', 'project_benefit', 'year', 'month')}
+    completion = _numerica(tabela, 'completion')
+    colunas['completion'] = np.where(np.isnan(completion), 0.0, completion)
+    for campo in ('start_date', 'end_date'):
+        colunas[campo] = _data(tabela, campo)
+    for campo in CAMPOS_CATEGORICOS:
+        colunas[campo] = _categorica(tabela, campo)
+    return colunas
+
+
+def serializar_resultados(erros, validos, previsoes, metadados):
+    """
+    Record batch Arrow (stream IPC) com um resultado por projeto
+
+    Args:
+        erros (np.ndarray): Bitmap de erros por projeto (0 = válido)
+        validos (np.ndarray): Máscara dos projetos pontuados
+        previsoes (dict): Saída de prever_colunas para as linhas válidas
+            (None se nenhuma for válida)
+        metadados (dict): Gravados no schema (versão do modelo, threshold...)
+
+    Returns:
+        bytes: Stream IPC com um único record batch; projetos inválidos têm
+            os campos de resultado nulos
+    """
+    n = len(erros)
+    invalidos = ~validos
+    colunas = {
+        'projeto_id': pa.array(np.arange(n, dtype=np.int64)),
+        'erros': pa.array(erros)
+    }
+    for campo in COLUNAS_RESULTADO:
+        valores = np.zeros(n, dtype=bool if campo == 'sucesso' else np.float64)
+        if previsoes is not None:
+            valores[validos] = previsoes[campo]
+        colunas[campo] = pa.array(valores, mask=invalidos)
+
+    metadados = {**metadados, 'erros': json.dumps({str(bit): texto for bit, texto in DESCRICAO_ERROS.items()},
+                                                  ensure_ascii=False)}
+    lote = pa.RecordBatch.from_pydict(colunas).replace_schema_metadata(
+        {chave: str(valor) for chave, valor in metadados.items()})
+
+    saida = pa.BufferOutputStream()
+    with pa.ipc.new_stream(saida, lote.schema) as escritor:
+        escritor.write_batch(lote)
+    return saida.getvalue().to_pybytes()
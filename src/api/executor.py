@@ -0,0 +1,100 @@
+"""
+Execução das predições fora do event loop
+
+O cálculo do modelo é síncrono e pesado; rodá-lo direto nos endpoints
+async bloqueia o worker inteiro (inclusive /health). Aqui ele vai para um
+pool de threads limitado, com um teto de tarefas pendentes para aplicar
+backpressure quando o serviço está saturado. Quem pode esperar (uploads em
+andamento) aguarda uma vaga até um prazo; os demais são recusados na hora.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FilaCheia(Exception):
+    """Levantada quando há predições demais aguardando execução"""
+
+
+class ExecutorPredicoes:
+    """Pool de threads com limite de profundidade de fila para as predições"""
+
+    def __init__(self, max_workers=None, fila_maxima=64):
+        """
+        Args:
+            max_workers (int): Threads dedicadas ao modelo (padrão: min(4, núcleos))
+            fila_maxima (int): Máximo de tarefas em execução ou aguardando
+        """
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.fila_maxima = fila_maxima
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='predicao')
+        # Só é alterado no event loop, não precisa de lock
+        self._pendentes = 0
+        # Sinaliza vaga na fila para quem espera (criada dentro do event loop)
+        self._vaga = None
+        self._aguardando = 0
+
+        # Métricas
+        self.executadas = 0
+        self.rejeitadas = 0
+
+    async def executar(self, funcao, *args, espera=None):
+        """
+        Executa funcao(*args) no pool e aguarda o resultado
+
+        Args:
+            espera (float): Segundos que a tarefa pode aguardar uma vaga com a
+                fila cheia (None: recusada na hora)
+
+        Raises:
+            FilaCheia: Se a fila estiver cheia (e continuar cheia por espera segundos)
+        """
+        if self._pendentes >= self.fila_maxima and espera:
+            await self._aguardar_vaga(espera)
+        if self._pendentes >= self.fila_maxima:
+            self.rejeitadas += 1
+            raise FilaCheia(f"Fila de predições cheia ({self.fila_maxima} tarefas pendentes)")
+
+        self._pendentes += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, funcao, *args)
+        finally:
+            self._pendentes -= 1
+            self.executadas += 1
+            if self._aguardando:
+                async with self._vaga:
+                    self._vaga.notify()
+
+    async def _aguardar_vaga(self, espera):
+        """Aguarda até espera segundos por uma vaga na fila (sem erro se o prazo vencer)"""
+        if self._vaga is None:
+            self._vaga = asyncio.Condition()
+        self._aguardando += 1
+        try:
+            async with self._vaga:
+                await asyncio.wait_for(self._vaga.wait_for(lambda: self._pendentes < self.fila_maxima), espera)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._aguardando -= 1
+
+    def cheio(self):
+        """Se uma nova tarefa seria recusada agora"""
+        return self._pendentes >= self.fila_maxima
+
+    def metricas(self):
+        """Retorna o estado atual do pool"""
+        return {
+            'workers': self.max_workers,
+            'fila_maxima': self.fila_maxima,
+            'pendentes': self._pendentes,
+            'aguardando_vaga': self._aguardando,
+            'executadas': self.executadas,
+            'rejeitadas': self.rejeitadas
+        }
+
+    def encerrar(self):
+        """Encerra o pool aguardando as tarefas em andamento"""
+        self._executor.shutdown(wait=True)
@@ -1,18 +1,33 @@
 """
 API para servir o modelo de predição de projetos
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.requests import ClientDisconnect
 from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional, List
+import asyncio
+import numpy as np
 import sys
 import os
 
 # Adicionar o diretório src ao path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from model.predict import PreditorProjetos
+from model.cache import CachePredicoes
+from model.predict import CAMINHO_BUNDLE, PreditorProjetos
+from model.recomendacoes import CATALOGO_RECOMENDACOES, mensagens
+from api.coalescer import AgrupadorPredicoes
+from api.colunar import FORMATOS_COLUNARES, MIDIA_ARROW, colunas_da_tabela, formato_colunar, ler_tabela, pa, \
+    serializar_resultados
+from api.executor import ExecutorPredicoes, FilaCheia
+from api.reload import RecarregadorModelo
+from api.respostas import MIDIA_MSGPACK, codificar, compactar, detalhar, responder
+from api.streaming import FORMATOS_STREAM, CorpoMonitorado, LinhaInvalida, RespostaContinua, formato_do_conteudo, \
+    ler_blocos
+from api.validacao import DESCRICAO_ERROS, ERRO_CATEGORIA, categorias_desconhecidas, colunas_dos_registros, \
+    descrever_erros, filtrar, validar_colunas
 
 # Criar instância da aplicação
 app = FastAPI(
@@ -30,14 +45,77 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Cache de resultados compartilhado pelos preditores (CACHE_TAMANHO=0 desativa)
+cache = None
+if int(os.getenv('CACHE_TAMANHO', '1024')) > 0:
+    cache = CachePredicoes(
+        tamanho_maximo=int(os.getenv('CACHE_TAMANHO', '1024')),
+        ttl_segundos=float(os.getenv('CACHE_TTL_SEGUNDOS', '300'))
+    )
+
+
+def criar_preditor():
+    """Cria o preditor com a configuração do ambiente"""
+    # MODELO_COMPARTILHADO=1: floresta mapeada em memória e compartilhada entre workers
+    return PreditorProjetos(
+        compartilhado=os.getenv('MODELO_COMPARTILHADO', '0') == '1',
+        cache=cache,
+        verificar_bundle=os.getenv('BUNDLE_VERIFICAR_HASH', '0') == '1'
+    )
+
+
+def trocar_preditor(novo):
+    """Torna novo o preditor ativo; requisições em andamento seguem com o anterior"""
+    global preditor
+    preditor = novo
+    # A chave do cache inclui a versão do modelo; limpar só libera a memória
+    if cache is not None:
+        cache.limpar()
+
+
 # Carregar o modelo na inicialização
 try:
-    preditor = PreditorProjetos()
+    preditor = criar_preditor()
     print("✅ Modelo carregado com sucesso!")
 except Exception as e:
     print(f"❌ Erro ao carregar modelo: {e}")
     preditor = None
 
+# Recarga do modelo sem reinício: POST /admin/reload ou observação dos arquivos
+# (MODELO_OBSERVAR_SEGUNDOS > 0 verifica os artefatos nesse intervalo)
+recarregador = RecarregadorModelo(
+    criar_preditor,
+    trocar_preditor,
+    [CAMINHO_BUNDLE, 'models/modelo_projetos.pkl', 'models/scaler.pkl',
+     'models/label_encoders.pkl', 'models/feature_names.pkl', 'models/threshold.pkl']
+)
+if float(os.getenv('MODELO_OBSERVAR_SEGUNDOS', '0')) > 0:
+    recarregador.iniciar_observador(float(os.getenv('MODELO_OBSERVAR_SEGUNDOS')))
+
+# Pool limitado que roda o modelo fora do event loop
+executor = ExecutorPredicoes(
+    max_workers=int(os.getenv('PREDICAO_WORKERS', '0')) or None,
+    fila_maxima=int(os.getenv('PREDICAO_FILA_MAX', '64'))
+)
+
+# Agrupamento opcional de requisições /predict em lotes (micro-batching)
+# PREDICAO_AGRUPAR=1 ativa; janela e tamanho máximo configuráveis
+agrupador = None
+if os.getenv('PREDICAO_AGRUPAR', '0') == '1':
+    agrupador = AgrupadorPredicoes(
+        espera_maxima_ms=float(os.getenv('PREDICAO_AGRUPAR_ESPERA_MS', '2')),
+        tamanho_maximo=int(os.getenv('PREDICAO_AGRUPAR_MAX_LOTE', '64')),
+        executar=executor.executar
+    )
+    print(f"✅ Agrupamento de predições ativo (janela {agrupador.espera_maxima * 1000:g} ms, "
+          f"até {agrupador.tamanho_maximo} projetos)")
+
+
+# Projetos pontuados por vez no /predict-stream
+TAMANHO_BLOCO_STREAM = int(os.getenv('STREAM_TAMANHO_BLOCO', '500'))
+# Segundos que um bloco do stream espera vaga na fila antes de o upload ser interrompido
+ESPERA_FILA_STREAM = float(os.getenv('STREAM_ESPERA_FILA_SEGUNDOS', '30'))
+
 
 # Modelos Pydantic para validação
 class ProjetoDados(BaseModel):
@@ -83,22 +161,38 @@ class ResultadoPredicao(BaseModel):
     timestamp: str
 
 
+# Campos de ResultadoPredicao vindos do preditor (o timestamp é da API)
+CAMPOS_RESULTADO = [campo for campo in ResultadoPredicao.model_fields if campo != 'timestamp']
+
+
 class StatusResposta(BaseModel):
     """Model de resposta de status"""
     status: str
     modelo_carregado: bool
     versao: str
+    versao_modelo: Optional[str] = None
     timestamp: str
 
 
+def servico_saturado(erro):
+    """Resposta 503 com backpressure quando a fila de predições está cheia"""
+    return HTTPException(
+        status_code=503,
+        detail=f"Serviço sobrecarregado: {erro}. Tente novamente em instantes.",
+        headers={"Retry-After": "1"}
+    )
+
+
 # Endpoints
 @app.get("/", response_model=StatusResposta)
 async def root():
     """Endpoint raiz - verifica o status da API"""
+    atual = preditor
     return StatusResposta(
         status="online",
-        modelo_carregado=preditor is not None,
+        modelo_carregado=atual is not None,
         versao="1.0.0",
+        versao_modelo=atual.versao_modelo if atual is not None else None,
         timestamp=datetime.now().isoformat()
     )
 
@@ -106,29 +200,58 @@ async def root():
 @app.get("/health", response_model=StatusResposta)
 async def health_check():
     """Verifica a saúde da API e do modelo"""
-    if preditor is None:
+    atual = preditor
+    if atual is None:
         raise HTTPException(status_code=503, detail="Modelo não está carregado")
     
     return StatusResposta(
         status="healthy",
         modelo_carregado=True,
         versao="1.0.0",
+        versao_modelo=atual.versao_modelo,
         timestamp=datetime.now().isoformat()
     )
 
 
-@app.post("/predict", response_model=ResultadoPredicao)
-async def predict_project(projeto: ProjetoDados):
+@app.post("/admin/reload")
+async def reload_model(x_admin_token: Optional[str] = Header(None)):
+    """
+    Recarrega o modelo do disco sem derrubar a API
+
+    O novo modelo é carregado e aquecido em segundo plano e só então
+    substitui o atual. Se ADMIN_TOKEN estiver definido, o header
+    X-Admin-Token precisa conferir.
+    """
+    token = os.getenv('ADMIN_TOKEN')
+    if token and x_admin_token != token:
+        raise HTTPException(status_code=403, detail="Token de administração inválido")
+
+    try:
+        return await asyncio.to_thread(recarregador.recarregar)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Falha ao recarregar modelo: {str(e)}")
+
+
+# A resposta já sai codificada (responder), então o schema é só documentação
+@app.post("/predict", responses={200: {
+    "model": ResultadoPredicao,
+    "description": "Predição em JSON ou, com Accept: application/msgpack, em MessagePack "
+                   "(com compacto=true: só sucesso, probabilidade_sucesso, roi_esperado e códigos)",
+    "content": {MIDIA_MSGPACK: {}}}})
+async def predict_project(projeto: ProjetoDados, compacto: bool = False, accept: Optional[str] = Header(None)):
     """
     Faz a predição de sucesso para um projeto
     
     Args:
         projeto: Dados do projeto para análise
+        compacto: Só sucesso, probabilidade, ROI e códigos das recomendações
+        accept: application/msgpack (se instalado) ou JSON
         
     Returns:
         ResultadoPredicao: Predição com probabilidades e recomendações
     """
-    if preditor is None:
+    atual = preditor  # Mantido até o fim da requisição, mesmo após uma recarga
+    if atual is None:
         raise HTTPException(status_code=503, detail="Modelo não está disponível")
     
     try:
@@ -145,27 +268,57 @@ async def predict_project(projeto: ProjetoDados):
         # Preparar dados para o modelo
         dados_modelo = projeto.model_dump()
         
+        # Categorias que o modelo não conhece são recusadas, como no /predict-batch
+        desconhecidas = categorias_desconhecidas(dados_modelo, atual.categorias_conhecidas())
+        if desconhecidas:
+            valores = ', '.join(f"{campo}={valor!r}" for campo, valor in desconhecidas.items())
+            raise ValueError(f"{DESCRICAO_ERROS[ERRO_CATEGORIA]}: {valores}")
+        
         # Adicionar ano e mês se não fornecidos
         if dados_modelo['year'] is None:
             dados_modelo['year'] = start.year
         if dados_modelo['month'] is None:
             dados_modelo['month'] = start.month
         
-        # Fazer predição
-        resultado = preditor.prever(dados_modelo)
+        # Fazer predição (agrupada com outras requisições, se ativo)
+        if agrupador is not None:
+            resultado = await agrupador.prever(dados_modelo, atual)
+        else:
+            resultado = await executor.executar(atual.prever, dados_modelo)
         
-        # Retornar resultado formatado
-        return ResultadoPredicao(
-            **resultado,
-            timestamp=datetime.now().isoformat()
-        )
+        # Retornar resultado formatado (já codificado no formato do Accept)
+        if compacto:
+            return responder(compactar(resultado), accept)
+        resposta = {campo: resultado[campo] for campo in CAMPOS_RESULTADO}
+        resposta['recomendacoes'] = mensagens(resultado['recomendacoes'])
+        resposta['timestamp'] = datetime.now().isoformat()
+        return responder(resposta, accept)
         
+    except FilaCheia as e:
+        raise servico_saturado(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Erro nos dados: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro na predição: {str(e)}")
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Retorna métricas de serviço (fila de predições, lotes agrupados e recargas)"""
+    return {
+        'executor': executor.metricas(),
+        'recargas_modelo': recarregador.estado(),
+        'cache': cache.metricas() if cache is not None else None,
+        'agrupador': agrupador.metricas() if agrupador is not None else None
+    }
+
+
+@app.get("/recomendacoes")
+async def get_recomendacoes():
+    """Retorna o catálogo de recomendações (código -> texto) usado no modo compacto"""
+    return {"recomendacoes": CATALOGO_RECOMENDACOES}
+
+
 @app.get("/project-types")
 async def get_project_types():
     """Retorna os tipos de projeto válidos"""
@@ -223,34 +376,215 @@ async def get_phases():
 
 # Exemplo de uso da API em lote
 class LoteProjetosRequest(BaseModel):
-    """Modelo para requisição em lote"""
+    """Modelo para requisição em lote (documentação; a validação é colunar)"""
     projetos: List[ProjetoDados]
 
 
-@app.post("/predict-batch")
-async def predict_batch(lote: LoteProjetosRequest):
-    """Faz predições para múltiplos projetos"""
-    if preditor is None:
+def _pontuar_registros(atual, registros):
+    """
+    Valida os projetos por coluna e pontua os válidos com uma chamada ao modelo
+
+    Returns:
+        list: Um resultado por projeto; os inválidos trazem 'erro' e o
+            'bitmap_erros' de validar_colunas
+    """
+    colunas, erros = colunas_dos_registros(registros)
+    erros_colunas, colunas = validar_colunas(colunas, atual.categorias_conhecidas())
+    erros |= erros_colunas
+    validos = erros == 0
+
+    resultados = [None] * len(registros)
+    indices = np.flatnonzero(validos)
+    if len(indices):
+        pontuados = atual.prever_lote([registros[i] for i in indices], filtrar(colunas, validos))
+        for i, resultado in zip(indices, pontuados):
+            resultados[i] = resultado
+    for i in np.flatnonzero(~validos):
+        resultados[i] = {'erro': f"Erro nos dados: {'; '.join(descrever_erros(erros[i]))}",
+                         'bitmap_erros': int(erros[i])}
+    return resultados
+
+
+# Schema do corpo só para a documentação (ProjetoDados já está nos components pelo /predict)
+_SCHEMA_LOTE = LoteProjetosRequest.model_json_schema(ref_template="#/components/schemas/{model}")
+_SCHEMA_LOTE.pop('$defs', None)
+
+
+@app.post("/predict-batch", openapi_extra={
+    "requestBody": {"required": True, "content": {"application/json": {"schema": _SCHEMA_LOTE}}}})
+async def predict_batch(request: Request, compacto: bool = False, accept: Optional[str] = Header(None)):
+    """
+    Faz predições para múltiplos projetos
+
+    O lote é validado coluna a coluna (validar_colunas), não projeto a
+    projeto: um projeto inválido recebe 'erro' e 'bitmap_erros' no próprio
+    resultado, sem rejeitar o lote inteiro. Com compacto=true cada resultado
+    traz só sucesso, probabilidade, ROI e códigos das recomendações; o
+    header Accept escolhe JSON ou MessagePack.
+    """
+    atual = preditor  # Mantido até o fim da requisição, mesmo após uma recarga
+    if atual is None:
         raise HTTPException(status_code=503, detail="Modelo não está disponível")
+
+    try:
+        projetos = (await request.json())['projetos']
+        if not isinstance(projetos, list):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=422, detail="Envie um objeto JSON com a lista 'projetos'")
+
+    # Validação e uma única chamada ao modelo para o lote inteiro
+    try:
+        resultados = await executor.executar(_pontuar_registros, atual, projetos)
+    except FilaCheia as e:
+        raise servico_saturado(e)
+
+    for i, resultado in enumerate(resultados):
+        resultado['projeto_id'] = i
+    processados = len([r for r in resultados if 'erro' not in r])
+    if compacto:
+        resultados = [compactar(resultado) for resultado in resultados]
+    else:
+        resultados = [detalhar(resultado) for resultado in resultados]
     
-    resultados = []
-    for i, projeto in enumerate(lote.projetos):
-        try:
-            dados_modelo = projeto.model_dump()
-            resultado = preditor.prever(dados_modelo)
-            resultado['projeto_id'] = i
-            resultados.append(resultado)
-        except Exception as e:
-            resultados.append({
-                'projeto_id': i,
-                'erro': str(e)
-            })
-    
-    return {
-        'total_projetos': len(lote.projetos),
-        'processados_com_sucesso': len([r for r in resultados if 'erro' not in r]),
+    return responder({
+        'total_projetos': len(projetos),
+        'processados_com_sucesso': processados,
         'resultados': resultados
-    }
+    }, accept)
+
+
+async def _pontuar_bloco(atual, bloco):
+    """Resultados de um bloco do stream (linhas ilegíveis viram 'erro')"""
+    resultados = [None] * len(bloco)
+    registros, posicoes = [], []
+    for i, item in enumerate(bloco):
+        if isinstance(item, LinhaInvalida):
+            resultados[i] = {'erro': item.mensagem}
+        else:
+            registros.append(item)
+            posicoes.append(i)
+
+    if registros:
+        # Upload em andamento: espera vaga na fila por um tempo antes de desistir
+        pontuados = await executor.executar(_pontuar_registros, atual, registros, espera=ESPERA_FILA_STREAM)
+        for i, resultado in zip(posicoes, pontuados):
+            resultados[i] = resultado
+    return resultados
+
+
+async def _resultados_stream(atual, blocos, corpo):
+    """
+    Valida, pontua e serializa um bloco por vez; a última linha traz o resumo
+
+    Se a fila continuar cheia por STREAM_ESPERA_FILA_SEGUNDOS, a última linha
+    traz o erro no lugar do resumo. Se o cliente desconectar, o restante do
+    upload não é lido nem pontuado.
+    """
+    total = processados = 0
+    try:
+        async for bloco in blocos:
+            if await corpo.desconectado():
+                return
+            try:
+                resultados = await _pontuar_bloco(atual, bloco)
+            except FilaCheia as e:
+                erro = f"Serviço sobrecarregado: {e}. Upload interrompido após {total} projetos."
+                yield codificar({'erro': erro}) + b'\n'
+                return
+
+            linhas = []
+            for i, resultado in enumerate(resultados):
+                resultado['projeto_id'] = total + i
+                processados += 'erro' not in resultado
+                linhas.append(codificar(detalhar(resultado)))
+            total += len(bloco)
+            yield b'\n'.join(linhas) + b'\n'
+    except ClientDisconnect:
+        return  # Cliente abortou durante o envio do corpo
+
+    yield codificar({'resumo': {'total_projetos': total, 'processados_com_sucesso': processados}}) + b'\n'
+
+
+@app.post("/predict-stream")
+async def predict_stream(request: Request, formato: Optional[str] = None):
+    """
+    Predições para um upload grande (NDJSON ou CSV), em blocos e com resposta em streaming
+
+    O corpo é lido conforme chega e cada bloco de STREAM_TAMANHO_BLOCO projetos
+    é pontuado e enviado antes do próximo ser lido. O formato vem do
+    Content-Type (application/x-ndjson ou text/csv) ou do parâmetro formato.
+    O CSV segue o formato de data/projetos.csv. A resposta é NDJSON: um
+    resultado por projeto, com projeto_id (posição no upload) ou erro, e uma
+    última linha com o resumo.
+    """
+    atual = preditor  # Mantido até o fim da requisição, mesmo após uma recarga
+    if atual is None:
+        raise HTTPException(status_code=503, detail="Modelo não está disponível")
+
+    formato = formato or formato_do_conteudo(request.headers.get('content-type'))
+    if formato not in FORMATOS_STREAM:
+        raise HTTPException(
+            status_code=415,
+            detail="Envie NDJSON (application/x-ndjson) ou CSV (text/csv), ou informe ?formato=ndjson|csv"
+        )
+
+    # Nem começa o upload com a fila já cheia
+    if executor.cheio():
+        raise servico_saturado(FilaCheia(f"Fila de predições cheia ({executor.fila_maxima} tarefas pendentes)"))
+
+    corpo = CorpoMonitorado(request)
+    blocos = ler_blocos(corpo, formato, TAMANHO_BLOCO_STREAM)
+    return RespostaContinua(_resultados_stream(atual, blocos, corpo), media_type='application/x-ndjson')
+
+
+def _prever_colunar(atual, corpo, formato):
+    """Lê, valida e pontua a tabela inteira e devolve o record batch serializado"""
+    erros, colunas = validar_colunas(colunas_da_tabela(ler_tabela(corpo, formato)), atual.categorias_conhecidas())
+    validos = erros == 0
+    previsoes = atual.prever_colunas(filtrar(colunas, validos)) if validos.any() else None
+    return serializar_resultados(erros, validos, previsoes, {
+        'versao_modelo': atual.versao_modelo,
+        'threshold': atual.threshold,
+        'total_projetos': len(erros),
+        'processados_com_sucesso': int(validos.sum())
+    })
+
+
+@app.post("/predict-arrow")
+async def predict_arrow(request: Request, formato: Optional[str] = None):
+    """
+    Predições em lote no formato colunar (Arrow IPC ou Parquet)
+
+    A tabela deve ter as colunas do /predict (categóricas como texto ou
+    dicionário, datas como date, timestamp ou texto YYYY-MM-DD). Cada coluna
+    é validada inteira e o lote é pontuado de uma vez, sem recomendações. A
+    resposta é um record batch Arrow (stream IPC) com projeto_id, erros
+    (bitmap, 0 = válido; bits descritos nos metadados do schema), sucesso,
+    probabilidade_sucesso, probabilidade_fracasso, confianca e roi_esperado.
+    """
+    if pa is None:
+        raise HTTPException(status_code=501, detail="Formato colunar requer o pacote pyarrow instalado")
+    atual = preditor  # Mantido até o fim da requisição, mesmo após uma recarga
+    if atual is None:
+        raise HTTPException(status_code=503, detail="Modelo não está disponível")
+
+    formato = formato or formato_colunar(request.headers.get('content-type'))
+    if formato not in FORMATOS_COLUNARES:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Envie Arrow IPC ({MIDIA_ARROW}) ou Parquet (application/vnd.apache.parquet), "
+                   "ou informe ?formato=arrow|parquet"
+        )
+
+    corpo = await request.body()
+    try:
+        conteudo = await executor.executar(_prever_colunar, atual, corpo, formato)
+    except FilaCheia as e:
+        raise servico_saturado(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Erro nos dados: {str(e)}")
+    return Response(content=conteudo, media_type=MIDIA_ARROW)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+"""
+Recarga do modelo sem reiniciar a API
+
+O novo preditor é carregado e aquecido em segundo plano; só depois a
+referência ativa é trocada. Requisições em andamento terminam com o
+preditor antigo, que já estava em mãos quando começaram.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+
+# Projeto sintético usado para aquecer o preditor antes da troca
+PROJETO_AQUECIMENTO = {
+    'project_cost': 1000000.0,
+    'project_benefit': 1500000.0,
+    'start_date': '2024-01-01',
+    'end_date': '2024-06-30',
+    'project_type': 'INCOME GENERATION',
+    'region': 'North',
+    'department': 'eCommerce',
+    'complexity': 'Medium',
+    'phase': 'Phase 1 - Explore',
+    'year': 2024,
+    'month': 1
+}
+
+
+class RecarregadorModelo:
+    """Carrega, aquece e troca atomicamente o preditor ativo"""
+
+    def __init__(self, criar_preditor, trocar_preditor, arquivos_observados):
+        """
+        Args:
+            criar_preditor (callable): Constrói um novo PreditorProjetos
+            trocar_preditor (callable): Recebe o novo preditor e o torna ativo
+            arquivos_observados (list): Artefatos cuja alteração dispara a recarga
+        """
+        self.criar_preditor = criar_preditor
+        self.trocar_preditor = trocar_preditor
+        self.arquivos_observados = list(arquivos_observados)
+        self._lock = threading.Lock()
+        self._assinatura_carregada = self._assinatura()
+        self._observador = None
+        self._parar_observador = threading.Event()
+
+        # Estado para /health e /metrics
+        self.recargas = 0
+        self.ultima_recarga = None
+        self.ultimo_erro = None
+
+    def _assinatura(self):
+        """Tamanho e data de modificação dos artefatos observados"""
+        assinatura = []
+        for caminho in self.arquivos_observados:
+            try:
+                info = os.stat(caminho)
+                assinatura.append((caminho, info.st_mtime_ns, info.st_size))
+            except FileNotFoundError:
+                assinatura.append((caminho, None, None))
+        return tuple(assinatura)
+
+    def recarregar(self, motivo='manual'):
+        """
+        Carrega e aquece um novo preditor e o torna ativo
+
+        Bloqueante: chame fora do event loop. Se a carga ou o aquecimento
+        falharem, o preditor atual continua ativo e o erro é propagado.
+
+        Returns:
+            dict: Versão do modelo ativo e tempo gasto
+        """
+        with self._lock:
+            inicio = time.perf_counter()
+            assinatura = self._assinatura()
+            try:
+                novo = self.criar_preditor()
+                resultado = novo.prever(dict(PROJETO_AQUECIMENTO))
+                if not 0.0 <= resultado['probabilidade_sucesso'] <= 1.0:
+                    raise ValueError("Aquecimento retornou probabilidade inválida")
+            except Exception as e:
+                self.ultimo_erro = f"{type(e).__name__}: {e}"
+                raise
+
+            self.trocar_preditor(novo)
+            self._assinatura_carregada = assinatura
+            self.recargas += 1
+            self.ultimo_erro = None
+            self.ultima_recarga = {
+                'motivo': motivo,
+                'versao_modelo': novo.versao_modelo,
+                'duracao_segundos': time.perf_counter() - inicio,
+                'timestamp': datetime.now().isoformat()
+            }
+            print(f"🔄 Modelo recarregado ({motivo}): versão {novo.versao_modelo}")
+            return self.ultima_recarga
+
+    def iniciar_observador(self, intervalo_segundos):
+        """Verifica periodicamente os artefatos e recarrega quando mudarem"""
+        if self._observador is not None:
+            return
+
+        def observar():
+            anterior = self._assinatura()
+            while not self._parar_observador.wait(intervalo_segundos):
+                atual = self._assinatura()
+                # Só recarrega quando os arquivos param de mudar entre duas leituras
+                if atual == anterior and atual != self._assinatura_carregada:
+                    try:
+                        self.recarregar(motivo='arquivo alterado')
+                    except Exception as e:
+                        print(f"❌ Falha ao recarregar modelo: {e}")
+                        self._assinatura_carregada = atual
+                anterior = atual
+
+        self._observador = threading.Thread(target=observar, name='observador-modelo', daemon=True)
+        self._observador.start()
+
+    def parar_observador(self):
+        """Encerra a verificação periódica dos artefatos"""
+        if self._observador is None:
+            return
+        self._parar_observador.set()
+        self._observador.join()
+        self._observador = None
+        self._parar_observador.clear()
+
+    def estado(self):
+        """Resumo das recargas realizadas"""
+        return {
+            'recargas': self.recargas,
+            'ultima_recarga': self.ultima_recarga,
+            'ultimo_erro': self.ultimo_erro
+        }
@@ -0,0 +1,117 @@
+"""
+Codificação das respostas de predição (negociação de conteúdo e modo compacto)
+
+O formato sai do header Accept: MessagePack (application/msgpack, se o
+pacote msgpack estiver instalado) ou JSON, codificado com orjson quando
+disponível. As respostas de predição são montadas e codificadas aqui
+direto em bytes, sem passar pelo jsonable_encoder do FastAPI.
+
+O preditor devolve os códigos das recomendações: detalhar troca pelos
+textos do catálogo na resposta completa, e no modo compacto cada resultado
+traz só sucesso, probabilidade_sucesso, roi_esperado e os códigos (textos
+em GET /recomendacoes).
+"""
+import json
+import math
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # Encoder rápido é opcional (json da biblioteca padrão)
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack é opcional
+    msgpack = None
+
+from model.recomendacoes import mensagens
+
+
+MIDIA_JSON = 'application/json'
+MIDIA_MSGPACK = 'application/msgpack'
+
+MIDIAS_MSGPACK = (MIDIA_MSGPACK, 'application/x-msgpack', 'application/vnd.msgpack')
+
+# Campos de um resultado no modo compacto
+CAMPOS_COMPACTOS = ('sucesso', 'probabilidade_sucesso', 'roi_esperado')
+
+
+def formato_aceito(accept):
+    """
+    Formato da resposta pelo header Accept ('msgpack' ou 'json')
+
+    Segue a ordem (e o q=) do header; sem msgpack instalado, ou sem nenhum
+    formato conhecido no header, a resposta é JSON.
+    """
+    preferencias = []
+    for posicao, item in enumerate((accept or '').split(',')):
+        tipo, *parametros = [parte.strip() for parte in item.split(';')]
+        q = 1.0
+        for parametro in parametros:
+            if parametro.startswith('q='):
+                try:
+                    q = float(parametro[2:])
+                except ValueError:
+                    pass
+        preferencias.append((-q, posicao, tipo.lower()))
+
+    for q, _, tipo in sorted(preferencias):
+        if q == 0:
+            break
+        if tipo in MIDIAS_MSGPACK and msgpack is not None:
+            return 'msgpack'
+        if tipo in (MIDIA_JSON, 'application/*', '*/*'):
+            return 'json'
+    return 'json'
+
+
+def _finitos(conteudo):
+    """Cópia do conteúdo com NaN e infinitos trocados por None (como o orjson escreve)"""
+    if isinstance(conteudo, float):
+        return conteudo if math.isfinite(conteudo) else None
+    if isinstance(conteudo, dict):
+        return {chave: _finitos(valor) for chave, valor in conteudo.items()}
+    if isinstance(conteudo, (list, tuple)):
+        return [_finitos(valor) for valor in conteudo]
+    return conteudo
+
+
+def codificar(conteudo, formato='json'):
+    """Codifica o conteúdo (dict/list de tipos simples) em bytes no formato pedido; NaN/inf viram null"""
+    if formato == 'msgpack':
+        return msgpack.packb(conteudo, use_bin_type=True)
+    if orjson is not None:
+        return orjson.dumps(conteudo)
+    try:
+        texto = json.dumps(conteudo, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+    except ValueError:  # Algum float não finito: mesma saída do orjson
+        texto = json.dumps(_finitos(conteudo), ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+    return texto.encode('utf-8')
+
+
+def responder(conteudo, accept=None):
+    """Response já codificada no formato negociado pelo Accept"""
+    formato = formato_aceito(accept)
+    return Response(content=codificar(conteudo, formato),
+                    media_type=MIDIA_MSGPACK if formato == 'msgpack' else MIDIA_JSON)
+
+
+def detalhar(resultado):
+    """Resultado do preditor com os textos das recomendações no lugar dos códigos (erros seguem como estão)"""
+    if 'erro' in resultado:
+        return resultado
+    detalhado = dict(resultado)
+    detalhado['recomendacoes'] = mensagens(resultado['recomendacoes'])
+    return detalhado
+
+
+def compactar(resultado):
+    """Resultado do preditor no modo compacto (erros seguem como estão)"""
+    if 'erro' in resultado:
+        return resultado
+    compacto = {campo: resultado[campo] for campo in CAMPOS_COMPACTOS}
+    compacto['recomendacoes'] = resultado['recomendacoes']
+    if 'projeto_id' in resultado:
+        compacto['projeto_id'] = resultado['projeto_id']
+    return compacto
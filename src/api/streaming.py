@@ -0,0 +1,241 @@
+"""
+Leitura em blocos de uploads grandes (NDJSON ou CSV) para o /predict-stream
+
+O corpo da requisição é consumido aos pedaços, conforme chega: cada bloco
+de tamanho fixo de projetos é convertido para o formato do /predict,
+pontuado e devolvido antes de o próximo ser lido. A memória usada depende
+do tamanho do bloco, não do tamanho do arquivo.
+"""
+import io
+import json
+import numpy as np
+import pandas as pd
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+
+FORMATOS_STREAM = ('ndjson', 'csv')
+
+# Colunas do CSV (formato de data/projetos.csv, nomes sem os espaços das pontas)
+# e o campo correspondente do /predict
+COLUNAS_CSV_API = {
+    'Project Cost': 'project_cost',
+    'Project Benefit': 'project_benefit',
+    'Start Date': 'start_date',
+    'End Date': 'end_date',
+    'Project Type': 'project_type',
+    'Region': 'region',
+    'Department': 'department',
+    'Complexity': 'complexity',
+    'Phase': 'phase',
+    'Completion%': 'completion',
+    'Year': 'year',
+    'Month': 'month'
+}
+
+
+class LinhaInvalida:
+    """Linha do upload que não pôde ser lida (vira um resultado com 'erro')"""
+
+    def __init__(self, mensagem):
+        self.mensagem = mensagem
+
+
+class RespostaContinua(StreamingResponse):
+    """
+    StreamingResponse que pode ser enviada enquanto o corpo ainda é lido
+
+    A StreamingResponse padrão escuta o receive() em paralelo para detectar
+    desconexões e descartaria os pedaços do corpo; aqui quem lê o receive()
+    é só o endpoint, que para ao perceber a desconexão (CorpoMonitorado).
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+class CorpoMonitorado:
+    """
+    Corpo da requisição lido aos pedaços, com detecção de desconexão do cliente
+
+    Enquanto o corpo chega, uma desconexão aparece como ClientDisconnect na
+    própria leitura. Depois do último pedaço (que pode conter vários blocos),
+    desconectado() consulta o receive() sem o risco de consumir o corpo.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.lido = False
+
+    async def __aiter__(self):
+        while not self.lido:
+            mensagem = await self.request.receive()
+            if mensagem['type'] == 'http.disconnect':
+                raise ClientDisconnect()
+            self.lido = not mensagem.get('more_body', False)
+            if mensagem.get('body'):
+                yield mensagem['body']
+
+    async def desconectado(self):
+        """Se o cliente já desconectou (só verificável após a leitura do corpo)"""
+        return self.lido and await self.request.is_disconnected()
+
+
+def formato_do_conteudo(content_type):
+    """Formato do upload pelo Content-Type ('ndjson', 'csv' ou None)"""
+    tipo = (content_type or '').split(';')[0].strip().lower()
+    if tipo in ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/json-seq'):
+        return 'ndjson'
+    if tipo in ('text/csv', 'application/csv'):
+        return 'csv'
+    return None
+
+
+async def linhas(corpo):
+    """Linhas de texto de um corpo recebido aos pedaços (bytes)"""
+    resto = b''
+    primeira = True
+    async for pedaco in corpo:
+        resto += pedaco
+        *completas, resto = resto.split(b'\n')
+        for linha in completas:
+            texto = linha.decode('utf-8').rstrip('\r')
+            if primeira:
+                texto, primeira = texto.lstrip('\ufeff'), False
+            yield texto
+    if resto:
+        texto = resto.decode('utf-8').rstrip('\r')
+        yield texto.lstrip('\ufeff') if primeira else texto
+
+
+async def registros_csv(corpo):
+    """Registros do CSV; um campo entre aspas pode ocupar várias linhas"""
+    partes, aspas = [], 0
+    async for linha in linhas(corpo):
+        partes.append(linha)
+        aspas += linha.count('"')
+        # Aspas escapadas ("") não mudam a paridade: registro completo com número par
+        if aspas % 2 == 0:
+            yield '\n'.join(partes)
+            partes, aspas = [], 0
+    if partes:
+        yield '\n'.join(partes)
+
+
+async def blocos_ndjson(corpo, tamanho):
+    """Blocos de até tamanho projetos de um NDJSON (um objeto JSON por linha)"""
+    bloco = []
+    async for linha in linhas(corpo):
+        if not linha.strip():
+            continue
+        try:
+            item = json.loads(linha)
+            if not isinstance(item, dict):
+                item = LinhaInvalida("Cada linha deve ser um objeto JSON")
+        except json.JSONDecodeError as e:
+            item = LinhaInvalida(f"JSON inválido: {e}")
+        bloco.append(item)
+        if len(bloco) == tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+async def blocos_csv(corpo, tamanho):
+    """Blocos de até tamanho projetos de um CSV no formato de data/projetos.csv"""
+    cabecalho = None
+    registros = []
+    async for registro in registros_csv(corpo):
+        if cabecalho is None:
+            cabecalho = registro
+            continue
+        if not registro.strip():
+            continue
+        registros.append(registro)
+        if len(registros) == tamanho:
+            yield converter_csv(cabecalho, registros)
+            registros = []
+    if registros:
+        yield converter_csv(cabecalho, registros)
+
+
+def _ler_registros(cabecalho, registros):
+    """
+    DataFrame (texto) dos registros com as colunas do cabeçalho
+
+    Raises:
+        ValueError: Se algum registro tiver mais campos que o cabeçalho
+    """
+    df = pd.read_csv(io.StringIO('\n'.join([cabecalho] + registros)), dtype=str,
+                     keep_default_na=False, on_bad_lines='error')
+    if not isinstance(df.index, pd.RangeIndex):
+        # Primeiro registro com campos a mais: o pandas usaria os excedentes
+        # como índice e deslocaria as colunas de todo o bloco
+        raise ValueError(f"Registro com mais campos que o cabeçalho ({len(df.columns)})")
+    return df
+
+
+def converter_csv(cabecalho, registros):
+    """
+    Converte um bloco de registros CSV para os campos do /predict
+
+    A conversão é feita por coluna (valores monetários com vírgulas,
+    percentuais, datas M/D/AAAA ou ISO). Colunas que já usam os nomes do
+    /predict são aceitas como estão.
+
+    Returns:
+        list: Um dicionário por registro (LinhaInvalida se a linha não tiver
+            o número de colunas do cabeçalho)
+    """
+    try:
+        df = _ler_registros(cabecalho, registros)
+    except ValueError:  # Inclui pd.errors.ParserError
+        # Algum registro malformado: lê um a um para isolar o problema
+        return [item for registro in registros for item in _converter_isolado(cabecalho, registro)]
+
+    colunas = {}
+    for coluna in df.columns:
+        nome = coluna.strip()
+        campo = COLUNAS_CSV_API.get(nome, nome if nome in COLUNAS_CSV_API.values() else None)
+        if campo is None:
+            continue
+        valores = df[coluna].str.strip()
+        if campo in ('project_cost', 'project_benefit'):
+            valores = pd.to_numeric(valores.str.replace(',', ''), errors='coerce')
+        elif campo == 'completion':
+            percentual = valores.str.endswith('%')
+            valores = pd.to_numeric(valores.str.rstrip('%'), errors='coerce')
+            valores = valores.where(~percentual, valores / 100)
+        elif campo in ('year', 'month'):
+            valores = pd.to_numeric(valores, errors='coerce').astype('Int64')
+        elif campo in ('start_date', 'end_date'):
+            datas = pd.to_datetime(valores, format='%m/%d/%Y', errors='coerce')
+            iso = pd.to_datetime(valores, format='%Y-%m-%d', errors='coerce')
+            valores = datas.fillna(iso).dt.strftime('%Y-%m-%d')
+        colunas[campo] = valores.astype(object).where(valores.notna(), None)
+
+    convertido = pd.DataFrame(colunas)
+    if 'completion' in convertido:
+        # Sem percentual informado: mesmo padrão do /predict
+        convertido['completion'] = convertido['completion'].where(convertido['completion'].notna(), 0.0)
+    return [{campo: (valor.item() if isinstance(valor, np.generic) else valor) for campo, valor in linha.items()}
+            for linha in convertido.to_dict('records')]
+
+
+def _converter_isolado(cabecalho, registro):
+    """Converte um registro sozinho; se ele for malformado, devolve LinhaInvalida"""
+    try:
+        _ler_registros(cabecalho, [registro])
+    except ValueError as e:
+        return [LinhaInvalida(f"Registro CSV malformado: {e}")]
+    return converter_csv(cabecalho, [registro])
+
+
+def ler_blocos(corpo, formato, tamanho):
+    """Blocos de projetos do corpo no formato informado ('ndjson' ou 'csv')"""
+    if formato == 'ndjson':
+        return blocos_ndjson(corpo, tamanho)
+    if formato == 'csv':
+        return blocos_csv(corpo, tamanho)
+    raise ValueError(f"Formato desconhecido: {formato} (use {', '.join(FORMATOS_STREAM)})")
@@ -0,0 +1,207 @@
+"""
+Validação colunar dos projetos de um lote
+
+Em vez de um modelo Pydantic por projeto, cada regra do ProjetoDados é
+verificada de uma vez sobre a coluna inteira (NumPy). O resultado é um
+bitmap de erros por linha: 0 para projetos válidos e um bit por regra
+violada, de modo que o lote inteiro é validado sem objetos por linha.
+Lotes JSON (listas de dicionários) passam antes por colunas_dos_registros,
+uma passada por campo.
+"""
+import math
+import numpy as np
+import pandas as pd
+
+
+# Bits do bitmap de erros (um projeto pode violar várias regras)
+ERRO_CAMPO_AUSENTE = 1
+ERRO_CUSTO = 2
+ERRO_BENEFICIO = 4
+ERRO_DATA = 8
+ERRO_PERIODO = 16
+ERRO_MES = 32
+ERRO_CONCLUSAO = 64
+ERRO_CATEGORIA = 128
+ERRO_TIPO = 256
+
+DESCRICAO_ERROS = {
+    ERRO_CAMPO_AUSENTE: "Campo obrigatório ausente",
+    ERRO_CUSTO: "project_cost deve ser maior que zero",
+    ERRO_BENEFICIO: "project_benefit deve ser maior que zero",
+    ERRO_DATA: "Data ausente ou inválida (use YYYY-MM-DD)",
+    ERRO_PERIODO: "Data de término deve ser posterior à data de início",
+    ERRO_MES: "month deve estar entre 1 e 12",
+    ERRO_CONCLUSAO: "completion deve estar entre 0 e 1",
+    ERRO_CATEGORIA: "Categoria desconhecida pelo modelo (veja /project-types, /regions, /departments...)",
+    ERRO_TIPO: "Valor com tipo inválido (texto não numérico em campo numérico ou número em campo de texto)"
+}
+
+CAMPOS_CATEGORICOS = ('project_type', 'region', 'department', 'complexity', 'phase')
+CAMPOS_NUMERICOS = ('project_cost', 'project_benefit', 'completion', 'year', 'month')
+CAMPOS_OBRIGATORIOS = ('project_cost', 'project_benefit', 'start_date', 'end_date') + CAMPOS_CATEGORICOS
+
+
+_TIPOS_NUMERICOS = {int, float, type(None)}
+_TIPOS_TEXTO = {str, type(None)}
+
+
+def _filtrar_tipos(valores, aceitos):
+    """Troca por None os valores cujo tipo não é aceito; devolve também a máscara deles"""
+    # Caso comum (todos do tipo certo): só o conjunto de tipos, sem laço por valor
+    if set(map(type, valores)) <= aceitos:
+        return valores, np.zeros(len(valores), dtype=bool)
+    errados = np.fromiter((type(v) not in aceitos for v in valores), dtype=bool, count=len(valores))
+    return [None if errado else v for v, errado in zip(valores, errados)], errados
+
+
+def _converter_numero(valor):
+    """Número de um texto ("150000", " 1.5e5 ") ou bool, como a coerção do Pydantic; None se não converter"""
+    if isinstance(valor, bool):
+        return float(valor)
+    if isinstance(valor, str):
+        try:
+            numero = float(valor)  # Ignora espaços nas pontas
+        except ValueError:
+            return None
+        return numero if math.isfinite(numero) else None
+    return None
+
+
+def _numeros(valores):
+    """Coluna float64 de uma lista (None vira NaN) e máscara dos valores não convertíveis"""
+    if set(map(type, valores)) <= _TIPOS_NUMERICOS:
+        return np.array(valores, dtype=float), np.zeros(len(valores), dtype=bool)
+    # Textos numéricos e bools são aceitos, como no ProjetoDados (modo lax do Pydantic)
+    convertidos = [v if type(v) in _TIPOS_NUMERICOS else _converter_numero(v) for v in valores]
+    errados = np.fromiter((c is None and v is not None for v, c in zip(valores, convertidos)),
+                          dtype=bool, count=len(valores))
+    return np.array(convertidos, dtype=float), errados
+
+
+def _textos(valores):
+    """Lista só com textos (demais tipos viram None) e máscara dos valores de tipo errado"""
+    return _filtrar_tipos(valores, _TIPOS_TEXTO)
+
+
+def _datas(textos):
+    """Datas ISO como datetime64[s] (ausentes e inválidas viram NaT)"""
+    if None in textos:
+        textos = ['NaT' if t is None else t for t in textos]
+    try:
+        return np.array(textos, dtype='datetime64[s]')
+    except ValueError:
+        # Pelo menos uma data fora do padrão: converter uma a uma
+        datas = np.full(len(textos), np.datetime64('NaT'), dtype='datetime64[s]')
+        for i, texto in enumerate(textos):
+            try:
+                datas[i] = np.datetime64(texto, 's')
+            except (ValueError, TypeError):
+                pass
+        return datas
+
+
+def colunas_dos_registros(registros):
+    """
+    Monta as colunas de validar_colunas a partir de uma lista de dicionários
+
+    Returns:
+        tuple: (colunas, bitmap com ERRO_TIPO nas linhas com algum valor de
+            tipo errado, que é tratado como ausente)
+    """
+    n = len(registros)
+    errados = np.zeros(n, dtype=bool)
+    if set(map(type, registros)) != {dict}:
+        errados = np.fromiter((not isinstance(r, dict) for r in registros), dtype=bool, count=n)
+        registros = [{} if errado else r for r, errado in zip(registros, errados)]
+
+    colunas = {}
+    for campo in CAMPOS_NUMERICOS:
+        colunas[campo], tipo = _numeros([r.get(campo) for r in registros])
+        errados |= tipo
+    # year/month são inteiros no ProjetoDados: 2021.0 passa, 2021.5 não
+    for campo in ('year', 'month'):
+        errados |= colunas[campo] != np.trunc(colunas[campo])  # NaN (ausente) dá False
+    colunas['completion'] = np.where(np.isnan(colunas['completion']), 0.0, colunas['completion'])
+    for campo in ('start_date', 'end_date'):
+        textos, tipo = _textos([r.get(campo) for r in registros])
+        colunas[campo] = _datas(textos)
+        errados |= tipo
+    for campo in CAMPOS_CATEGORICOS:
+        textos, tipo = _textos([r.get(campo) for r in registros])
+        indices, categorias = pd.factorize(np.array(textos, dtype=object))
+        colunas[campo] = (indices.astype(np.int64), list(categorias))
+        errados |= tipo
+
+    return colunas, np.where(errados, ERRO_TIPO, 0).astype(np.uint16)
+
+
+def validar_colunas(colunas, categorias_conhecidas=None):
+    """
+    Valida um lote em formato colunar e completa year/month
+
+    Args:
+        colunas (dict): project_cost, project_benefit, completion, year e month
+            (float64, NaN = ausente), start_date e end_date (datetime64, NaT =
+            ausente ou inválida) e, para cada campo categórico, um par
+            (indices, categorias) com índice -1 para valores ausentes
+        categorias_conhecidas (dict): Valores aceitos por campo categórico
+            (None: qualquer valor é aceito)
+
+    Returns:
+        tuple: (bitmap uint16 de erros por linha, colunas com year/month
+            preenchidos pela data de início como no /predict)
+    """
+    n = len(colunas['project_cost'])
+    erros = np.zeros(n, dtype=np.uint16)
+    custo, beneficio = colunas['project_cost'], colunas['project_benefit']
+    inicio, fim = colunas['start_date'], colunas['end_date']
+
+    ausentes = np.isnan(custo) | np.isnan(beneficio)
+    for campo in CAMPOS_CATEGORICOS:
+        ausentes |= colunas[campo][0] < 0
+    erros[ausentes] |= ERRO_CAMPO_AUSENTE
+
+    with np.errstate(invalid='ignore'):  # NaN já marcado como ausente
+        erros[custo <= 0] |= ERRO_CUSTO
+        erros[beneficio <= 0] |= ERRO_BENEFICIO
+        erros[np.isnat(inicio) | np.isnat(fim)] |= ERRO_DATA
+        erros[fim <= inicio] |= ERRO_PERIODO
+        erros[(colunas['month'] < 1) | (colunas['month'] > 12)] |= ERRO_MES
+        completion = colunas['completion']
+        erros[(completion < 0) | (completion > 1)] |= ERRO_CONCLUSAO
+
+    # Só os valores distintos são consultados; o índice -1 (ausente) cai no True final
+    for campo, conhecidas in (categorias_conhecidas or {}).items():
+        indices, categorias = colunas[campo]
+        aceitas = np.array([c in conhecidas for c in categorias] + [True])
+        erros[~aceitas[indices]] |= ERRO_CATEGORIA
+
+    # Ano e mês não informados: os da data de início, como no /predict
+    meses = inicio.astype('datetime64[M]').astype(np.int64)
+    completas = dict(colunas)
+    completas['year'] = np.where(np.isnan(colunas['year']), meses // 12 + 1970, colunas['year'])
+    completas['month'] = np.where(np.isnan(colunas['month']), meses % 12 + 1, colunas['month'])
+    return erros, completas
+
+
+def categorias_desconhecidas(projeto, categorias_conhecidas):
+    """Campos categóricos de um projeto com valor fora das categorias conhecidas (a regra ERRO_CATEGORIA do lote)"""
+    return {campo: projeto.get(campo) for campo, conhecidas in categorias_conhecidas.items()
+            if projeto.get(campo) is not None and projeto.get(campo) not in conhecidas}
+
+
+def descrever_erros(bitmap):
+    """Mensagens das regras violadas por um valor do bitmap"""
+    return [mensagem for bit, mensagem in DESCRICAO_ERROS.items() if bitmap & bit]
+
+
+def filtrar(colunas, mascara):
+    """Subconjunto das linhas selecionadas de cada coluna"""
+    filtradas = {}
+    for campo, valores in colunas.items():
+        if isinstance(valores, tuple):
+            indices, categorias = valores
+            filtradas[campo] = (indices[mascara], categorias)
+        else:
+            filtradas[campo] = valores[mascara]
+    return filtradas
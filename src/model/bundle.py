@@ -0,0 +1,288 @@
+# Bundle unico e versionado com todos os artefatos do modelo
+#
+# Layout do arquivo:
+#   [8 bytes: assinatura][8 bytes: tamanho do manifesto][manifesto JSON]
+#   [preenchimento ate multiplo de 64][arrays NumPy crus, cada um alinhado em 64]
+#
+# O manifesto descreve cada array (dtype, shape, offset) e guarda o hash
+# SHA-256 do conteudo. Como os arrays nao sao comprimidos, o arquivo inteiro
+# e aberto com um unico mmap e os arrays sao apenas visoes sobre ele.
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+import numpy as np
+from scipy.special import expit
+from sklearn.preprocessing import LabelEncoder
+
+try:
+    from .features import PipelineFeatures
+    from .forest import ARRAYS_FLORESTA, FlorestaPlana, achatar_floresta
+except ImportError:  # Executado como script
+    from features import PipelineFeatures
+    from forest import ARRAYS_FLORESTA, FlorestaPlana, achatar_floresta
+
+
+ASSINATURA = b'PPSBNDL1'
+ALINHAMENTO = 64
+FORMATO = 1
+
+
+class BundleInvalido(ValueError):
+    """Bundle corrompido, de formato desconhecido ou com hash divergente"""
+
+
+class RegressaoLogisticaPlana:
+    """Logistic Regression binaria reconstruida a partir de coef_ e intercept_"""
+
+    def __init__(self, coef, intercept, classes):
+        self.coef_ = coef
+        self.intercept_ = intercept
+        self.classes_ = classes
+
+    def predict_proba(self, X):
+        """Mesmo calculo de LogisticRegression.predict_proba (caso binario)"""
+        prob = (np.asarray(X, dtype=np.float64) @ self.coef_.T + self.intercept_).ravel()
+        expit(prob, out=prob)
+        return np.vstack([1 - prob, prob]).T
+
+    def predict(self, X):
+        """Classe mais provavel para cada linha de X"""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class EscalonadorPlano:
+    """StandardScaler reconstruido a partir de mean_ e scale_ (e var_, se salvo)"""
+
+    def __init__(self, mean, scale, var=None):
+        self.mean_ = mean
+        self.scale_ = scale
+        self.var_ = var
+
+    def transform(self, X):
+        """Mesmo calculo de StandardScaler.transform"""
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+
+def _alinhar(posicao):
+    """Proxima posicao multipla de ALINHAMENTO"""
+    return -(-posicao // ALINHAMENTO) * ALINHAMENTO
+
+
+def _arrays_do_modelo(modelo):
+    """Converte o modelo em (tipo, arrays com prefixo)"""
+    if hasattr(modelo, 'estimators_') or isinstance(modelo, FlorestaPlana):
+        arrays = modelo.arrays if isinstance(modelo, FlorestaPlana) else achatar_floresta(modelo)
+        return 'random_forest', {f'floresta/{nome}': arrays[nome] for nome in ARRAYS_FLORESTA}
+    if hasattr(modelo, 'coef_'):
+        return 'logistic_regression', {
+            'logistica/coef': modelo.coef_,
+            'logistica/intercept': modelo.intercept_,
+            'logistica/classes': modelo.classes_
+        }
+    raise TypeError(f"Modelo não suportado no bundle: {type(modelo).__name__}")
+
+
+def salvar_bundle(caminho, modelo, scaler, label_encoders, feature_names, threshold, extras=None,
+                  curva_threshold=None):
+    """
+    Grava todos os artefatos do modelo em um unico arquivo
+
+    A escrita e feita em um arquivo temporario renomeado no final, entao
+    quem le o bundle nunca enxerga um arquivo pela metade.
+
+    Args:
+        caminho (str): Arquivo de destino
+        modelo: RandomForestClassifier, LogisticRegression ou suas versoes planas
+        scaler: StandardScaler (ou EscalonadorPlano) usado na Logistic Regression
+        label_encoders (dict): LabelEncoders das features categoricas
+        feature_names (list): Ordem das features
+        threshold (float): Threshold otimizado
+        extras (dict): Metadados adicionais para o manifesto
+        curva_threshold (dict): Curva de curva_threshold usada na escolha do threshold
+
+    Returns:
+        dict: Manifesto gravado
+    """
+    tipo, arrays = _arrays_do_modelo(modelo)
+    arrays['scaler/mean'] = scaler.mean_
+    arrays['scaler/scale'] = scaler.scale_
+    if getattr(scaler, 'var_', None) is not None:
+        arrays['scaler/var'] = scaler.var_
+    for nome, array in (curva_threshold or {}).items():
+        arrays[f'curva_threshold/{nome}'] = array
+
+    descritores = {}
+    blocos = []
+    posicao = 0
+    for nome, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype.hasobject:
+            array = array.astype(str)
+        posicao = _alinhar(posicao)
+        descritores[nome] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': posicao,
+            'nbytes': array.nbytes
+        }
+        blocos.append((posicao, array))
+        posicao += array.nbytes
+
+    dados = bytearray(_alinhar(posicao))
+    for inicio, array in blocos:
+        dados[inicio:inicio + array.nbytes] = array.tobytes()
+
+    manifesto = {
+        'formato': FORMATO,
+        'criado_em': datetime.now().isoformat(),
+        'tipo_modelo': tipo,
+        'threshold': float(threshold),
+        'feature_names': list(feature_names),
+        'classes_categoricas': {col: [str(c) for c in le.classes_] for col, le in label_encoders.items()},
+        'arrays': descritores
+    }
+    if extras:
+        manifesto.update(extras)
+    manifesto['sha256'] = _calcular_hash(manifesto, dados)
+
+    cabecalho = json.dumps(manifesto).encode('utf-8')
+    inicio_dados = _alinhar(16 + len(cabecalho))
+
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    os.makedirs(diretorio, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=diretorio, prefix='.bundle-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(ASSINATURA)
+            f.write(len(cabecalho).to_bytes(8, 'little'))
+            f.write(cabecalho)
+            f.write(b'\0' * (inicio_dados - 16 - len(cabecalho)))
+            f.write(dados)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+    return manifesto
+
+
+def _calcular_hash(manifesto, dados):
+    """SHA-256 do manifesto (sem o proprio hash) e da area de arrays"""
+    h = hashlib.sha256()
+    sem_hash = {k: v for k, v in manifesto.items() if k != 'sha256'}
+    h.update(json.dumps(sem_hash, sort_keys=True).encode('utf-8'))
+    h.update(memoryview(dados))
+    return h.hexdigest()
+
+
+def _manifesto_do_cabecalho(cabecalho, caminho):
+    """Manifesto a partir do inicio do arquivo (bytes ou mmap), com o offset dos arrays"""
+    if bytes(cabecalho[:8]) != ASSINATURA:
+        raise BundleInvalido(f"{caminho} não é um bundle de modelo")
+    tamanho = int.from_bytes(bytes(cabecalho[8:16]), 'little')
+    try:
+        manifesto = json.loads(bytes(cabecalho[16:16 + tamanho]).decode('utf-8'))
+    except (UnicodeDecodeError, ValueError):
+        raise BundleInvalido(f"Manifesto do bundle {caminho} ilegível")
+    if manifesto.get('formato') != FORMATO:
+        raise BundleInvalido(f"Formato de bundle não suportado: {manifesto.get('formato')}")
+    manifesto['_inicio_dados'] = _alinhar(16 + tamanho)
+    return manifesto
+
+
+def ler_manifesto(caminho):
+    """Le apenas o manifesto do bundle (sem mapear os arrays)"""
+    with open(caminho, 'rb') as f:
+        inicio = f.read(16)
+        return _manifesto_do_cabecalho(inicio + f.read(int.from_bytes(inicio[8:16], 'little')), caminho)
+
+
+def carregar_bundle(caminho, verificar=False):
+    """
+    Abre o bundle com um unico mmap e reconstroi os artefatos
+
+    O manifesto e os arrays saem do mesmo mapa; sem verificar, a carga so
+    toca as paginas do cabecalho e a dos arrays usados, e nao depende do
+    tamanho do arquivo. A escrita atomica de salvar_bundle ja impede
+    arquivos pela metade; o tamanho do arquivo e conferido de todo modo.
+
+    Args:
+        caminho (str): Arquivo do bundle
+        verificar (bool): Confere o hash SHA-256 do conteudo (le o arquivo inteiro)
+
+    Returns:
+        dict: modelo, scaler, label_encoders, feature_names, threshold, curva_threshold
+            (None em bundles sem curva), pipeline (PipelineFeatures) e manifesto
+
+    Raises:
+        BundleInvalido: Se o arquivo estiver corrompido, truncado ou (com
+            verificar) adulterado
+    """
+    mapa = np.memmap(caminho, dtype=np.uint8, mode='r')
+    manifesto = _manifesto_do_cabecalho(mapa, caminho)
+    inicio = manifesto.pop('_inicio_dados')
+    dados = mapa[inicio:]
+
+    fim = max((d['offset'] + d['nbytes'] for d in manifesto['arrays'].values()), default=0)
+    if len(dados) < fim:
+        raise BundleInvalido(f"Bundle {caminho} truncado ({len(mapa)} bytes)")
+    if verificar and _calcular_hash(manifesto, dados) != manifesto['sha256']:
+        raise BundleInvalido(f"Hash do bundle {caminho} não confere")
+
+    arrays = {}
+    for nome, d in manifesto['arrays'].items():
+        bruto = dados[d['offset']:d['offset'] + d['nbytes']]
+        arrays[nome] = bruto.view(np.dtype(d['dtype'])).reshape(d['shape'])
+
+    if manifesto['tipo_modelo'] == 'random_forest':
+        modelo = FlorestaPlana({nome: arrays[f'floresta/{nome}'] for nome in ARRAYS_FLORESTA})
+    else:
+        modelo = RegressaoLogisticaPlana(arrays['logistica/coef'], arrays['logistica/intercept'],
+                                         arrays['logistica/classes'])
+
+    label_encoders = {}
+    for col, classes in manifesto['classes_categoricas'].items():
+        le = LabelEncoder()
+        le.classes_ = np.array(classes, dtype=object)
+        label_encoders[col] = le
+
+    curva = {nome.split('/', 1)[1]: array for nome, array in arrays.items() if nome.startswith('curva_threshold/')}
+
+    return {
+        'modelo': modelo,
+        'scaler': EscalonadorPlano(arrays['scaler/mean'], arrays['scaler/scale'], arrays.get('scaler/var')),
+        'label_encoders': label_encoders,
+        'feature_names': manifesto['feature_names'],
+        'threshold': manifesto['threshold'],
+        'curva_threshold': curva or None,
+        'pipeline': PipelineFeatures.do_manifesto(manifesto, label_encoders),
+        'manifesto': manifesto
+    }
+
+
+def converter_artefatos_legados(diretorio='models', destino='models/modelo_projetos.bundle'):
+    """Gera o bundle a partir dos cinco pickles salvos pelas versoes anteriores"""
+    import joblib
+
+    modelo = joblib.load(os.path.join(diretorio, 'modelo_projetos.pkl'))
+    scaler = joblib.load(os.path.join(diretorio, 'scaler.pkl'))
+    label_encoders = joblib.load(os.path.join(diretorio, 'label_encoders.pkl'))
+    feature_names = joblib.load(os.path.join(diretorio, 'feature_names.pkl'))
+    try:
+        threshold = joblib.load(os.path.join(diretorio, 'threshold.pkl'))
+    except FileNotFoundError:
+        threshold = 0.5
+
+    return salvar_bundle(destino, modelo, scaler, label_encoders, feature_names, threshold,
+                         extras={'origem': 'artefatos legados'})
+
+
+if __name__ == "__main__":
+    manifesto = converter_artefatos_legados()
+    print(f"✅ Bundle gerado: models/modelo_projetos.bundle (sha256 {manifesto['sha256'][:12]})")
@@ -0,0 +1,159 @@
+# Busca de hiperparametros por successive halving com orcamento de tempo
+#
+# Todas as configuracoes comecam avaliadas (F1 medio na validacao cruzada)
+# com poucos projetos de treino por dobra; a cada rodada so o melhor terco
+# de cada modelo continua, com mais projetos. As subamostras de cada dobra
+# saem de uma permutacao fixa dos indices de treino da dobra, fatiada por
+# rodada. Se uma rodada tiver o mesmo numero de projetos da anterior (limites
+# min_amostras ou treino inteiro), ela so corta: as sobreviventes ja foram
+# avaliadas nessas subamostras. As avaliacoes rodam no pool de processos.
+import itertools
+import math
+import time
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import f1_score
+
+try:
+    from .paralelo import executar_tarefas, matriz, numero_workers
+except ImportError:  # Executado como script
+    from paralelo import executar_tarefas, matriz, numero_workers
+
+
+# Valores testados para cada modelo candidato de treinar_modelos
+ESPACO_BUSCA = {
+    'Random Forest': {
+        'n_estimators': [100, 200, 400],
+        'max_depth': [4, 8, 12, None],
+        'min_samples_leaf': [1, 2, 4]
+    },
+    'Logistic Regression': {
+        'C': [0.01, 0.03, 0.1, 0.3, 1.0, 3.0]
+    }
+}
+
+
+def configuracoes(espaco):
+    """Todas as combinacoes de um espaco {parametro: [valores]}"""
+    nomes = sorted(espaco)
+    return [dict(zip(nomes, valores)) for valores in itertools.product(*(espaco[n] for n in nomes))]
+
+
+def _chave(parametros):
+    """Chave hashable e legivel de um conjunto de parametros"""
+    return tuple(sorted(parametros.items(), key=lambda item: item[0]))
+
+
+def _avaliar_dobra(tarefa):
+    """Ajusta uma configuracao em parte do treino da dobra e mede o F1 na validacao"""
+    X = matriz('X_train_scaled' if tarefa['escalado'] else 'X_train')
+    y = matriz('y_train')
+    modelo = clone(tarefa['modelo']).set_params(**tarefa['parametros'])
+    modelo.fit(X[tarefa['treino']], y[tarefa['treino']])
+    return f1_score(y[tarefa['validacao']], modelo.predict(X[tarefa['validacao']]), zero_division=0)
+
+
+def buscar_hiperparametros(modelos, matrizes, dobras, espaco=None, eta=3, min_amostras=30,
+                           segundos=None, cpu_segundos=None, workers=None, semente=42):
+    """
+    Successive halving sobre os modelos candidatos
+
+    Args:
+        modelos (dict): {nome: estimador base} (como em treinar_modelos)
+        matrizes (dict): X_train, X_train_scaled e y_train (compartilhadas com os workers)
+        dobras (list): (indices de treino, indices de validacao) da validacao cruzada
+        espaco (dict): {nome: {parametro: [valores]}} (padrao: ESPACO_BUSCA)
+        eta (int): Fator de corte: 1/eta das configuracoes segue a cada rodada
+        min_amostras (int): Menor numero de projetos de treino por dobra
+        segundos (float): Orcamento de tempo de relogio
+        cpu_segundos (float): Orcamento de tempo somado das tarefas (a primeira
+            rodada sempre roda; as demais so se a previsao de custo couber)
+        workers (int): Processos do pool
+        semente (int): Semente das subamostras (aninhadas entre rodadas)
+
+    Returns:
+        tuple: ({nome: melhores parametros}, leaderboard ordenado do melhor ao pior)
+    """
+    espaco = ESPACO_BUSCA if espaco is None else espaco
+    inicio = time.perf_counter()
+    cpu_gasto = 0.0
+
+    # Uma permutacao fixa por dobra: as subamostras crescem sem trocar de projetos
+    rng = np.random.default_rng(semente)
+    permutacoes = [rng.permutation(treino) for treino, _ in dobras]
+    n_treino = min(len(treino) for treino, _ in dobras)
+
+    vivos = {nome: configuracoes(espaco.get(nome, {})) for nome in modelos}
+    n_rodadas = max(1, math.ceil(math.log(max(len(c) for c in vivos.values()), eta)) + 1)
+    resultados_dobras = {}  # (nome, chave) -> [(f1, duracao) por dobra] da ultima avaliacao
+    avaliacoes = {}  # (nome, chave) -> ultima avaliacao
+    amostras_anterior = None
+    ajustes = 0
+
+    amostras_ajustadas = 0
+    paralelos = min(numero_workers(workers), sum(len(c) for c in vivos.values()) * len(dobras))
+
+    for rodada in range(n_rodadas):
+        amostras = min(n_treino, max(min_amostras, round(n_treino * eta ** (rodada - n_rodadas + 1))))
+
+        # Mesmo número de projetos da rodada anterior: mesmas subamostras, nada a ajustar
+        avaliadas = sum(len(configs) for configs in vivos.values()) * len(dobras)
+        tarefas, chaves = [], []
+        if amostras != amostras_anterior:
+            treinos = [np.sort(permutacao[:amostras]) for permutacao in permutacoes]
+            for nome, configs in vivos.items():
+                for parametros in configs:
+                    chaves.append((nome, _chave(parametros)))
+                    for treino, (_, validacao) in zip(treinos, dobras):
+                        tarefas.append({'modelo': modelos[nome], 'parametros': parametros,
+                                        'escalado': nome == 'Logistic Regression',
+                                        'treino': treino, 'validacao': validacao})
+
+        # A primeira rodada sempre roda; as seguintes só se couberem no orçamento,
+        # estimando o custo pelo tempo por projeto das rodadas anteriores
+        if rodada > 0 and tarefas:
+            previsao_cpu = len(tarefas) * amostras * cpu_gasto / max(amostras_ajustadas, 1)
+            previsao_relogio = time.perf_counter() - inicio + previsao_cpu / paralelos
+            if (segundos and previsao_relogio > segundos) or (cpu_segundos and cpu_gasto + previsao_cpu > cpu_segundos):
+                print(f"  ⏹️  Orçamento esgotado antes da rodada {rodada + 1} (previsão: "
+                      f"{previsao_relogio:.1f} s de relógio, {cpu_gasto + previsao_cpu:.1f} s de CPU)")
+                break
+
+        execucoes = executar_tarefas(_avaliar_dobra, tarefas, matrizes, workers) if tarefas else []
+        for i, chave in enumerate(chaves):
+            resultados_dobras[chave] = execucoes[i * len(dobras):(i + 1) * len(dobras)]
+        cpu_gasto += sum(duracao for _, duracao in execucoes)
+        ajustes += len(tarefas)
+        amostras_ajustadas += len(tarefas) * amostras
+        amostras_anterior = amostras
+
+        for nome, configs in vivos.items():
+            for parametros in configs:
+                resultados = resultados_dobras[(nome, _chave(parametros))]
+                f1s = [f1 for f1, _ in resultados]
+                avaliacoes[(nome, _chave(parametros))] = {
+                    'modelo': nome,
+                    'parametros': parametros,
+                    'rodada': rodada + 1,
+                    'amostras_por_dobra': amostras,
+                    'f1_medio': float(np.mean(f1s)),
+                    'f1_desvio': float(np.std(f1s)),
+                    'segundos': float(sum(d for _, d in resultados))
+                }
+
+            # Melhor 1/eta segue para a próxima rodada (empate: ordem original)
+            ordenadas = sorted(configs, key=lambda p: -avaliacoes[(nome, _chave(p))]['f1_medio'])
+            vivos[nome] = ordenadas[:max(1, math.ceil(len(configs) / eta))]
+
+        print(f"  Rodada {rodada + 1}/{n_rodadas}: {amostras} projetos por dobra, "
+              f"{avaliadas} avaliações ({avaliadas - len(tarefas)} reaproveitadas da rodada anterior), "
+              f"{', '.join(f'{n}: {len(c)} seguem' for n, c in vivos.items())}")
+
+    leaderboard = sorted(avaliacoes.values(), key=lambda a: (-a['rodada'], -a['f1_medio']))
+    melhores = {}
+    for linha in leaderboard:
+        melhores.setdefault(linha['modelo'], linha['parametros'])
+
+    print(f"  Busca: {ajustes} ajustes em {time.perf_counter() - inicio:.1f} s de relógio "
+          f"({cpu_gasto:.1f} s somando as tarefas)")
+    return melhores, leaderboard
@@ -0,0 +1,80 @@
+# Cache em memoria dos resultados de predicao (LRU com expiracao)
+import threading
+import time
+from collections import OrderedDict
+
+
+class CachePredicoes:
+    """Cache LRU com TTL, seguro para uso entre threads"""
+
+    def __init__(self, tamanho_maximo=1024, ttl_segundos=300):
+        """
+        Args:
+            tamanho_maximo (int): Numero maximo de resultados guardados
+            ttl_segundos (float): Tempo de vida de cada resultado
+        """
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl_segundos = ttl_segundos
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metricas
+        self.acertos = 0
+        self.falhas = 0
+        self.expirados = 0
+        self.descartados = 0
+
+    def obter(self, chave):
+        """Retorna uma copia do resultado guardado ou None"""
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.falhas += 1
+                return None
+            expira_em, resultado = item
+            if expira_em <= agora:
+                del self._itens[chave]
+                self.expirados += 1
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+        return _copiar(resultado)
+
+    def guardar(self, chave, resultado):
+        """Guarda uma copia do resultado, descartando o menos usado se cheio"""
+        item = (time.monotonic() + self.ttl_segundos, _copiar(resultado))
+        with self._lock:
+            self._itens[chave] = item
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+                self.descartados += 1
+
+    def limpar(self):
+        """Remove todos os resultados (ex.: apos recarregar o modelo)"""
+        with self._lock:
+            self._itens.clear()
+
+    def metricas(self):
+        """Contadores de acertos e falhas"""
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'tamanho': len(self._itens),
+                'tamanho_maximo': self.tamanho_maximo,
+                'ttl_segundos': self.ttl_segundos,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'expirados': self.expirados,
+                'descartados': self.descartados
+            }
+
+
+def _copiar(resultado):
+    """Copia o resultado para que quem o recebe possa altera-lo livremente"""
+    copia = dict(resultado)
+    copia['recomendacoes'] = list(resultado['recomendacoes'])
+    return copia
@@ -0,0 +1,76 @@
+# Cache colunar (Parquet) do dataset de treino ja limpo
+#
+# O arquivo e identificado pelo hash do CSV de origem: se o CSV mudar, o
+# nome muda e o cache antigo simplesmente deixa de ser usado. Colunas
+# numericas ficam tipadas e as categoricas sao gravadas com dictionary
+# encoding (pandas 'category' <-> dicionario do Arrow). Os attrs do
+# DataFrame (cortes de quantis) vao em uma chave propria dos metadados do
+# schema, sem depender do pandas (que so os grava a partir da 2.1).
+import json
+import os
+import tempfile
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # Cache Parquet e opcional
+    pyarrow = None
+
+try:
+    from .forest import hash_arquivo
+except ImportError:  # Executado como script
+    from forest import hash_arquivo
+
+
+DIRETORIO_CACHE = 'data/cache'
+
+# Muda quando a limpeza dos dados (ou o formato do cache) mudar, invalidando caches antigos
+VERSAO_DADOS = 3
+
+# Chave dos metadados do schema com os attrs do DataFrame (JSON)
+CHAVE_ATTRS = b'dados_limpos_attrs'
+
+
+def caminho_cache(origem, diretorio=DIRETORIO_CACHE):
+    """Arquivo de cache correspondente ao conteudo atual do CSV de origem"""
+    return os.path.join(diretorio, f'dados_limpos-v{VERSAO_DADOS}-{hash_arquivo(origem)[:16]}.parquet')
+
+
+def salvar_dados_limpos(data, caminho):
+    """
+    Grava o DataFrame limpo em Parquet (escrita atomica)
+
+    Args:
+        data (pd.DataFrame): Saida de preparar_dados ja tipada
+        caminho (str): Arquivo de destino
+    """
+    if pyarrow is None:
+        raise ImportError("Cache Parquet requer o pacote pyarrow instalado")
+
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    os.makedirs(diretorio, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=diretorio, prefix='.dados-', suffix='.parquet')
+    os.close(fd)
+    try:
+        tabela = pyarrow.Table.from_pandas(data, preserve_index=False)
+        metadados = dict(tabela.schema.metadata or {})
+        metadados[CHAVE_ATTRS] = json.dumps(data.attrs).encode('utf-8')
+        pq.write_table(tabela.replace_schema_metadata(metadados), temporario)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def ler_dados_limpos(caminho):
+    """Le o Parquet gravado por salvar_dados_limpos (categoricas voltam como category, attrs preservados)"""
+    if pyarrow is None:
+        raise ImportError("Cache Parquet requer o pacote pyarrow instalado")
+    tabela = pq.read_table(caminho)
+    data = tabela.to_pandas()
+    attrs = (tabela.schema.metadata or {}).get(CHAVE_ATTRS)
+    if attrs is not None:
+        data.attrs.update(json.loads(attrs))
+    return data
@@ -0,0 +1,76 @@
+# Deteccao de drift entre os dados de treino e lotes novos (PSI)
+#
+# No treino guardamos, para cada feature, os limites dos decis (numericas)
+# ou as proporcoes de cada codigo (categoricas). Um lote novo e comparado
+# com essa referencia pelo Population Stability Index:
+#   PSI = soma((p_novo - p_ref) * ln(p_novo / p_ref))
+# Regra usual: < 0.1 estavel, 0.1-0.2 mudanca moderada, > 0.2 mudanca forte.
+import numpy as np
+
+
+LIMITE_PSI = 0.2
+
+# Evita log(0) em faixas vazias
+_EPSILON = 1e-4
+
+
+def referencia_drift(X, colunas_categoricas=(), n_faixas=10):
+    """
+    Distribuicao de referencia de cada feature (serializavel em JSON)
+
+    Args:
+        X (pd.DataFrame): Features de treino
+        colunas_categoricas: Features codificadas (comparadas por codigo)
+        n_faixas (int): Faixas por quantis para as numericas
+
+    Returns:
+        dict: {feature: {'limites': [...], 'proporcoes': [...]}} ou
+            {feature: {'codigos': [...], 'proporcoes': [...]}}
+    """
+    referencia = {}
+    for coluna in X.columns:
+        valores = np.asarray(X[coluna], dtype=np.float64)
+        if coluna in colunas_categoricas:
+            codigos, contagens = np.unique(valores, return_counts=True)
+            referencia[coluna] = {'codigos': codigos.tolist(),
+                                  'proporcoes': (contagens / contagens.sum()).tolist()}
+        else:
+            limites = np.unique(np.nanquantile(valores, np.linspace(0, 1, n_faixas + 1)[1:-1]))
+            referencia[coluna] = {'limites': limites.tolist(),
+                                  'proporcoes': _proporcoes_faixas(valores, limites).tolist()}
+    return referencia
+
+
+def _proporcoes_faixas(valores, limites):
+    """Fracao dos valores em cada faixa definida pelos limites"""
+    faixas = np.searchsorted(limites, valores, side='right')
+    return np.bincount(faixas, minlength=len(limites) + 1) / max(len(valores), 1)
+
+
+def calcular_psi(referencia, X):
+    """
+    PSI de cada feature do lote novo contra a referencia do treino
+
+    Codigos categoricos ausentes na referencia contam como uma faixa a mais
+    (com proporcao de referencia ~0), o que eleva bastante o PSI.
+
+    Returns:
+        dict: {feature: psi}
+    """
+    psi = {}
+    for coluna, ref in referencia.items():
+        valores = np.asarray(X[coluna], dtype=np.float64)
+        if 'codigos' in ref:
+            codigos = np.asarray(ref['codigos'])
+            posicoes = np.searchsorted(codigos, valores)
+            conhecidos = (posicoes < len(codigos)) & (codigos[np.minimum(posicoes, len(codigos) - 1)] == valores)
+            novo = np.bincount(np.where(conhecidos, posicoes, len(codigos)), minlength=len(codigos) + 1)
+            novo = novo / max(len(valores), 1)
+            esperado = np.append(ref['proporcoes'], 0.0)
+        else:
+            novo = _proporcoes_faixas(valores, np.asarray(ref['limites']))
+            esperado = np.asarray(ref['proporcoes'])
+        novo = np.maximum(novo, _EPSILON)
+        esperado = np.maximum(esperado, _EPSILON)
+        psi[coluna] = float(np.sum((novo - esperado) * np.log(novo / esperado)))
+    return psi
@@ -0,0 +1,127 @@
+# Pipeline de features compartilhado entre o treino e a predicao
+#
+# As features derivadas (razoes e indicadores de quantis) sao calculadas
+# pelas mesmas funcoes no treino (Series do pandas), na API para um projeto
+# (escalares) e em lote (arrays NumPy). Os cortes de Alto_Valor e
+# Projeto_Longo aprendidos em preparar_dados vao para o manifesto do bundle;
+# bundles e pickles antigos, que nao os tem, usam CORTES_LEGADOS (os valores
+# fixos que a API usava ate entao).
+import numpy as np
+
+
+# Features numericas do modelo, na ordem de criar_features
+COLUNAS_NUMERICAS = [
+    'Project Cost',
+    'Project Benefit',
+    'Year',
+    'Month',
+    'Duracao_Dias',
+    'Benefit_Cost_Ratio',
+    'Custo_Por_Dia',
+    'Beneficio_Por_Dia',
+    'Alto_Valor',
+    'Projeto_Longo'
+]
+
+# Percentil dos cortes de Alto_Valor (beneficio) e Projeto_Longo (duracao)
+QUANTIL_CORTES = 0.75
+
+# Cortes aproximados usados antes de serem salvos no bundle
+CORTES_LEGADOS = {'Alto_Valor': 200000.0, 'Projeto_Longo': 200.0}
+
+
+def razoes(custo, beneficio, duracao):
+    """Benefit_Cost_Ratio, Custo_Por_Dia e Beneficio_Por_Dia (escalares, arrays ou Series)"""
+    return {
+        'Benefit_Cost_Ratio': beneficio / custo,
+        'Custo_Por_Dia': custo / duracao,
+        'Beneficio_Por_Dia': beneficio / duracao
+    }
+
+
+def indicadores(beneficio, duracao, cortes):
+    """Alto_Valor e Projeto_Longo (0/1) a partir dos cortes do treino"""
+    return {
+        'Alto_Valor': (beneficio > cortes['Alto_Valor']) * 1,
+        'Projeto_Longo': (duracao > cortes['Projeto_Longo']) * 1
+    }
+
+
+def compilar_encoders(label_encoders):
+    """
+    Compila cada LabelEncoder em uma tabela de consulta direta
+
+    Args:
+        label_encoders (dict): LabelEncoders salvos no treinamento
+
+    Returns:
+        dict: {feature: (dict valor -> codigo, codigo padrao, classe padrao)}
+    """
+    tabelas = {}
+    for cat_feature, encoder in label_encoders.items():
+        classes = [str(classe) for classe in encoder.classes_]
+        codigos = encoder.transform(encoder.classes_).tolist()
+        tabela = dict(zip(classes, codigos))
+        # Valor nao conhecido usa a classe mais comum (primeira)
+        tabelas[cat_feature] = (tabela, tabela[classes[0]], classes[0])
+    return tabelas
+
+
+class PipelineFeatures:
+    """Features do modelo a partir dos campos basicos, com os cortes e encoders do treino"""
+
+    def __init__(self, feature_names, label_encoders, cortes=None):
+        """
+        Args:
+            feature_names (list): Ordem das colunas esperada pelo modelo
+            label_encoders (dict): LabelEncoders das features categoricas
+            cortes (dict): Cortes de Alto_Valor e Projeto_Longo (None: CORTES_LEGADOS)
+        """
+        self.feature_names = list(feature_names)
+        self.legado = cortes is None
+        self.cortes = {nome: float(valor) for nome, valor in (cortes or CORTES_LEGADOS).items()}
+        self.tabelas_categoricas = compilar_encoders(label_encoders)
+        self._posicoes = list(enumerate(self.feature_names))
+
+    @classmethod
+    def do_manifesto(cls, manifesto, label_encoders):
+        """Pipeline salvo em um bundle (cortes legados se o manifesto nao os tiver)"""
+        return cls(manifesto['feature_names'], label_encoders, manifesto.get('cortes'))
+
+    def para_manifesto(self):
+        """Estado do pipeline gravado no manifesto do bundle"""
+        return {'cortes': dict(self.cortes)}
+
+    def calcular(self, base):
+        """
+        Completa as features derivadas
+
+        Args:
+            base (dict): Project Cost, Project Benefit, Year, Month, Duracao_Dias e
+                os codigos categoricos (escalares ou colunas)
+
+        Returns:
+            dict: Todas as features do modelo
+        """
+        features = dict(base)
+        features.update(razoes(base['Project Cost'], base['Project Benefit'], base['Duracao_Dias']))
+        features.update(indicadores(base['Project Benefit'], base['Duracao_Dias'], self.cortes))
+        return features
+
+    def linha(self, base):
+        """Matriz (1, n_features) de um projeto (None vira NaN)"""
+        features = self.calcular(base)
+        linha = np.empty((1, len(self.feature_names)))
+        valores = linha[0]
+        for i, nome in self._posicoes:
+            valor = features[nome]
+            valores[i] = np.nan if valor is None else valor
+        return linha
+
+    def matriz(self, base, n):
+        """Matriz (n, n_features) float64 a partir de colunas com n valores"""
+        features = self.calcular(base)
+        X = np.empty((n, len(self.feature_names)))
+        for i, nome in self._posicoes:
+            X[:, i] = features[nome]
+        return X
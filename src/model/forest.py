@@ -0,0 +1,282 @@
+# Representacao plana (em arrays NumPy) de uma RandomForest treinada
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # Kernel compilado e opcional
+    numba = None
+
+
+# Arrays que descrevem a floresta, na ordem em que sao salvos
+ARRAYS_FLORESTA = ('feature', 'threshold', 'esquerda', 'direita',
+                   'faltante_esquerda', 'valor', 'raizes', 'classes')
+
+
+def achatar_floresta(modelo):
+    """
+    Concatena todas as arvores de uma RandomForestClassifier em arrays contiguos
+
+    Os indices de filhos passam a ser globais (posicao no array concatenado)
+    e os valores das folhas ja saem normalizados como em predict_proba.
+
+    Args:
+        modelo (RandomForestClassifier): Floresta treinada
+
+    Returns:
+        dict: Arrays da floresta (ver ARRAYS_FLORESTA)
+    """
+    features, thresholds, esquerdas, direitas, faltantes, valores, raizes = [], [], [], [], [], [], []
+    deslocamento = 0
+
+    for arvore in modelo.estimators_:
+        tree = arvore.tree_
+        n_nos = tree.node_count
+        folha = tree.children_left == -1
+
+        # Mesma normalizacao de DecisionTreeClassifier.predict_proba
+        valor = tree.value[:, 0, :len(modelo.classes_)].astype(np.float64)
+        normalizador = valor.sum(axis=1)[:, np.newaxis]
+        normalizador[normalizador == 0.0] = 1.0
+
+        raizes.append(deslocamento)
+        features.append(np.where(folha, -1, tree.feature).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        esquerdas.append(np.where(folha, -1, tree.children_left + deslocamento).astype(np.int32))
+        direitas.append(np.where(folha, -1, tree.children_right + deslocamento).astype(np.int32))
+        faltantes.append(np.asarray(tree.missing_go_to_left, dtype=np.uint8))
+        valores.append(valor / normalizador)
+        deslocamento += n_nos
+
+    return {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'esquerda': np.concatenate(esquerdas),
+        'direita': np.concatenate(direitas),
+        'faltante_esquerda': np.concatenate(faltantes),
+        'valor': np.concatenate(valores),
+        'raizes': np.asarray(raizes, dtype=np.int32),
+        'classes': np.asarray(modelo.classes_)
+    }
+
+
+def concatenar_florestas(*florestas):
+    """
+    Junta arrays de varias florestas achatadas em uma so
+
+    Todas as arvores passam a ter o mesmo peso na media de predict_proba.
+
+    Args:
+        *florestas (dict): Arrays gerados por achatar_floresta (mesmas classes)
+
+    Returns:
+        dict: Arrays da floresta combinada
+    """
+    classes = np.asarray(florestas[0]['classes'])
+    partes = {nome: [] for nome in ARRAYS_FLORESTA if nome != 'classes'}
+    deslocamento = 0
+    for arrays in florestas:
+        if not np.array_equal(np.asarray(arrays['classes']), classes):
+            raise ValueError("Florestas com classes diferentes não podem ser combinadas")
+        folha = np.asarray(arrays['esquerda']) == -1
+        for nome in ('feature', 'threshold', 'faltante_esquerda', 'valor'):
+            partes[nome].append(np.asarray(arrays[nome]))
+        for nome in ('esquerda', 'direita'):
+            partes[nome].append(np.where(folha, -1, np.asarray(arrays[nome]) + deslocamento).astype(np.int32))
+        partes['raizes'].append(np.asarray(arrays['raizes']) + deslocamento)
+        deslocamento += len(arrays['feature'])
+
+    combinada = {nome: np.concatenate(lista) for nome, lista in partes.items()}
+    combinada['raizes'] = combinada['raizes'].astype(np.int32)
+    combinada['classes'] = classes
+    return combinada
+
+
+class FlorestaPlana:
+    """Avalia uma floresta achatada com NumPy, no lugar de predict_proba do sklearn"""
+
+    # Linhas avaliadas por vez no motor NumPy (limita a memoria temporaria)
+    TAMANHO_BLOCO = 2048
+
+    def __init__(self, arrays, motor='auto'):
+        """
+        Args:
+            arrays (dict): Arrays gerados por achatar_floresta (podem ser memmaps)
+            motor (str): 'numpy', 'numba' (kernel compilado, se instalado) ou 'auto'
+        """
+        self.arrays = arrays
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.esquerda = arrays['esquerda']
+        self.direita = arrays['direita']
+        self.faltante_esquerda = arrays['faltante_esquerda'].view(bool)
+        self.valor = arrays['valor']
+        self.raizes = arrays['raizes']
+        self.classes_ = np.asarray(arrays['classes'])
+        self.n_estimators = len(self.raizes)
+        self.profundidade = _profundidade_maxima(self.raizes, self.esquerda, self.direita)
+
+        if motor == 'auto':
+            motor = 'numba' if numba is not None else 'numpy'
+        if motor == 'numba' and numba is None:
+            raise ImportError("Motor 'numba' requer o pacote numba instalado")
+        self.motor = motor
+
+    def predict_proba(self, X):
+        """
+        Calcula as probabilidades medias das arvores para cada linha de X
+
+        Returns:
+            np.ndarray: Matriz (n_linhas, n_classes)
+        """
+        # O sklearn compara as features em float32 com thresholds em float64
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if self.motor == 'numba':
+            return _avaliar_numba(X, self.feature, self.threshold, self.esquerda, self.direita,
+                                  self.faltante_esquerda, self.valor, self.raizes)
+
+        proba = np.empty((X.shape[0], len(self.classes_)))
+        for inicio in range(0, X.shape[0], self.TAMANHO_BLOCO):
+            bloco = slice(inicio, inicio + self.TAMANHO_BLOCO)
+            proba[bloco] = self._avaliar_bloco(X[bloco])
+        return proba
+
+    def _avaliar_bloco(self, X):
+        """Desce todas as arvores ao mesmo tempo, um nivel por iteracao"""
+        n = X.shape[0]
+        linhas = np.arange(n)[:, np.newaxis]
+        nos = np.broadcast_to(self.raizes.astype(np.int64), (n, self.n_estimators)).copy()
+
+        for _ in range(self.profundidade):
+            f = self.feature[nos]
+            internos = f >= 0
+            x = X[linhas, np.maximum(f, 0)]
+            vai_esquerda = (x <= self.threshold[nos]) | (np.isnan(x) & self.faltante_esquerda[nos])
+            proximo = np.where(vai_esquerda, self.esquerda[nos], self.direita[nos])
+            nos = np.where(internos, proximo, nos)
+
+        return self.valor[nos].sum(axis=1) / self.n_estimators
+
+    def predict(self, X):
+        """Classe mais provavel para cada linha de X"""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _profundidade_maxima(raizes, esquerda, direita):
+    """Maior numero de decisoes entre uma raiz e uma folha"""
+    profundidade = 0
+    nivel = np.asarray(raizes, dtype=np.int64)
+    while True:
+        nivel = nivel[esquerda[nivel] >= 0]
+        if len(nivel) == 0:
+            return profundidade
+        profundidade += 1
+        nivel = np.concatenate([esquerda[nivel], direita[nivel]]).astype(np.int64)
+
+
+if numba is not None:
+    # O cache em disco do numba guarda o nome do modulo que compilou o kernel;
+    # so e usado quando importado pelo pacote (model.forest), para nao misturar
+    # com execucoes como script (python src/model/train.py), que importam 'forest'
+    @numba.njit(parallel=True, cache=bool(__package__))
+    def _avaliar_numba(X, feature, threshold, esquerda, direita, faltante_esquerda, valor, raizes):
+        n, n_classes = X.shape[0], valor.shape[1]
+        proba = np.zeros((n, n_classes))
+        # Blocos de linhas em paralelo; dentro do bloco, uma arvore por vez
+        # para que os nos da arvore continuem no cache da CPU
+        bloco = 256
+        for b in numba.prange((n + bloco - 1) // bloco):
+            fim = min(n, (b + 1) * bloco)
+            for raiz in raizes:
+                for i in range(b * bloco, fim):
+                    no = raiz
+                    while feature[no] >= 0:
+                        x = X[i, feature[no]]
+                        if x <= threshold[no]:
+                            no = esquerda[no]
+                        elif np.isnan(x):
+                            no = esquerda[no] if faltante_esquerda[no] else direita[no]
+                        else:
+                            no = direita[no]
+                    for c in range(n_classes):
+                        proba[i, c] += valor[no, c]
+        return proba / len(raizes)
+else:
+    _avaliar_numba = None
+
+
+def exportar_floresta(modelo, X_referencia, tolerancia=1e-9):
+    """
+    Achata a floresta treinada e confere o resultado contra o sklearn
+
+    Args:
+        modelo (RandomForestClassifier): Floresta treinada
+        X_referencia: Linhas usadas na conferencia (ex.: a matriz de treino)
+        tolerancia (float): Maior diferenca absoluta aceita nas probabilidades
+
+    Returns:
+        tuple: (FlorestaPlana, maior diferenca encontrada)
+    """
+    plana = FlorestaPlana(achatar_floresta(modelo))
+    X = np.asarray(X_referencia, dtype=np.float64)
+    diferenca = float(np.abs(plana.predict_proba(X) - modelo.predict_proba(X)).max())
+    if diferenca > tolerancia:
+        raise ValueError(f"Floresta plana difere do sklearn em {diferenca:.2e} (> {tolerancia:.0e})")
+    return plana, diferenca
+
+
+def hash_arquivo(caminho):
+    """SHA-256 do conteudo de um arquivo"""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def salvar_floresta(arrays, diretorio, origem=None):
+    """
+    Salva os arrays da floresta como .npy sem compressao (mapeaveis em memoria)
+
+    A escrita acontece em um diretorio temporario renomeado no final, para
+    que varios workers possam exportar ao mesmo tempo sem se atrapalhar.
+
+    Args:
+        arrays (dict): Arrays gerados por achatar_floresta
+        diretorio (str): Diretorio de destino
+        origem (dict): Metadados opcionais gravados em origem.json
+    """
+    pai = os.path.dirname(os.path.abspath(diretorio))
+    os.makedirs(pai, exist_ok=True)
+    temporario = tempfile.mkdtemp(dir=pai, prefix='.floresta-')
+    try:
+        for nome in ARRAYS_FLORESTA:
+            np.save(os.path.join(temporario, f'{nome}.npy'), np.ascontiguousarray(arrays[nome]))
+        with open(os.path.join(temporario, 'origem.json'), 'w') as f:
+            json.dump(origem or {}, f)
+        os.rename(temporario, diretorio)
+    except OSError:
+        # Outro processo ja exportou a mesma floresta
+        shutil.rmtree(temporario, ignore_errors=True)
+        if not os.path.isdir(diretorio):
+            raise
+
+
+def carregar_floresta(diretorio, mmap=True):
+    """
+    Carrega uma floresta salva por salvar_floresta
+
+    Com mmap=True os arrays sao mapeados somente-leitura: processos que
+    carregam o mesmo diretorio compartilham as mesmas paginas de memoria.
+
+    Returns:
+        FlorestaPlana: Floresta pronta para predict_proba
+    """
+    modo = 'r' if mmap else None
+    arrays = {nome: np.load(os.path.join(diretorio, f'{nome}.npy'), mmap_mode=modo)
+              for nome in ARRAYS_FLORESTA}
+    return FlorestaPlana(arrays)
@@ -0,0 +1,241 @@
+# Atualizacao incremental do modelo com projetos recem-encerrados
+#
+# Le apenas o CSV com os projetos novos (mesmo formato do dataset de treino)
+# e atualiza o bundle salvo com custo proporcional ao tamanho do lote:
+#   - Scaler: media e variancia combinadas com as do historico (formula de Chan)
+#   - Random Forest: arvores novas crescidas so no lote, em numero proporcional
+#     a fracao do lote no total de projetos vistos, somadas a floresta atual
+#   - Logistic Regression: coeficientes atuais como ponto de partida e ancora
+#     (L2 em torno deles, proporcional ao historico) e L-BFGS sobre o lote
+# Antes de atualizar, o lote e comparado com a distribuicao do treino (PSI):
+# drift forte ou categorias desconhecidas pedem um treino completo.
+#
+# Uso (a partir da raiz do projeto):
+#   python src/model/incremental.py novos_projetos.csv [--forcar]
+import time
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from scipy.special import expit, log_expit
+from sklearn.ensemble import RandomForestClassifier
+
+try:
+    from .bundle import EscalonadorPlano, RegressaoLogisticaPlana, carregar_bundle, salvar_bundle
+    from .drift import LIMITE_PSI, calcular_psi
+    from .features import indicadores
+    from .forest import FlorestaPlana, achatar_floresta, concatenar_florestas
+    from .predict import CAMINHO_BUNDLE
+    from .train import COLUNAS_CATEGORICAS, limpar_bloco, modelos_candidatos
+except ImportError:  # Executado como script
+    from bundle import EscalonadorPlano, RegressaoLogisticaPlana, carregar_bundle, salvar_bundle
+    from drift import LIMITE_PSI, calcular_psi
+    from features import indicadores
+    from forest import FlorestaPlana, achatar_floresta, concatenar_florestas
+    from predict import CAMINHO_BUNDLE
+    from train import COLUNAS_CATEGORICAS, limpar_bloco, modelos_candidatos
+
+
+# Chaves do manifesto geradas pelo próprio salvar_bundle (não são repassadas como extras)
+_CHAVES_BUNDLE = ('formato', 'criado_em', 'tipo_modelo', 'threshold', 'feature_names',
+                  'classes_categoricas', 'arrays', 'sha256')
+
+# Curvatura média da log-loss em features padronizadas (p * (1 - p) <= 0.25):
+# aproxima quanto o histórico "segura" cada coeficiente
+CURVATURA_HISTORICO = 0.25
+
+
+def preparar_novos(df, artefatos):
+    """
+    Limpa e codifica os projetos novos com os cortes e encoders do treino
+
+    Returns:
+        tuple: (X como DataFrame na ordem de feature_names, y, categorias desconhecidas)
+    """
+    manifesto = artefatos['manifesto']
+    data = limpar_bloco(df.copy())
+    for nome, coluna in indicadores(data['Project Benefit'], data['Duracao_Dias'], manifesto['cortes']).items():
+        data[nome] = coluna
+
+    X = pd.DataFrame(index=data.index)
+    desconhecidas = {}
+    for coluna in artefatos['feature_names']:
+        if coluna in COLUNAS_CATEGORICAS:
+            classes = list(artefatos['label_encoders'][coluna].classes_)
+            codigos = {valor: i for i, valor in enumerate(classes)}
+            valores = data[coluna].astype(str)
+            X[coluna] = valores.map(codigos).fillna(-1).astype(int)
+            faltando = sorted(set(valores) - set(classes))
+            if faltando:
+                desconhecidas[coluna] = faltando
+        else:
+            X[coluna] = data[coluna].astype(float)
+    return X.reset_index(drop=True), data['Sucesso'].to_numpy(), desconhecidas
+
+
+def atualizar_escalonador(scaler, n_historico, X):
+    """
+    Combina média e variância do histórico com as do lote (como StandardScaler.partial_fit)
+
+    Returns:
+        EscalonadorPlano: Escalonador equivalente a um ajuste em histórico + lote
+    """
+    X = np.asarray(X, dtype=np.float64)
+    n_novo = len(X)
+    var_antiga = scaler.var_ if scaler.var_ is not None else np.asarray(scaler.scale_) ** 2
+    media_lote = X.mean(axis=0)
+    var_lote = X.var(axis=0)
+
+    n_total = n_historico + n_novo
+    delta = media_lote - scaler.mean_
+    media = scaler.mean_ + delta * n_novo / n_total
+    var = (var_antiga * n_historico + var_lote * n_novo + delta ** 2 * n_historico * n_novo / n_total) / n_total
+    # Mesmo tratamento de variância zero do StandardScaler
+    escala = np.sqrt(var)
+    escala[escala < 10 * np.finfo(escala.dtype).eps] = 1.0
+    return EscalonadorPlano(media, escala, var)
+
+
+def atualizar_logistica(modelo, scaler_antigo, scaler_novo, X, y, n_historico):
+    """
+    Atualiza a Logistic Regression com o lote, partindo dos coeficientes atuais
+
+    Minimiza a log-loss do lote (classes balanceadas) mais uma penalidade L2
+    em torno dos coeficientes atuais com peso CURVATURA_HISTORICO * n_historico.
+
+    Returns:
+        RegressaoLogisticaPlana: Modelo atualizado (no espaço do scaler novo)
+    """
+    # Reescreve os coeficientes para o scaler novo sem mudar as predições
+    peso_bruto = np.ravel(modelo.coef_) / scaler_antigo.scale_
+    intercepto_bruto = float(np.ravel(modelo.intercept_)[0]) - peso_bruto @ scaler_antigo.mean_
+    inicial = np.append(peso_bruto * scaler_novo.scale_, intercepto_bruto + peso_bruto @ scaler_novo.mean_)
+
+    Xs = np.column_stack([scaler_novo.transform(X), np.ones(len(X))])
+    alvo = np.where(y == 1, 1.0, -1.0)
+    contagens = {c: np.sum(y == c) for c in np.unique(y)}
+    pesos = np.array([len(y) / (len(contagens) * contagens[c]) for c in y])
+    ancora = CURVATURA_HISTORICO * n_historico
+
+    def objetivo(theta):
+        margem = alvo * (Xs @ theta)
+        perda = -np.sum(pesos * log_expit(margem))
+        gradiente = -Xs.T @ (pesos * alvo * expit(-margem))
+        diferenca = theta - inicial
+        return perda + 0.5 * ancora * diferenca @ diferenca, gradiente + ancora * diferenca
+
+    resultado = minimize(objetivo, inicial, jac=True, method='L-BFGS-B')
+    return RegressaoLogisticaPlana(resultado.x[np.newaxis, :-1], resultado.x[-1:], np.asarray(modelo.classes_))
+
+
+def adicionar_arvores(floresta, X, y, n_historico, parametros=None, semente=None):
+    """
+    Cresce árvores novas no lote e as soma à floresta atual
+
+    O número de árvores novas é proporcional à fração do lote no total de
+    projetos, para que cada projeto pese o mesmo na média das árvores.
+
+    Returns:
+        tuple: (FlorestaPlana combinada, número de árvores novas)
+    """
+    parametros = dict(parametros or modelos_candidatos()['Random Forest'].get_params())
+    n_arvores = max(1, round(floresta.n_estimators * len(X) / n_historico))
+    parametros.update(n_estimators=n_arvores, n_jobs=None, warm_start=False,
+                      random_state=semente if semente is not None else n_historico)
+    novas = RandomForestClassifier(**parametros).fit(np.asarray(X, dtype=np.float64), y)
+    arrays = concatenar_florestas(floresta.arrays, achatar_floresta(novas))
+    return FlorestaPlana(arrays, motor=floresta.motor), n_arvores
+
+
+def atualizar_modelo(caminho_novos, caminho_bundle=CAMINHO_BUNDLE, destino=None, limite_psi=LIMITE_PSI,
+                     forcar=False):
+    """
+    Atualiza o bundle com um lote de projetos encerrados
+
+    Args:
+        caminho_novos (str): CSV só com os projetos novos
+        caminho_bundle (str): Bundle atual
+        destino (str): Onde gravar o bundle atualizado (padrão: o próprio)
+        limite_psi (float): PSI a partir do qual o lote pede um treino completo
+        forcar (bool): Atualiza mesmo com drift (categorias novas nunca são aceitas)
+
+    Returns:
+        dict: Resumo: atualizado, retreino_completo, motivo, psi, linhas, segundos...
+    """
+    inicio = time.perf_counter()
+    # Fora da API: vale conferir o hash antes de gravar um bundle derivado deste
+    artefatos = carregar_bundle(caminho_bundle, verificar=True)
+    manifesto = artefatos['manifesto']
+    if any(chave not in manifesto for chave in ('cortes', 'amostras_vistas', 'referencia_drift')):
+        raise ValueError("Bundle sem estado para atualização incremental: faça um treino completo")
+
+    X, y, desconhecidas = preparar_novos(pd.read_csv(caminho_novos), artefatos)
+    resumo = {'atualizado': False, 'retreino_completo': False, 'linhas': len(X)}
+    if len(X) == 0:
+        resumo['motivo'] = "Nenhum projeto encerrado no lote"
+        return resumo
+
+    psi = calcular_psi(manifesto['referencia_drift'], X)
+    resumo['psi'] = psi
+    resumo['taxa_sucesso'] = float(np.mean(y))
+    maior = max(psi, key=psi.get)
+
+    if desconhecidas:
+        resumo.update(retreino_completo=True,
+                      motivo=f"Categorias desconhecidas pelos encoders: {desconhecidas}")
+        return resumo
+    if psi[maior] > limite_psi and not forcar:
+        resumo.update(retreino_completo=True, motivo=f"Drift em {maior} (PSI {psi[maior]:.3f} > {limite_psi})")
+        return resumo
+
+    n_historico = int(manifesto['amostras_vistas'])
+    scaler = atualizar_escalonador(artefatos['scaler'], n_historico, X)
+    modelo = artefatos['modelo']
+    if isinstance(modelo, FlorestaPlana):
+        if len(np.unique(y)) < 2:
+            resumo['motivo'] = "Lote com uma única classe: árvores novas não foram criadas"
+            return resumo
+        modelo, resumo['arvores_novas'] = adicionar_arvores(modelo, X, y, n_historico,
+                                                            _parametros_floresta(manifesto))
+    else:
+        modelo = atualizar_logistica(modelo, artefatos['scaler'], scaler, X, y, n_historico)
+
+    extras = {k: v for k, v in manifesto.items() if k not in _CHAVES_BUNDLE}
+    extras['amostras_vistas'] = n_historico + len(X)
+    extras['atualizacoes_incrementais'] = manifesto.get('atualizacoes_incrementais', 0) + 1
+    extras['ultima_atualizacao'] = {'linhas': len(X), 'psi_maximo': psi[maior], 'versao_anterior': manifesto['sha256'][:12]}
+
+    novo = salvar_bundle(destino or caminho_bundle, modelo, scaler, artefatos['label_encoders'],
+                         artefatos['feature_names'], artefatos['threshold'], extras=extras,
+                         curva_threshold=artefatos['curva_threshold'])
+    resumo.update(atualizado=True, versao_modelo=novo['sha256'][:12],
+                  motivo=f"Atualizado com {len(X)} projetos (PSI máximo {psi[maior]:.3f} em {maior})")
+    resumo['segundos'] = time.perf_counter() - inicio
+    return resumo
+
+
+def _parametros_floresta(manifesto):
+    """Hiperparâmetros da floresta do treino (da busca, se houve) para as árvores novas"""
+    parametros = modelos_candidatos()['Random Forest'].get_params()
+    parametros.update(manifesto.get('hiperparametros', {}))
+    return parametros
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Atualiza o modelo com projetos recém-encerrados")
+    parser.add_argument('novos', help="CSV com os projetos novos (formato do dataset de treino)")
+    parser.add_argument('--bundle', default=CAMINHO_BUNDLE, help="Bundle a atualizar")
+    parser.add_argument('--limite-psi', type=float, default=LIMITE_PSI,
+                        help="PSI a partir do qual é pedido um treino completo")
+    parser.add_argument('--forcar', action='store_true', help="Atualiza mesmo com drift")
+    args = parser.parse_args()
+
+    resumo = atualizar_modelo(args.novos, args.bundle, limite_psi=args.limite_psi, forcar=args.forcar)
+    if resumo['atualizado']:
+        print(f"✅ {resumo['motivo']} em {resumo['segundos']:.2f} s (versão {resumo['versao_modelo']})")
+    elif resumo['retreino_completo']:
+        print(f"⚠️  Treino completo necessário: {resumo['motivo']}")
+        print("   uv run python src/model/train.py")
+    else:
+        print(f"ℹ️  Modelo não atualizado: {resumo['motivo']}")
@@ -0,0 +1,242 @@
+# Execucao de tarefas de treino em um pool de processos
+#
+# As matrizes de treino sao gravadas uma unica vez em .npy e cada worker as
+# abre com mmap somente-leitura no initializer do pool. As tarefas enviadas
+# aos workers carregam apenas indices e parametros, nunca os dados.
+#
+# executar_em_grupos entrega cada grupo de tarefas (um modelo candidato)
+# assim que ele termina e descarta grupos que passam do timeout: o pool e
+# recriado sem as tarefas do grupo descartado, que ficariam ocupando workers.
+import contextlib
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+import numpy as np
+
+
+# Matrizes compartilhadas visiveis dentro do processo (preenchidas pelo initializer)
+_MATRIZES = {}
+
+# Fila em que os workers avisam o proprio PID, no initializer, e o inicio de
+# cada tarefa (executar_em_grupos): (None, pid) ou (indice da tarefa, horario)
+_AVISOS = None
+
+# Intervalo de verificacao dos timeouts, em segundos
+INTERVALO_TIMEOUT = 0.1
+
+
+def matriz(nome):
+    """Matriz compartilhada pelo nome, dentro de uma tarefa"""
+    return _MATRIZES[nome]
+
+
+def _inicializar(caminhos, avisos=None):
+    """Initializer do pool: mapeia as matrizes somente-leitura"""
+    global _AVISOS
+    _AVISOS = avisos
+    if avisos is not None:
+        avisos.put((None, os.getpid()))
+    for nome, caminho in caminhos.items():
+        _MATRIZES[nome] = np.load(caminho, mmap_mode='r')
+
+
+def _cronometrar(funcao, tarefa):
+    """Executa a tarefa e devolve (resultado, segundos gastos)"""
+    inicio = time.perf_counter()
+    resultado = funcao(tarefa)
+    return resultado, time.perf_counter() - inicio
+
+
+def _cronometrar_avisando(funcao, indice, tarefa):
+    """Como _cronometrar, avisando o processo principal do inicio da tarefa"""
+    _AVISOS.put((indice, time.time()))
+    return _cronometrar(funcao, tarefa)
+
+
+def _contexto():
+    """
+    Processos iniciados sem fork do processo atual
+
+    Um fork depois que bibliotecas com threads proprias (numba, BLAS) ja
+    rodaram pode travar o filho; forkserver/spawn partem de um processo limpo.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+@contextlib.contextmanager
+def _matrizes_locais(matrizes):
+    """Disponibiliza as matrizes para tarefas executadas no proprio processo"""
+    anteriores = dict(_MATRIZES)
+    _MATRIZES.update({nome: np.asarray(m) for nome, m in matrizes.items()})
+    try:
+        yield
+    finally:
+        _MATRIZES.clear()
+        _MATRIZES.update(anteriores)
+
+
+def _gravar_matrizes(matrizes, pasta):
+    """Grava cada matriz em .npy para os workers mapearem; devolve {nome: caminho}"""
+    caminhos = {}
+    for nome, m in matrizes.items():
+        caminhos[nome] = os.path.join(pasta, f'{nome}.npy')
+        np.save(caminhos[nome], np.ascontiguousarray(m))
+    return caminhos
+
+
+def _ler_avisos(avisos, pids, inicios):
+    """Esvazia a fila de avisos: PIDs dos workers e horario de inicio de cada tarefa"""
+    while not avisos.empty():
+        i, valor = avisos.get()
+        if i is None:
+            pids.add(valor)
+        else:
+            inicios.setdefault(i, valor)
+
+
+def _encerrar(pool, avisos, pids):
+    """Encerra o pool sem esperar as tarefas em execucao"""
+    pool.shutdown(wait=False, cancel_futures=True)
+    # Tarefas ja em execucao so param com o fim do worker: PIDs avisados no initializer
+    _ler_avisos(avisos, pids, {})
+    for pid in pids:
+        with contextlib.suppress(ProcessLookupError):
+            os.kill(pid, signal.SIGTERM)
+
+
+def numero_workers(workers=None):
+    """Workers do pool: argumento, variavel TREINO_WORKERS ou numero de CPUs"""
+    if workers is None:
+        workers = int(os.getenv('TREINO_WORKERS', '0')) or os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def executar_tarefas(funcao, tarefas, matrizes, workers=None):
+    """
+    Executa funcao(tarefa) para cada tarefa, em paralelo
+
+    Args:
+        funcao (callable): Funcao de modulo (precisa ser importavel pelos workers)
+        tarefas (list): Parametros de cada tarefa (pequenos: vao por pickle)
+        matrizes (dict): Arrays compartilhados, lidos nas tarefas com matriz(nome)
+        workers (int): Processos do pool; 1 executa no proprio processo
+
+    Returns:
+        list: (resultado, segundos) na mesma ordem das tarefas
+    """
+    workers = min(numero_workers(workers), len(tarefas)) or 1
+
+    if workers == 1:
+        with _matrizes_locais(matrizes):
+            return [_cronometrar(funcao, tarefa) for tarefa in tarefas]
+
+    with tempfile.TemporaryDirectory(prefix='treino-') as pasta:
+        caminhos = _gravar_matrizes(matrizes, pasta)
+        resultados = [None] * len(tarefas)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_contexto(),
+                                 initializer=_inicializar, initargs=(caminhos,)) as pool:
+            futuros = {pool.submit(_cronometrar, funcao, tarefa): i for i, tarefa in enumerate(tarefas)}
+            for futuro in as_completed(futuros):
+                resultados[futuros[futuro]] = futuro.result()
+        return resultados
+
+
+def executar_em_grupos(funcao, tarefas, matrizes, workers=None, grupo='nome', timeout=None):
+    """
+    Executa as tarefas e entrega cada grupo assim que todas as suas tarefas terminam
+
+    O timeout de um grupo conta a partir do inicio da sua primeira tarefa.
+    Um grupo que passa do timeout e descartado: suas tarefas na fila sao
+    canceladas e, se alguma ja estiver rodando, o pool e recriado sem elas.
+    Com timeout as tarefas sempre rodam no pool (mesmo com 1 worker), pois
+    uma tarefa no proprio processo nao pode ser interrompida.
+
+    Args:
+        funcao (callable): Funcao de modulo (precisa ser importavel pelos workers)
+        tarefas (list): Dicionarios de parametros de cada tarefa
+        matrizes (dict): Arrays compartilhados, lidos nas tarefas com matriz(nome)
+        workers (int): Processos do pool
+        grupo (str): Chave da tarefa que identifica o grupo
+        timeout (float): Segundos maximos por grupo (None: sem limite)
+
+    Yields:
+        tuple: (grupo, [(resultado, segundos)] na ordem das tarefas do grupo),
+            ou (grupo, None) quando o grupo e descartado pelo timeout
+    """
+    membros = {}
+    for i, tarefa in enumerate(tarefas):
+        membros.setdefault(tarefa[grupo], []).append(i)
+    workers = min(numero_workers(workers), len(tarefas)) or 1
+
+    if workers == 1 and timeout is None:
+        with _matrizes_locais(matrizes):
+            for nome, indices in membros.items():
+                yield nome, [_cronometrar(funcao, tarefas[i]) for i in indices]
+        return
+
+    resultados = {}
+    restantes = {nome: len(indices) for nome, indices in membros.items()}
+    inicios = {}
+    descartados = set()
+
+    with tempfile.TemporaryDirectory(prefix='treino-') as pasta:
+        caminhos = _gravar_matrizes(matrizes, pasta)
+        contexto = _contexto()
+        a_executar = list(range(len(tarefas)))
+
+        while a_executar:
+            avisos = contexto.SimpleQueue()
+            pool = ProcessPoolExecutor(max_workers=min(workers, len(a_executar)), mp_context=contexto,
+                                       initializer=_inicializar, initargs=(caminhos, avisos))
+            pendentes = {}
+            pids = set()
+            recriar = False
+            try:
+                for i in a_executar:
+                    pendentes[pool.submit(_cronometrar_avisando, funcao, i, tarefas[i])] = i
+
+                while pendentes and not recriar:
+                    feitos, _ = wait(pendentes, timeout=INTERVALO_TIMEOUT if timeout else None,
+                                     return_when=FIRST_COMPLETED)
+                    inicios_tarefas = {}
+                    _ler_avisos(avisos, pids, inicios_tarefas)
+                    for i, inicio in inicios_tarefas.items():
+                        inicios.setdefault(tarefas[i][grupo], inicio)
+
+                    for futuro in feitos:
+                        i = pendentes.pop(futuro)
+                        nome = tarefas[i][grupo]
+                        if nome in descartados:
+                            continue
+                        resultados[i] = futuro.result()
+                        restantes[nome] -= 1
+                        if restantes[nome] == 0:
+                            yield nome, [resultados.pop(j) for j in membros[nome]]
+
+                    if timeout is None:
+                        continue
+                    agora = time.time()
+                    for nome, inicio in inicios.items():
+                        if nome in descartados or restantes[nome] == 0 or agora - inicio <= timeout:
+                            continue
+                        descartados.add(nome)
+                        for futuro, i in list(pendentes.items()):
+                            if tarefas[i][grupo] == nome and futuro.cancel():
+                                del pendentes[futuro]
+                        # Tarefas do grupo já em execução só param com um pool novo
+                        recriar = any(tarefas[i][grupo] == nome for i in pendentes.values())
+                        yield nome, None
+                        if recriar:
+                            break
+
+                a_executar = sorted(i for i in pendentes.values() if tarefas[i][grupo] not in descartados)
+            finally:
+                if pendentes:
+                    _encerrar(pool, avisos, pids)
+                else:
+                    pool.shutdown()
@@ -2,30 +2,133 @@
 import pandas as pd
 import numpy as np
 import joblib
+import os
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from .bundle import carregar_bundle
+    from .features import PipelineFeatures
+    from .forest import achatar_floresta, carregar_floresta, hash_arquivo, salvar_floresta
+    from .recomendacoes import MotorRecomendacoes, mensagens
+except ImportError:  # Executado como script (python src/model/predict.py)
+    from bundle import carregar_bundle
+    from features import PipelineFeatures
+    from forest import achatar_floresta, carregar_floresta, hash_arquivo, salvar_floresta
+    from recomendacoes import MotorRecomendacoes, mensagens
+
+
+# Bundle unico gerado pelo treinamento (tem prioridade sobre os pickles legados)
+CAMINHO_BUNDLE = 'models/modelo_projetos.bundle'
+
+
+# Features categoricas do modelo e o campo de entrada correspondente
+MAPEAMENTO_CAMPOS = {
+    'Project Type': 'project_type',
+    'Region': 'region',
+    'Department': 'department',
+    'Complexity': 'complexity',
+    'Phase': 'phase'
+}
+
+
+def _converter_data(valor):
+    """
+    Converte uma data para datetime (ISO direto, pandas apenas como reserva)
+
+    A API so aceita YYYY-MM-DD, mas prever tambem e chamado direto (scripts,
+    linhas nao vetorizaveis de prever_lote) e sempre aceitou qualquer data
+    que o pandas interpreta, como o M/D/YYYY do CSV de treino. O pandas so
+    roda nesse caso; datas ISO nao passam por ele.
+    """
+    if isinstance(valor, str):
+        try:
+            return datetime.fromisoformat(valor)
+        except ValueError:
+            pass
+    return pd.to_datetime(valor)
+
+
+def _converter_datas(valores):
+    """Converte uma coluna de datas ISO para datetime64 (invalidas viram NaT)"""
+    try:
+        return np.array(valores, dtype='datetime64[s]')
+    except (ValueError, TypeError):
+        # Pelo menos uma data fora do padrao: converter uma a uma
+        datas = np.full(len(valores), np.datetime64('NaT'), dtype='datetime64[s]')
+        for i, valor in enumerate(valores):
+            try:
+                datas[i] = np.datetime64(valor, 's')
+            except (ValueError, TypeError):
+                pass
+        return datas
+
+
+def _coluna_numerica(lista_dados, campo, padrao=None):
+    """
+    Extrai um campo numerico de todos os projetos
+
+    Returns:
+        tuple: (coluna float64 com NaN para None, mascara dos valores numericos ou None)
+    """
+    valores = [d.get(campo, padrao) for d in lista_dados]
+    aceitos = np.fromiter((v is None or isinstance(v, (int, float)) for v in valores),
+                          dtype=bool, count=len(valores))
+    coluna = np.array([v if ok else None for v, ok in zip(valores, aceitos)], dtype=float)
+    return coluna, aceitos
+
 
 class PreditorProjetos:
     """Classe para fazer predicoes de sucesso de projetos - VERSÃO CORRIGIDA"""
 
-    def __init__(self):
-        """Inicializa o preditor carregando o modelo"""
+    def __init__(self, compartilhado=False, caminho_bundle=CAMINHO_BUNDLE, cache=None, verificar_bundle=False):
+        """
+        Inicializa o preditor carregando o modelo
+
+        Args:
+            compartilhado (bool): Com os pickles legados, usa a floresta achatada e
+                mapeada em memoria, cujas paginas sao compartilhadas entre processos
+                (uvicorn --workers N). O bundle e sempre mapeado em memoria.
+            caminho_bundle (str): Bundle do modelo; se nao existir, usa os pickles legados
+            cache (CachePredicoes): Cache opcional de resultados, indexado pelas
+                features ja calculadas (e nao pelo payload bruto)
+            verificar_bundle (bool): Confere o hash SHA-256 do bundle inteiro na
+                carga (a partida deixa de ser independente do tamanho do arquivo)
+        """
+        self.compartilhado = compartilhado
+        self.cache = cache
+        self.caminho_bundle = caminho_bundle
+        self.verificar_bundle = verificar_bundle
+        self.manifesto = None
+        self.versao_modelo = None
         self.modelo = None
         self.scaler = None
         self.label_encoders = None
         self.feature_names = None
+        self.pipeline = None
+        self.tabelas_categoricas = None
+        self.motor_recomendacoes = None
         self.threshold = 0.5  # Default, será carregado do arquivo
         self._carregar_modelo()
 
     def _carregar_modelo(self):
         """Carrega o modelo e componentes salvos"""
+        if self.caminho_bundle and os.path.exists(self.caminho_bundle):
+            self._carregar_bundle(self.caminho_bundle)
+            return
+
         try:
-            self.modelo = joblib.load('models/modelo_projetos.pkl')
+            if self.compartilhado:
+                self.modelo = self._carregar_floresta_compartilhada('models/modelo_projetos.pkl')
+            else:
+                self.modelo = joblib.load('models/modelo_projetos.pkl')
             self.scaler = joblib.load('models/scaler.pkl')
             self.label_encoders = joblib.load('models/label_encoders.pkl')
             self.feature_names = joblib.load('models/feature_names.pkl')
+            # Pickles não guardam os cortes de quantis: valores fixos antigos
+            self._compilar_pipeline(PipelineFeatures(self.feature_names, self.label_encoders))
+            self.versao_modelo = hash_arquivo('models/modelo_projetos.pkl')[:12]
 
             # ✅ CORREÇÃO: Carregar threshold otimizado
             try:
@@ -39,70 +142,224 @@ class PreditorProjetos:
             print("❌ Erro: Modelo não encontrado. Execute train.py primeiro!")
             raise
 
-    def preparar_entrada(self, dados_projeto):
+    def _carregar_bundle(self, caminho):
+        """Carrega todos os artefatos de um bundle unico (um open e um mmap)"""
+        artefatos = carregar_bundle(caminho, verificar=self.verificar_bundle)
+        self.modelo = artefatos['modelo']
+        self.scaler = artefatos['scaler']
+        self.label_encoders = artefatos['label_encoders']
+        self.feature_names = artefatos['feature_names']
+        self.threshold = artefatos['threshold']
+        self.manifesto = artefatos['manifesto']
+        self.versao_modelo = self.manifesto['sha256'][:12]
+        self._compilar_pipeline(artefatos['pipeline'])
+        print(f"✅ Modelo carregado do bundle {self.versao_modelo} "
+              f"com threshold otimizado: {self.threshold}")
+
+    def _compilar_pipeline(self, pipeline):
+        """Usa o pipeline de features do treino (avisa se os cortes forem os legados)"""
+        self.pipeline = pipeline
+        self.tabelas_categoricas = pipeline.tabelas_categoricas
+        self.motor_recomendacoes = MotorRecomendacoes(pipeline.feature_names)
+        if pipeline.legado:
+            print(f"ℹ️  Modelo sem cortes de quantis salvos: usando os valores antigos {pipeline.cortes}")
+
+    def _carregar_floresta_compartilhada(self, caminho_modelo):
+        """
+        Carrega a Random Forest como arrays planos mapeados em memoria
+
+        Na primeira vez a floresta e exportada para models/floresta_plana/<hash>;
+        os processos seguintes apenas mapeiam os mesmos arquivos, sem
+        deserializar o modelo do sklearn.
         """
-        Prepara os dados de entrada para predicao - VERSÃO CORRIGIDA
+        versao = hash_arquivo(caminho_modelo)
+        diretorio = os.path.join('models', 'floresta_plana', versao[:16])
+
+        if not os.path.isdir(diretorio):
+            modelo = joblib.load(caminho_modelo)
+            if not hasattr(modelo, 'estimators_'):
+                # Logistic Regression e pequena: segue o carregamento normal
+                return modelo
+            salvar_floresta(achatar_floresta(modelo), diretorio,
+                            origem={'modelo': caminho_modelo, 'sha256': versao})
+            print(f"✅ Floresta exportada para {diretorio}")
+
+        print(f"✅ Floresta mapeada em memória a partir de {diretorio}")
+        return carregar_floresta(diretorio, mmap=True)
+
+    def preparar_linha(self, dados_projeto):
+        """
+        Prepara os dados de entrada para predicao, sem DataFrame
+
+        Calcula as features pelo mesmo pipeline do treino e as escreve direto
+        em uma linha float64 pre-alocada, na ordem de feature_names.
 
         Args:
             dados_projeto (dict): Dicionario com os dados do projeto
 
         Returns:
-            pd.DataFrame: DataFrame pronto para predicao
+            np.ndarray: Matriz (1, n_features) pronta para predicao
         """
-        # Calcular features derivadas
-        start_date = pd.to_datetime(dados_projeto['start_date'])
-        end_date = pd.to_datetime(dados_projeto['end_date'])
+        start_date = _converter_data(dados_projeto['start_date'])
+        end_date = _converter_data(dados_projeto['end_date'])
         duracao_dias = (end_date - start_date).days
 
-        # ✅ CORREÇÃO: Novas features mais preditivas
-        benefit_cost_ratio = dados_projeto['project_benefit'] / dados_projeto['project_cost']
-        custo_por_dia = dados_projeto['project_cost'] / duracao_dias
-        beneficio_por_dia = dados_projeto['project_benefit'] / duracao_dias
-
-        # Features indicadoras (baseadas em quantis dos dados de treino)
-        # Valores aproximados baseados na análise dos dados
-        alto_valor = 1 if dados_projeto['project_benefit'] > 200000 else 0
-        projeto_longo = 1 if duracao_dias > 200 else 0
-
-        # Criar DataFrame com todas as features (SEM Completion%)
-        features = {
+        base = {
             'Project Cost': dados_projeto['project_cost'],
             'Project Benefit': dados_projeto['project_benefit'],
             'Year': dados_projeto.get('year', datetime.now().year),
             'Month': dados_projeto.get('month', datetime.now().month),
-            'Duracao_Dias': duracao_dias,
-            'Benefit_Cost_Ratio': benefit_cost_ratio,
-            'Custo_Por_Dia': custo_por_dia,
-            'Beneficio_Por_Dia': beneficio_por_dia,
-            'Alto_Valor': alto_valor,
-            'Projeto_Longo': projeto_longo
+            'Duracao_Dias': duracao_dias
         }
+        self._codificar_categoricas(dados_projeto, base)
 
-        # Adicionar features categoricas codificadas
-        mapeamento_campos = {
-            'Project Type': 'project_type',
-            'Region': 'region', 
-            'Department': 'department',
-            'Complexity': 'complexity',
-            'Phase': 'phase'
-        }
+        return self.pipeline.linha(base)
 
-        for cat_feature, campo_entrada in mapeamento_campos.items():
-            if cat_feature in self.label_encoders:
+    def _codificar_categoricas(self, dados_projeto, features):
+        """Adiciona ao dicionario de features as categoricas codificadas"""
+        for cat_feature, campo_entrada in MAPEAMENTO_CAMPOS.items():
+            if cat_feature in self.tabelas_categoricas:
+                tabela, codigo_padrao, classe_padrao = self.tabelas_categoricas[cat_feature]
                 valor = dados_projeto.get(campo_entrada, 'Unknown')
-                try:
-                    # Tentar codificar o valor
-                    features[cat_feature] = self.label_encoders[cat_feature].transform([valor])[0]
-                except ValueError:
+                codigo = tabela.get(valor) if isinstance(valor, str) else None
+                if codigo is None:
                     # Se valor nao conhecido, usar a classe mais comum (primeira)
-                    classes = self.label_encoders[cat_feature].classes_
-                    features[cat_feature] = self.label_encoders[cat_feature].transform([classes[0]])[0]
-                    print(f"⚠️  Valor '{valor}' não conhecido para {cat_feature}. Usando valor padrão: {classes[0]}")
+                    codigo = codigo_padrao
+                    print(f"⚠️  Valor '{valor}' não conhecido para {cat_feature}. Usando valor padrão: {classe_padrao}")
+                features[cat_feature] = codigo
+
+    def preparar_lote(self, lista_dados):
+        """
+        Prepara a matriz de features de varios projetos de uma vez
 
-        # Criar DataFrame com ordem correta de features
-        df = pd.DataFrame([features])[self.feature_names]
+        Cada feature e calculada coluna a coluna com NumPy. Projetos que nao
+        podem ser vetorizados (campo ausente, data fora do padrao ISO, custo
+        ou duracao zero) sao marcados como invalidos para que o chamador os
+        trate pelo caminho individual.
 
-        return df
+        Args:
+            lista_dados (list): Lista de dicionarios com os dados dos projetos
+
+        Returns:
+            tuple: (np.ndarray com uma linha por projeto, mascara de linhas validas)
+        """
+        n = len(lista_dados)
+        agora = datetime.now()
+
+        custo, custo_ok = _coluna_numerica(lista_dados, 'project_cost')
+        beneficio, beneficio_ok = _coluna_numerica(lista_dados, 'project_benefit')
+        year, year_ok = _coluna_numerica(lista_dados, 'year', agora.year)
+        month, month_ok = _coluna_numerica(lista_dados, 'month', agora.month)
+        start_date = _converter_datas([d.get('start_date') for d in lista_dados])
+        end_date = _converter_datas([d.get('end_date') for d in lista_dados])
+        with np.errstate(invalid='ignore'):  # NaT nas datas invalidas
+            duracao_dias = (end_date - start_date) // np.timedelta64(1, 'D')
+
+        validos = (
+            custo_ok & beneficio_ok & year_ok & month_ok
+            & ~np.isnan(custo) & ~np.isnan(beneficio) & (custo != 0)
+            & ~np.isnat(start_date) & ~np.isnat(end_date) & (duracao_dias != 0)
+        )
+
+        # Evitar divisoes invalidas nas linhas que serao descartadas
+        duracao = np.where(validos, duracao_dias, 1).astype(float)
+        custo = np.where(validos, custo, 1.0)
+        beneficio = np.where(validos, beneficio, 0.0)
+
+        colunas = {
+            'Project Cost': custo,
+            'Project Benefit': beneficio,
+            'Year': year,
+            'Month': month,
+            'Duracao_Dias': duracao
+        }
+
+        for cat_feature, campo_entrada in MAPEAMENTO_CAMPOS.items():
+            if cat_feature not in self.tabelas_categoricas:
+                continue
+            tabela, codigo_padrao, classe_padrao = self.tabelas_categoricas[cat_feature]
+            valores = [d.get(campo_entrada, 'Unknown') for d in lista_dados]
+            codigos = np.fromiter(
+                (tabela.get(v, -1) if isinstance(v, str) else -1 for v in valores),
+                dtype=np.int64, count=n
+            )
+
+            # Valores nao conhecidos usam a classe mais comum (primeira), como em preparar_linha
+            desconhecidos = codigos == -1
+            if desconhecidos.any():
+                for valor in {str(valores[i]) for i in np.flatnonzero(desconhecidos)}:
+                    print(f"⚠️  Valor '{valor}' não conhecido para {cat_feature}. Usando valor padrão: {classe_padrao}")
+                codigos[desconhecidos] = codigo_padrao
+            colunas[cat_feature] = codigos
+
+        return self.pipeline.matriz(colunas, n), validos
+
+    def preparar_colunas(self, colunas):
+        """
+        Prepara a matriz de features a partir de colunas ja validadas
+
+        Formato colunar (Arrow, Parquet, DataFrame): nenhum objeto Python e
+        criado por projeto. As categoricas chegam codificadas por dicionario,
+        e so os valores distintos passam pelas tabelas dos encoders.
+
+        Args:
+            colunas (dict): Arrays com n valores: project_cost, project_benefit,
+                year e month (float64), start_date e end_date (datetime64) e,
+                para cada campo categorico, um par (indices, categorias) como o
+                de um DictionaryArray do Arrow ou de um pd.Categorical
+
+        Returns:
+            np.ndarray: Matriz (n, n_features)
+        """
+        n = len(colunas['project_cost'])
+        base = {
+            'Project Cost': colunas['project_cost'],
+            'Project Benefit': colunas['project_benefit'],
+            'Year': colunas['year'],
+            'Month': colunas['month'],
+            'Duracao_Dias': ((colunas['end_date'] - colunas['start_date']) // np.timedelta64(1, 'D')).astype(float)
+        }
+
+        for cat_feature, campo_entrada in MAPEAMENTO_CAMPOS.items():
+            if cat_feature not in self.tabelas_categoricas:
+                continue
+            tabela, codigo_padrao, classe_padrao = self.tabelas_categoricas[cat_feature]
+            indices, categorias = colunas[campo_entrada]
+            codigos_categorias = np.array([tabela.get(c, -1) for c in categorias], dtype=np.int64)
+
+            # Valores nao conhecidos usam a classe mais comum (primeira), como em preparar_linha
+            for valor in np.asarray(categorias, dtype=object)[codigos_categorias == -1]:
+                print(f"⚠️  Valor '{valor}' não conhecido para {cat_feature}. Usando valor padrão: {classe_padrao}")
+            codigos_categorias[codigos_categorias == -1] = codigo_padrao
+            base[cat_feature] = codigos_categorias[indices]
+
+        return self.pipeline.matriz(base, n)
+
+    def prever_colunas(self, colunas):
+        """
+        Predicao vetorizada de colunas ja validadas (sem recomendacoes)
+
+        Args:
+            colunas (dict): Colunas no formato de preparar_colunas
+
+        Returns:
+            dict: Arrays com sucesso, probabilidade_sucesso, probabilidade_fracasso,
+                confianca e roi_esperado, um valor por projeto
+        """
+        probabilidades = self._calcular_probabilidades(self.preparar_colunas(colunas))
+        return {
+            'sucesso': probabilidades[:, 1] >= self.threshold,
+            'probabilidade_sucesso': probabilidades[:, 1],
+            'probabilidade_fracasso': probabilidades[:, 0],
+            'confianca': probabilidades.max(axis=1),
+            'roi_esperado': colunas['project_benefit'] / colunas['project_cost'] - 1
+        }
+
+    def _calcular_probabilidades(self, X):
+        """Aplica o modelo (normalizando para Logistic Regression) e retorna predict_proba"""
+        if hasattr(self.modelo, 'coef_'):  # E Logistic Regression
+            X = self.scaler.transform(X)
+        return self.modelo.predict_proba(X)
 
     def prever(self, dados_projeto):
         """
@@ -112,24 +369,132 @@ class PreditorProjetos:
             dados_projeto (dict): Dicionario com os dados do projeto
 
         Returns:
-            dict: Dicionario com predicao e probabilidades
+            dict: Dicionario com predicao, probabilidades e os codigos das
+                recomendacoes (textos em mensagens())
         """
         # Preparar dados
-        X = self.preparar_entrada(dados_projeto)
+        X = self.preparar_linha(dados_projeto)
+        categorias = self.motor_recomendacoes.categorias_projeto(dados_projeto)
 
-        # Normalizar se necessario (para Logistic Regression)
-        if hasattr(self.modelo, 'coef_'):  # E Logistic Regression
-            X_scaled = self.scaler.transform(X)
-            probabilidades = self.modelo.predict_proba(X_scaled)[0]
-        else:  # Random Forest
-            probabilidades = self.modelo.predict_proba(X)[0]
+        if self.cache is not None:
+            chave = self._chave_cache(X[0], categorias)
+            resultado = self.cache.obter(chave)
+            if resultado is not None:
+                return resultado
+
+        probabilidades = self._calcular_probabilidades(X)[0]
+        resultado = self._montar_resultado(X[0], probabilidades, categorias)
+
+        if self.cache is not None:
+            self.cache.guardar(chave, resultado)
+
+        return resultado
+
+    def _chave_cache(self, linha, categorias):
+        """
+        Chave do cache: versao do modelo + vetor de features canonico + categorias das regras
+
+        O resultado inteiro e funcao desse par: as features dao probabilidade
+        e ROI, e as categorias das regras (valor bruto normalizado, que o
+        encoder pode ter trocado pela classe padrao) dao as recomendacoes
+        categoricas. Campos brutos equivalentes caem na mesma entrada.
+        """
+        return (self.versao_modelo, linha.tobytes(), categorias.tobytes())
+
+    def categorias_conhecidas(self):
+        """Valores aceitos por campo categorico de entrada (classes dos encoders)"""
+        return {MAPEAMENTO_CAMPOS[cat_feature]: set(tabela)
+                for cat_feature, (tabela, _, _) in self.tabelas_categoricas.items()
+                if cat_feature in MAPEAMENTO_CAMPOS}
+
+    def prever_lote(self, lista_dados, colunas=None):
+        """
+        Faz a predicao de sucesso de varios projetos com uma unica chamada ao modelo
+
+        Args:
+            lista_dados (list): Lista de dicionarios com os dados dos projetos
+            colunas (dict): Os mesmos projetos ja validados em formato colunar
+                (preparar_colunas); evita reextrair e reconverter cada campo
+
+        Returns:
+            list: Um dicionario por projeto, na mesma ordem da entrada, com a
+                predicao ou com a chave 'erro' descrevendo a falha
+        """
+        resultados = [None] * len(lista_dados)
+        if not lista_dados:
+            return resultados
+
+        if colunas is None:
+            X, validos = self.preparar_lote(lista_dados)
+            categorias = self.motor_recomendacoes.categorias_lote(lista_dados)
+        else:
+            X, validos = self.preparar_colunas(colunas), np.ones(len(lista_dados), dtype=bool)
+            categorias = self.motor_recomendacoes.categorias_colunas(colunas)
+
+        indices = np.flatnonzero(validos)
+        chaves = {}
+        if self.cache is not None:
+            pendentes = []
+            for i in indices:
+                chaves[i] = self._chave_cache(X[i], categorias[i])
+                resultados[i] = self.cache.obter(chaves[i])
+                if resultados[i] is None:
+                    pendentes.append(i)
+            indices = np.asarray(pendentes, dtype=np.int64)
+
+        if len(indices):
+            probabilidades = self._calcular_probabilidades(X[indices])
+            montados = self._montar_resultados(X[indices], probabilidades, categorias[indices])
+            for i, resultado in zip(indices, montados):
+                resultados[i] = resultado
+                if self.cache is not None:
+                    self.cache.guardar(chaves[i], resultados[i])
+
+        # Linhas nao vetorizaveis seguem o caminho individual (mesmos erros de antes)
+        for i in np.flatnonzero(~validos):
+            try:
+                resultados[i] = self.prever(lista_dados[i])
+            except Exception as e:
+                resultados[i] = {'erro': str(e)}
+
+        return resultados
 
+    def _montar_resultados(self, X, probabilidades, categorias):
+        """
+        Monta os dicionarios de resposta de um lote a partir das features e das probabilidades
+
+        ROI e recomendacoes saem do vetor de features ja calculado e das
+        categorias das regras (categorias_lote); as regras sao avaliadas para
+        o lote inteiro de uma vez (MotorRecomendacoes).
+        """
+        prob_sucesso = probabilidades[:, 1]
+        roi = X[:, self.feature_names.index('Benefit_Cost_Ratio')] - 1  # ROI = (Beneficio/Custo) - 1
+        recomendacoes = self.motor_recomendacoes.recomendacoes_lote(X, prob_sucesso, self.threshold, categorias)
+        threshold = float(self.threshold)
+
+        return [
+            {
+                'sucesso': sucesso,
+                'probabilidade_sucesso': p_sucesso,
+                'probabilidade_fracasso': p_fracasso,
+                'confianca': confianca,
+                'roi_esperado': roi_projeto,
+                'threshold_usado': threshold,
+                'recomendacoes': recomendacoes_projeto
+            }
+            for sucesso, p_sucesso, p_fracasso, confianca, roi_projeto, recomendacoes_projeto in zip(
+                # ✅ CORREÇÃO: Usar threshold otimizado
+                (prob_sucesso >= self.threshold).tolist(), prob_sucesso.tolist(), probabilidades[:, 0].tolist(),
+                probabilidades.max(axis=1).tolist(), roi.tolist(), recomendacoes)
+        ]
+
+    def _montar_resultado(self, linha, probabilidades, categorias):
+        """Monta o dicionario de resposta de um projeto a partir das features, das probabilidades e das categorias"""
         # ✅ CORREÇÃO: Usar threshold otimizado
         predicao = (probabilidades[1] >= self.threshold).astype(int)
 
         # Calcular metricas adicionais
-        benefit_cost_ratio = dados_projeto['project_benefit'] / dados_projeto['project_cost']
-        roi = benefit_cost_ratio - 1  # ROI = (Beneficio/Custo) - 1
+        roi = linha[self.feature_names.index('Benefit_Cost_Ratio')] - 1  # ROI = (Beneficio/Custo) - 1
 
         resultado = {
             'sucesso': bool(predicao),
@@ -138,66 +503,12 @@ class PreditorProjetos:
             'confianca': float(max(probabilidades)),
             'roi_esperado': float(roi),
             'threshold_usado': float(self.threshold),
-            'recomendacoes': self._gerar_recomendacoes(dados_projeto, probabilidades[1], roi)
+            'recomendacoes': self.motor_recomendacoes.recomendacoes(linha, probabilidades[1], self.threshold,
+                                                                   categorias)
         }
 
         return resultado
 
-    def _gerar_recomendacoes(self, dados_projeto, prob_sucesso, roi):
-        """Gera recomendacoes baseadas na predicao - VERSÃO CORRIGIDA"""
-        recomendacoes = []
-
-        # ✅ CORREÇÃO: Recomendações mais precisas baseadas no threshold otimizado
-        if prob_sucesso < 0.3:
-            recomendacoes.append("🚨 Baixa probabilidade de sucesso. Considere revisar fundamentalmente o projeto.")
-        elif prob_sucesso < self.threshold:
-            recomendacoes.append("⚠️  Probabilidade de sucesso abaixo do ideal. Implemente medidas de mitigação.")
-        elif prob_sucesso < 0.7:
-            recomendacoes.append("📊 Probabilidade moderada de sucesso. Monitore de perto os riscos.")
-        else:
-            recomendacoes.append("✅ Alta probabilidade de sucesso. Mantenha o planejamento atual.")
-
-        # Recomendacoes baseadas no ROI
-        if roi < 0:
-            recomendacoes.append("💰 ROI negativo. Revise urgentemente o orçamento ou benefícios.")
-        elif roi < 0.5:
-            recomendacoes.append("📈 ROI baixo (<50%). Procure formas de otimizar custos ou aumentar benefícios.")
-        elif roi > 2:
-            recomendacoes.append("🚀 Excelente ROI esperado (>200%)!")
-
-        # Recomendacoes baseadas na razão Benefício/Custo
-        benefit_cost_ratio = dados_projeto['project_benefit'] / dados_projeto['project_cost']
-        if benefit_cost_ratio < 1.5:
-            recomendacoes.append("⚖️  Razão benefício/custo baixa. Considere se o projeto vale o investimento.")
-        elif benefit_cost_ratio > 5:
-            recomendacoes.append("💎 Excelente razão benefício/custo!")
-
-        # Recomendacoes baseadas na complexidade
-        complexity = dados_projeto.get('complexity', '').lower()
-        if complexity == 'high':
-            recomendacoes.append("🔧 Alta complexidade. Considere dividir em fases menores e aumentar o monitoramento.")
-        elif complexity == 'low':
-            recomendacoes.append("✨ Baixa complexidade. Projeto com boa chance de execução suave.")
-
-        # Recomendacoes baseadas na duracao
-        start_date = pd.to_datetime(dados_projeto['start_date'])
-        end_date = pd.to_datetime(dados_projeto['end_date'])
-        duracao_dias = (end_date - start_date).days
-
-        if duracao_dias > 365:
-            recomendacoes.append("📅 Projeto longo (>1 ano). Estabeleça marcos trimestrais e revisões regulares.")
-        elif duracao_dias < 30:
-            recomendacoes.append("⏱️  Prazo muito curto (<30 dias). Verifique se o escopo é realista.")
-
-        # Recomendacoes baseadas no tipo de projeto
-        project_type = dados_projeto.get('project_type', '')
-        if project_type == 'INCOME GENERATION':
-            recomendacoes.append("💰 Projeto de geração de receita. Monitore métricas de ROI de perto.")
-        elif project_type == 'PROCESS IMPROVEMENT':
-            recomendacoes.append("⚙️  Projeto de melhoria de processo. Foque em métricas de eficiência.")
-
-        return recomendacoes
-
 
 def exemplo_uso():
     """Exemplo de como usar o preditor - VERSÃO CORRIGIDA"""
@@ -234,7 +545,7 @@ def exemplo_uso():
     print(f"   Threshold usado: {resultado['threshold_usado']:.2f}")
 
     print(f"\n💡 RECOMENDACOES:")
-    for rec in resultado['recomendacoes']:
+    for rec in mensagens(resultado['recomendacoes']):
         print(f"   {rec}")
 
     # Exemplo de projeto DESFAVORÁVEL para comparação
@@ -263,7 +574,7 @@ def exemplo_uso():
     print(f"   ROI esperado: {resultado2['roi_esperado']:.1%}")
 
     print(f"\n💡 RECOMENDACOES:")
-    for rec in resultado2['recomendacoes']:
+    for rec in mensagens(resultado2['recomendacoes']):
         print(f"   {rec}")
 
     return resultado, resultado2
@@ -0,0 +1,192 @@
+# Catalogo fixo e motor de regras das recomendacoes devolvidas pelo preditor
+#
+# Cada recomendacao tem um codigo curto e estavel; o motor devolve so os
+# codigos (os mesmos objetos do catalogo), e o texto (com emoji) e buscado
+# por mensagens() apenas quando a resposta e detalhada. Clientes de alto
+# volume podem pedir so os codigos (modo compacto da API) e resolver o
+# texto uma vez por GET /recomendacoes.
+#
+# As regras numericas leem o vetor de features ja calculado (razao
+# beneficio/custo, duracao) e a probabilidade do modelo. As categoricas leem
+# o valor informado pelo cliente, e nao a categoria codificada: um valor que
+# o encoder nao conhece vira a classe padrao nas features, mas nao pode
+# disparar a recomendacao dessa classe. Em um lote, cada regra vira uma
+# mascara booleana sobre todas as linhas.
+import operator
+import sys
+import numpy as np
+
+
+CATALOGO_RECOMENDACOES = {
+    'PROB_BAIXA': "🚨 Baixa probabilidade de sucesso. Considere revisar fundamentalmente o projeto.",
+    'PROB_ABAIXO_IDEAL': "⚠️  Probabilidade de sucesso abaixo do ideal. Implemente medidas de mitigação.",
+    'PROB_MODERADA': "📊 Probabilidade moderada de sucesso. Monitore de perto os riscos.",
+    'PROB_ALTA': "✅ Alta probabilidade de sucesso. Mantenha o planejamento atual.",
+    'ROI_NEGATIVO': "💰 ROI negativo. Revise urgentemente o orçamento ou benefícios.",
+    'ROI_BAIXO': "📈 ROI baixo (<50%). Procure formas de otimizar custos ou aumentar benefícios.",
+    'ROI_EXCELENTE': "🚀 Excelente ROI esperado (>200%)!",
+    'RAZAO_BAIXA': "⚖️  Razão benefício/custo baixa. Considere se o projeto vale o investimento.",
+    'RAZAO_EXCELENTE': "💎 Excelente razão benefício/custo!",
+    'COMPLEXIDADE_ALTA': "🔧 Alta complexidade. Considere dividir em fases menores e aumentar o monitoramento.",
+    'COMPLEXIDADE_BAIXA': "✨ Baixa complexidade. Projeto com boa chance de execução suave.",
+    'PRAZO_LONGO': "📅 Projeto longo (>1 ano). Estabeleça marcos trimestrais e revisões regulares.",
+    'PRAZO_CURTO': "⏱️  Prazo muito curto (<30 dias). Verifique se o escopo é realista.",
+    'TIPO_RECEITA': "💰 Projeto de geração de receita. Monitore métricas de ROI de perto.",
+    'TIPO_PROCESSO': "⚙️  Projeto de melhoria de processo. Foque em métricas de eficiência."
+}
+CATALOGO_RECOMENDACOES = {sys.intern(codigo): sys.intern(mensagem)
+                          for codigo, mensagem in CATALOGO_RECOMENDACOES.items()}
+
+
+def mensagens(codigos):
+    """Textos do catalogo para uma lista de codigos"""
+    return [CATALOGO_RECOMENDACOES[codigo] for codigo in codigos]
+
+
+# Grupos de regras: (grandeza, [(comparacao, limite, codigo), ...]). Em cada
+# grupo vale a primeira regra verdadeira (if/elif); comparacao None e o else.
+# Grandezas: 'probabilidade', 'roi', o nome de uma feature ou uma categorica
+# de CAMPOS_CATEGORICOS; o limite 'threshold' e o threshold do modelo, e os
+# limites das categoricas sao valores do campo de entrada.
+REGRAS_RECOMENDACAO = [
+    ('probabilidade', [('<', 0.3, 'PROB_BAIXA'), ('<', 'threshold', 'PROB_ABAIXO_IDEAL'),
+                       ('<', 0.7, 'PROB_MODERADA'), (None, None, 'PROB_ALTA')]),
+    ('roi', [('<', 0, 'ROI_NEGATIVO'), ('<', 0.5, 'ROI_BAIXO'), ('>', 2, 'ROI_EXCELENTE')]),
+    ('Benefit_Cost_Ratio', [('<', 1.5, 'RAZAO_BAIXA'), ('>', 5, 'RAZAO_EXCELENTE')]),
+    ('Complexity', [('==', 'High', 'COMPLEXIDADE_ALTA'), ('==', 'Low', 'COMPLEXIDADE_BAIXA')]),
+    ('Duracao_Dias', [('>', 365, 'PRAZO_LONGO'), ('<', 30, 'PRAZO_CURTO')]),
+    ('Project Type', [('==', 'INCOME GENERATION', 'TIPO_RECEITA'), ('==', 'PROCESS IMPROVEMENT', 'TIPO_PROCESSO')])
+]
+
+# Campo de entrada de cada grandeza categorica das regras
+CAMPOS_CATEGORICOS = {'Complexity': 'complexity', 'Project Type': 'project_type'}
+
+# Categoricas comparadas sem diferenciar maiusculas ('low' == 'Low'), como no codigo original
+SEM_CAIXA = {'Complexity'}
+
+_COMPARACOES = {'<': operator.lt, '>': operator.gt, '==': operator.eq, None: None}
+
+
+class MotorRecomendacoes:
+    """Regras de recomendacao avaliadas sobre o vetor de features (um projeto ou um lote)"""
+
+    def __init__(self, feature_names, regras=REGRAS_RECOMENDACAO):
+        """
+        Args:
+            feature_names (list): Ordem das colunas do vetor de features
+            regras (list): Grupos de regras no formato de REGRAS_RECOMENDACAO
+        """
+        self._posicoes = {nome: i for i, nome in enumerate(feature_names)}
+        # Categoricas: valor normalizado -> numero da regra, uma coluna por grandeza
+        self.categoricas = []
+        self.grupos = []
+        for grandeza, regras_grupo in regras:
+            base = 'Benefit_Cost_Ratio' if grandeza == 'roi' else grandeza
+            categorica = grandeza in CAMPOS_CATEGORICOS
+            if not categorica and base != 'probabilidade' and base not in self._posicoes:
+                continue  # Modelo sem essa feature: grupo ignorado
+            compiladas = []
+            for k, (comparacao, limite, codigo) in enumerate(regras_grupo):
+                if categorica:
+                    limite = k  # A coluna categorica guarda o numero da regra do valor (-1: nenhuma)
+                if codigo not in CATALOGO_RECOMENDACOES:
+                    raise KeyError(f"Codigo de recomendacao fora do catalogo: {codigo}")
+                compiladas.append((_COMPARACOES[comparacao], limite, sys.intern(codigo)))
+            if categorica:
+                self.categoricas.append((grandeza, {self._normalizar(grandeza, limite): k
+                                                    for k, (_, limite, _) in enumerate(regras_grupo)}))
+            self.grupos.append((grandeza, compiladas))
+        self._posicoes_categoricas = {grandeza: j for j, (grandeza, _) in enumerate(self.categoricas)}
+
+    @staticmethod
+    def _normalizar(grandeza, valor):
+        """Valor bruto de uma categorica na forma comparada pelas regras (None se nao for texto)"""
+        if not isinstance(valor, str):
+            return None
+        return valor.lower() if grandeza in SEM_CAIXA else valor
+
+    def _codigos(self, j, valores):
+        """Numero da regra de cada valor bruto da j-esima categorica (-1: nenhuma)"""
+        grandeza, tabela = self.categoricas[j]
+        return np.fromiter((tabela.get(self._normalizar(grandeza, v), -1) for v in valores),
+                           dtype=np.int64, count=len(valores))
+
+    def categorias_projeto(self, dados_projeto):
+        """Colunas categoricas das regras para um projeto (dicionario de entrada)"""
+        return np.array([self._codigos(j, [dados_projeto.get(CAMPOS_CATEGORICOS[grandeza])])[0]
+                         for j, (grandeza, _) in enumerate(self.categoricas)], dtype=np.int64)
+
+    def categorias_lote(self, lista_dados):
+        """Colunas categoricas das regras para uma lista de projetos, matriz (n, categoricas)"""
+        categorias = np.empty((len(lista_dados), len(self.categoricas)), dtype=np.int64)
+        for j, (grandeza, _) in enumerate(self.categoricas):
+            categorias[:, j] = self._codigos(j, [d.get(CAMPOS_CATEGORICOS[grandeza]) for d in lista_dados])
+        return categorias
+
+    def categorias_colunas(self, colunas):
+        """Como categorias_lote, a partir de pares (indices, categorias); so os valores distintos sao consultados"""
+        n = len(colunas['project_cost'])
+        categorias = np.empty((n, len(self.categoricas)), dtype=np.int64)
+        for j, (grandeza, _) in enumerate(self.categoricas):
+            indices, valores = colunas[CAMPOS_CATEGORICOS[grandeza]]
+            # Indice -1 (ausente) cai no -1 final
+            categorias[:, j] = np.append(self._codigos(j, list(valores)), -1)[indices]
+        return categorias
+
+    def _grandeza(self, grandeza, X, probabilidade, categorias):
+        """Valor(es) de uma grandeza para uma linha (1-D) ou um lote (2-D)"""
+        if grandeza == 'probabilidade':
+            return probabilidade
+        if grandeza == 'roi':
+            return X[..., self._posicoes['Benefit_Cost_Ratio']] - 1
+        if grandeza in self._posicoes_categoricas:
+            return categorias[..., self._posicoes_categoricas[grandeza]]
+        return X[..., self._posicoes[grandeza]]
+
+    def recomendacoes(self, linha, probabilidade, threshold, categorias):
+        """Codigos do catalogo para um projeto (linha do vetor de features e de categorias_projeto)"""
+        codigos_projeto = []
+        for grandeza, regras in self.grupos:
+            valor = self._grandeza(grandeza, linha, probabilidade, categorias)
+            for comparar, limite, codigo in regras:
+                if comparar is None or comparar(valor, threshold if limite == 'threshold' else limite):
+                    codigos_projeto.append(codigo)
+                    break
+        return codigos_projeto
+
+    def recomendacoes_lote(self, X, probabilidades, threshold, categorias):
+        """
+        Codigos do catalogo para cada linha de um lote, com mascaras booleanas
+
+        Cada grupo escolhe sua regra para todas as linhas com np.select; a
+        combinacao de escolhas vira uma chave inteira, e a lista de codigos
+        e montada uma vez por combinacao distinta.
+
+        Returns:
+            list: Uma lista de codigos (nova) por linha de X
+        """
+        n = len(X)
+        chaves = np.zeros(n, dtype=np.int64)
+        bases = []
+        for grandeza, regras in self.grupos:
+            valores = self._grandeza(grandeza, X, probabilidades, categorias)
+            condicoes = [np.ones(n, dtype=bool) if comparar is None
+                         else comparar(valores, threshold if limite == 'threshold' else limite)
+                         for comparar, limite, _ in regras]
+            # 0 = nenhuma regra do grupo; k = k-esima regra
+            escolha = np.select(condicoes, np.arange(1, len(regras) + 1), default=0)
+            base = len(regras) + 1
+            chaves = chaves * base + escolha
+            bases.append(base)
+
+        distintas, inversa = np.unique(chaves, return_inverse=True)
+        listas = []
+        for chave in distintas.tolist():
+            escolhas = []
+            for base in reversed(bases):
+                chave, escolha = divmod(chave, base)
+                escolhas.append(escolha)
+            # Dígitos saem do último grupo para o primeiro
+            listas.append([regras[escolha - 1][2] for (_, regras), escolha in zip(self.grupos, reversed(escolhas))
+                           if escolha])
+        return [list(listas[k]) for k in inversa.tolist()]
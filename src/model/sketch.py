@@ -0,0 +1,74 @@
+# Sketch de quantis em streaming (compactadores no estilo KLL)
+#
+# Os valores entram no nivel 0 com peso 1. Quando um nivel passa da
+# capacidade, ele e ordenado e metade dos itens (os de posicao par ou impar,
+# sorteado) sobe para o nivel seguinte com o dobro do peso. A memoria fica
+# em O(capacidade * log(n / capacidade)) e o erro de posicao de cada quantil
+# cai com a capacidade. Enquanto nada foi compactado, o quantil e exato.
+import numpy as np
+
+
+class SketchQuantil:
+    """Quantis aproximados de uma sequencia lida em blocos"""
+
+    def __init__(self, capacidade=4096, semente=42):
+        """
+        Args:
+            capacidade (int): Itens guardados por nivel antes de compactar
+            semente (int): Semente do sorteio das compactacoes (reprodutivel)
+        """
+        self.capacidade = capacidade
+        self.niveis = [np.empty(0)]
+        self.n = 0
+        self._rng = np.random.default_rng(semente)
+
+    def atualizar(self, valores):
+        """Acrescenta um bloco de valores (NaN sao ignorados, como no pandas)"""
+        valores = np.asarray(valores, dtype=np.float64).ravel()
+        valores = valores[~np.isnan(valores)]
+        self.n += len(valores)
+        self.niveis[0] = np.concatenate([self.niveis[0], valores])
+        self._compactar()
+
+    def _compactar(self):
+        nivel = 0
+        while nivel < len(self.niveis):
+            itens = self.niveis[nivel]
+            if len(itens) > self.capacidade:
+                itens = np.sort(itens)
+                # Numero par de itens sobe; o excedente fica no nivel
+                par = len(itens) - len(itens) % 2
+                sobe = itens[self._rng.integers(2):par:2]
+                self.niveis[nivel] = itens[par:]
+                if nivel + 1 == len(self.niveis):
+                    self.niveis.append(np.empty(0))
+                self.niveis[nivel + 1] = np.concatenate([self.niveis[nivel + 1], sobe])
+            nivel += 1
+
+    @property
+    def exato(self):
+        """True enquanto todos os valores vistos continuam guardados"""
+        return len(self.niveis) == 1
+
+    def quantil(self, q):
+        """
+        Valor no quantil q (0 a 1)
+
+        Exato (mesma interpolacao linear de pandas.Series.quantile) enquanto
+        nao houve compactacao; aproximado pelos pesos dos niveis depois disso.
+        """
+        if self.n == 0:
+            return float('nan')
+        if self.exato:
+            return float(np.quantile(self.niveis[0], q))
+
+        valores = np.concatenate(self.niveis)
+        pesos = np.concatenate([np.full(len(itens), 2.0 ** nivel) for nivel, itens in enumerate(self.niveis)])
+        ordem = np.argsort(valores, kind='stable')
+        acumulado = np.cumsum(pesos[ordem])
+        posicao = np.searchsorted(acumulado, q * acumulado[-1], side='left')
+        return float(valores[ordem][min(posicao, len(valores) - 1)])
+
+    def tamanho(self):
+        """Itens guardados no sketch (memoria usada)"""
+        return sum(len(itens) for itens in self.niveis)
@@ -0,0 +1,105 @@
+# Otimizacao do threshold de decisao sobre a curva precision/recall completa
+#
+# As probabilidades sao ordenadas uma unica vez; somas acumuladas dos rotulos
+# dao TP e FP para todos os cortes distintos de uma vez (O(n log n) no total).
+# Um projeto e classificado como sucesso quando probabilidade >= threshold.
+import numpy as np
+
+
+# Objetivos aceitos por escolher_threshold
+OBJETIVOS_THRESHOLD = ('f1', 'fbeta', 'custo')
+
+
+def curva_threshold(y, proba):
+    """
+    Matriz de confusao, precision, recall e F1 em cada corte distinto
+
+    O primeiro ponto e um corte acima da maior probabilidade (nenhum projeto
+    previsto como sucesso); os demais sao as probabilidades distintas em
+    ordem decrescente.
+
+    Args:
+        y: Rotulos verdadeiros (0/1)
+        proba: Probabilidade de sucesso de cada projeto
+
+    Returns:
+        dict: Arrays threshold, tp, fp, fn, tn, precision, recall e f1
+    """
+    y = np.asarray(y).astype(bool)
+    proba = np.asarray(proba, dtype=np.float64)
+    if len(proba) == 0:
+        raise ValueError("curva_threshold requer ao menos um projeto")
+
+    ordem = np.argsort(-proba, kind='stable')
+    proba = proba[ordem]
+    acertos = np.cumsum(y[ordem], dtype=np.int64)
+
+    # Ultima posicao de cada valor distinto: tudo ate ela fica >= threshold
+    fim_grupo = np.flatnonzero(np.diff(proba)) if len(proba) > 1 else np.empty(0, dtype=np.int64)
+    fim_grupo = np.append(fim_grupo, len(proba) - 1)
+
+    threshold = np.concatenate([[np.nextafter(proba[0], np.inf)], proba[fim_grupo]])
+    tp = np.concatenate([[0], acertos[fim_grupo]])
+    fp = np.concatenate([[0], fim_grupo + 1 - acertos[fim_grupo]])
+    positivos = int(acertos[-1])
+    negativos = len(proba) - positivos
+    fn = positivos - tp
+    tn = negativos - fp
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Mesma convencao do sklearn (zero_division=0)
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(positivos > 0, tp / max(positivos, 1), 0.0)
+        f1 = np.where(2 * tp + fp + fn > 0, 2 * tp / (2 * tp + fp + fn), 0.0)
+
+    return {
+        'threshold': threshold,
+        'tp': tp,
+        'fp': fp,
+        'fn': fn,
+        'tn': tn,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1
+    }
+
+
+def escolher_threshold(curva, objetivo='f1', beta=1.0, custo_fp=1.0, custo_fn=1.0):
+    """
+    Escolhe o corte da curva que otimiza o objetivo
+
+    Args:
+        curva (dict): Saida de curva_threshold
+        objetivo (str): 'f1', 'fbeta' (beta > 1 favorece recall) ou 'custo'
+            (minimiza custo_fp * FP + custo_fn * FN)
+        beta (float): Peso do recall no objetivo 'fbeta'
+        custo_fp (float): Custo de prever sucesso para um projeto que fracassa
+        custo_fn (float): Custo de prever fracasso para um projeto bem-sucedido
+
+    Returns:
+        tuple: (threshold, indice do ponto na curva, valor do objetivo)
+    """
+    if objetivo == 'f1':
+        valores = curva['f1']
+    elif objetivo == 'fbeta':
+        b2 = beta ** 2
+        tp, fp, fn = curva['tp'], curva['fp'], curva['fn']
+        denominador = (1 + b2) * tp + b2 * fn + fp
+        with np.errstate(divide='ignore', invalid='ignore'):
+            valores = np.where(denominador > 0, (1 + b2) * tp / denominador, 0.0)
+    elif objetivo == 'custo':
+        # Maximizar o custo negativo
+        valores = -(custo_fp * curva['fp'] + custo_fn * curva['fn'])
+    else:
+        raise ValueError(f"Objetivo desconhecido: {objetivo} (use {', '.join(OBJETIVOS_THRESHOLD)})")
+
+    # Empates: o primeiro ponto, isto é, o threshold mais alto
+    indice = int(np.argmax(valores))
+    valor = float(valores[indice])
+    return float(curva['threshold'][indice]), indice, -valor if objetivo == 'custo' else valor
+
+
+def ponto_da_curva(curva, threshold):
+    """Indice do ponto da curva equivalente a classificar com proba >= threshold"""
+    # threshold decrescente: pontos com threshold >= t formam um prefixo
+    return max(int(np.searchsorted(-curva['threshold'], -threshold, side='right')) - 1, 0)
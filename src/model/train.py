@@ -1,24 +1,117 @@
 # Script para treinar modelo de predição de sucesso de projetos - VERSÃO CORRIGIDA
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold, train_test_split
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report, confusion_matrix
-import joblib
+import copy
+import json
 import os
+import sys
+import time
 import warnings
+from pandas.api.types import union_categoricals
 warnings.filterwarnings('ignore')
 
-
-def preparar_dados(df):
-    """Prepara os dados para treinamento - VERSÃO CORRIGIDA"""
-    print("📊 Preparando dados...")
-
-    # Criar cópia
-    data = df.copy()
-
+try:
+    from . import dataset
+    from .bundle import salvar_bundle
+    from .busca import buscar_hiperparametros
+    from .drift import referencia_drift
+    from .features import COLUNAS_NUMERICAS, QUANTIL_CORTES, PipelineFeatures, indicadores, razoes
+    from .forest import exportar_floresta
+    from .paralelo import executar_em_grupos, matriz, numero_workers
+    from .sketch import SketchQuantil
+    from .threshold import OBJETIVOS_THRESHOLD, curva_threshold, escolher_threshold, ponto_da_curva
+except ImportError:  # Executado como script (python src/model/train.py)
+    import dataset
+    from bundle import salvar_bundle
+    from busca import buscar_hiperparametros
+    from drift import referencia_drift
+    from features import COLUNAS_NUMERICAS, QUANTIL_CORTES, PipelineFeatures, indicadores, razoes
+    from forest import exportar_floresta
+    from paralelo import executar_em_grupos, matriz, numero_workers
+    from sketch import SketchQuantil
+    from threshold import OBJETIVOS_THRESHOLD, curva_threshold, escolher_threshold, ponto_da_curva
+
+
+# Regras de rotulagem, avaliadas em ordem: vale a primeira que casar.
+# Cada regra é (Status, Completion mínimo [inclusivo], Completion máximo [exclusivo], rótulo);
+# None significa sem limite. Projetos que não casam com nenhuma regra são ambíguos.
+REGRAS_SUCESSO = [
+    ('Completed', None, None, 1),       # Sempre sucesso
+    ('In - Progress', 0.7, None, 1),    # In-Progress com >70% = sucesso provável
+    ('Cancelled', None, None, 0),       # Sempre fracasso
+    ('On - Hold', None, None, 0),       # Sempre fracasso
+    ('In - Progress', None, 0.3, 0),    # In-Progress com <30% = fracasso provável
+]
+ROTULO_AMBIGUO = -1
+
+CAMINHO_DADOS = 'data/Project Management Dataset.csv'
+
+# Colunas do CSV lidas no modo em blocos (sem nome, descrição e gerente)
+COLUNAS_CSV = [' Project Cost ', ' Project Benefit ', 'Completion%', 'Status', 'Start Date', 'End Date',
+               'Year', 'Month', 'Project Type', 'Region', 'Department', 'Complexity', 'Phase']
+COLUNAS_NUMERICAS_BLOCO = ['Project Cost', 'Project Benefit', 'Year', 'Month', 'Duracao_Dias',
+                           'Benefit_Cost_Ratio', 'Custo_Por_Dia', 'Beneficio_Por_Dia']
+COLUNAS_CATEGORICAS = ['Project Type', 'Region', 'Department', 'Complexity', 'Phase']
+
+# Modos de treinar_modelos
+MODOS_TREINO = ('holdout', 'dobras')
+
+# Log das métricas de cada candidato, gravado à medida que terminam
+CAMINHO_LOG_TREINO = 'models/treino_log.jsonl'
+
+# Colunas de preparar_dados usadas no treino (as que vão para o cache Parquet)
+COLUNAS_DADOS_LIMPOS = COLUNAS_NUMERICAS_BLOCO + ['Alto_Valor', 'Projeto_Longo'] + COLUNAS_CATEGORICAS + ['Sucesso']
+
+
+def rotular_sucesso(status, completion, regras=REGRAS_SUCESSO):
+    """
+    Rotula o sucesso de todos os projetos de uma vez a partir da tabela de regras
+
+    Args:
+        status: Coluna Status
+        completion: Coluna Completion (fração entre 0 e 1)
+        regras (list): Tabela no formato de REGRAS_SUCESSO
+
+    Returns:
+        np.ndarray: 1 (sucesso), 0 (fracasso) ou ROTULO_AMBIGUO para cada projeto
+    """
+    status = np.asarray(status, dtype=object)
+    completion = np.asarray(completion, dtype=np.float64)
+
+    condicoes, rotulos = [], []
+    for valor_status, minimo, maximo, rotulo in regras:
+        condicao = status == valor_status
+        if minimo is not None:
+            condicao &= completion >= minimo
+        if maximo is not None:
+            condicao &= completion < maximo
+        condicoes.append(condicao)
+        rotulos.append(rotulo)
+
+    return np.select(condicoes, rotulos, default=ROTULO_AMBIGUO)
+
+
+def definir_sucesso(row, regras=REGRAS_SUCESSO):
+    """Rotula um único projeto (linha com Status e Completion) pelas mesmas regras"""
+    for valor_status, minimo, maximo, rotulo in regras:
+        if row['Status'] != valor_status:
+            continue
+        if minimo is not None and not row['Completion'] >= minimo:
+            continue
+        if maximo is not None and not row['Completion'] < maximo:
+            continue
+        return rotulo
+    return ROTULO_AMBIGUO
+
+
+def limpar_bloco(data):
+    """Converte tipos, rotula o sucesso e cria as features derivadas (exceto os quantis)"""
     # Limpar colunas monetárias (remover vírgulas e converter para float)
     data['Project Cost'] = data[' Project Cost '].str.replace(',', '').astype(float)
     data['Project Benefit'] = data[' Project Benefit '].str.replace(',', '').astype(float)
@@ -27,22 +120,7 @@ def preparar_dados(df):
     data['Completion'] = data['Completion%'].str.rstrip('%').astype(float) / 100
 
     # ✅ CORREÇÃO 1: NOVA DEFINIÇÃO DE SUCESSO (mais realista)
-    def definir_sucesso(row):
-        status = row['Status']
-        completion = row['Completion']
-
-        if status == 'Completed':
-            return 1  # Sempre sucesso
-        elif status == 'In - Progress' and completion >= 0.7:
-            return 1  # In-Progress com >70% = sucesso provável
-        elif status == 'Cancelled' or status == 'On - Hold':
-            return 0  # Sempre fracasso
-        elif status == 'In - Progress' and completion < 0.3:
-            return 0  # In-Progress com <30% = fracasso provável
-        else:
-            return -1  # Casos ambíguos - remover
-
-    data['Sucesso'] = data.apply(definir_sucesso, axis=1)
+    data['Sucesso'] = rotular_sucesso(data['Status'], data['Completion'])
 
     # Remover casos ambíguos
     data = data[data['Sucesso'] != -1]
@@ -53,20 +131,27 @@ def preparar_dados(df):
     data['Duracao_Dias'] = (data['End Date'] - data['Start Date']).dt.days
 
     # ✅ CORREÇÃO 2: FEATURES MAIS PREDITIVAS
-    # Razão Benefício/Custo (mais interpretável que ROI)
-    data['Benefit_Cost_Ratio'] = data['Project Benefit'] / data['Project Cost']
+    # Razão Benefício/Custo, custo e benefício por dia (mesmo cálculo da predição)
+    for nome, coluna in razoes(data['Project Cost'], data['Project Benefit'], data['Duracao_Dias']).items():
+        data[nome] = coluna
 
-    # Custo por dia (eficiência)
-    data['Custo_Por_Dia'] = data['Project Cost'] / data['Duracao_Dias']
+    return data
 
-    # Benefício por dia
-    data['Beneficio_Por_Dia'] = data['Project Benefit'] / data['Duracao_Dias']
 
-    # Indicador de projeto de alto valor
-    data['Alto_Valor'] = (data['Project Benefit'] > data['Project Benefit'].quantile(0.75)).astype(int)
+def preparar_dados(df):
+    """Prepara os dados para treinamento - VERSÃO CORRIGIDA"""
+    print("📊 Preparando dados...")
 
-    # Indicador de projeto longo
-    data['Projeto_Longo'] = (data['Duracao_Dias'] > data['Duracao_Dias'].quantile(0.75)).astype(int)
+    # Criar cópia
+    data = limpar_bloco(df.copy())
+
+    # Indicadores de projeto de alto valor e de projeto longo (acima do 75º percentil).
+    # Os cortes vão para o bundle e são aplicados do mesmo jeito a projetos novos.
+    cortes = {'Alto_Valor': float(data['Project Benefit'].quantile(QUANTIL_CORTES)),
+              'Projeto_Longo': float(data['Duracao_Dias'].quantile(QUANTIL_CORTES))}
+    for nome, coluna in indicadores(data['Project Benefit'], data['Duracao_Dias'], cortes).items():
+        data[nome] = coluna
+    data.attrs['cortes'] = cortes
 
     print(f"✅ Taxa de sucesso nos dados (nova definição): {data['Sucesso'].mean():.2%}")
     print(f"✅ Total de projetos após limpeza: {len(data)}")
@@ -74,32 +159,142 @@ def preparar_dados(df):
     return data
 
 
+def pico_memoria_mb():
+    """Pico de memória residente (RSS) do processo em MB, se disponível"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def preparar_dados_em_blocos(caminho, tamanho_bloco=50_000, capacidade_sketch=4096):
+    """
+    Prepara os dados lendo o CSV em blocos, sem carregá-lo inteiro na memória
+
+    Cada bloco é limpo e reduzido às colunas usadas no treino (sem os textos
+    livres) antes do próximo ser lido. Os cortes do 75º percentil de
+    Alto_Valor e Projeto_Longo vêm de sketches de quantis em streaming.
+
+    Args:
+        caminho (str): CSV no formato de 'Project Management Dataset.csv'
+        tamanho_bloco (int): Linhas lidas por vez
+        capacidade_sketch (int): Capacidade por nível dos sketches de quantis
+
+    Returns:
+        pd.DataFrame: Colunas tipadas (float64/int64, categóricas como category)
+    """
+    print(f"📊 Preparando dados em blocos de {tamanho_bloco:,} linhas...")
+
+    colunas = {nome: [] for nome in COLUNAS_NUMERICAS_BLOCO + COLUNAS_CATEGORICAS + ['Sucesso']}
+    sketch_beneficio = SketchQuantil(capacidade_sketch)
+    sketch_duracao = SketchQuantil(capacidade_sketch)
+    linhas_lidas = 0
+    blocos = 0
+
+    leitor = pd.read_csv(caminho, usecols=COLUNAS_CSV, chunksize=tamanho_bloco,
+                         dtype={col: str for col in COLUNAS_CSV if col not in ('Year', 'Month')})
+    for bloco in leitor:
+        linhas_lidas += len(bloco)
+        blocos += 1
+        bloco = limpar_bloco(bloco)
+
+        sketch_beneficio.atualizar(bloco['Project Benefit'].to_numpy())
+        sketch_duracao.atualizar(bloco['Duracao_Dias'].to_numpy())
+        # Cópias: uma visão manteria o bloco inteiro vivo na memória
+        for nome in COLUNAS_NUMERICAS_BLOCO + ['Sucesso']:
+            colunas[nome].append(bloco[nome].to_numpy(copy=True))
+        for nome in COLUNAS_CATEGORICAS:
+            colunas[nome].append(pd.Categorical(bloco[nome]))
+        del bloco
+
+    # Junta uma coluna por vez, liberando as partes logo em seguida
+    data = pd.DataFrame(index=pd.RangeIndex(sum(len(p) for p in colunas['Sucesso'])))
+    for nome in list(colunas):
+        partes = colunas.pop(nome)
+        data[nome] = union_categoricals(partes) if nome in COLUNAS_CATEGORICAS else np.concatenate(partes)
+        del partes
+
+    corte_beneficio = sketch_beneficio.quantil(QUANTIL_CORTES)
+    corte_duracao = sketch_duracao.quantil(QUANTIL_CORTES)
+    cortes = {'Alto_Valor': float(corte_beneficio), 'Projeto_Longo': float(corte_duracao)}
+    for nome, coluna in indicadores(data['Project Benefit'], data['Duracao_Dias'], cortes).items():
+        data[nome] = coluna
+    data.attrs['cortes'] = cortes
+
+    pico = pico_memoria_mb()
+    print(f"✅ {linhas_lidas:,} linhas lidas em {blocos} blocos")
+    print(f"✅ 75º percentil: benefício {corte_beneficio:,.2f}, duração {corte_duracao:,.0f} dias"
+          f"{'' if sketch_beneficio.exato else ' (aproximado)'}")
+    if pico is not None:
+        print(f"✅ Pico de memória (RSS): {pico:,.1f} MB")
+    print(f"✅ Taxa de sucesso nos dados (nova definição): {data['Sucesso'].mean():.2%}")
+    print(f"✅ Total de projetos após limpeza: {len(data)}")
+
+    return data
+
+
+def tipar_dados_limpos(data):
+    """Mantém só as colunas do treino, com as categóricas como category"""
+    data = data[COLUNAS_DADOS_LIMPOS].reset_index(drop=True)
+    for col in COLUNAS_CATEGORICAS:
+        data[col] = data[col].astype('category')
+    return data
+
+
+def carregar_dados(caminho=CAMINHO_DADOS, tamanho_bloco=None, diretorio_cache=dataset.DIRETORIO_CACHE):
+    """
+    Dados limpos prontos para criar_features, reaproveitando o cache Parquet
+
+    O cache é identificado pelo hash do CSV: enquanto o arquivo não mudar,
+    a limpeza (vírgulas, percentuais, datas) não é refeita.
+
+    Args:
+        caminho (str): CSV de treino
+        tamanho_bloco (int): Se informado, lê o CSV em blocos desse tamanho
+        diretorio_cache (str): Onde guardar o Parquet (None desativa o cache)
+
+    Returns:
+        pd.DataFrame: Colunas de COLUNAS_DADOS_LIMPOS
+    """
+    cache = None
+    if diretorio_cache and dataset.pyarrow is not None:
+        cache = dataset.caminho_cache(caminho, diretorio_cache)
+        if os.path.exists(cache):
+            data = dataset.ler_dados_limpos(cache)
+            print(f"📦 Dados limpos lidos do cache '{cache}' ({len(data)} projetos)")
+            return data
+    elif diretorio_cache:
+        print("ℹ️  pyarrow não instalado: cache Parquet desativado")
+
+    if tamanho_bloco:
+        # Carregar e preparar em blocos (memória limitada)
+        data = preparar_dados_em_blocos(caminho, tamanho_bloco)
+    else:
+        # Carregar dados
+        df = pd.read_csv(caminho)
+
+        # Preparar dados
+        data = preparar_dados(df)
+    data = tipar_dados_limpos(data)
+
+    if cache:
+        dataset.salvar_dados_limpos(data, cache)
+        print(f"📦 Dados limpos salvos em '{cache}'")
+    return data
+
+
 def criar_features(data):
     """Cria features para o modelo - VERSÃO CORRIGIDA"""
     print("🔧 Criando features...")
 
     # ✅ CORREÇÃO 3: REMOVER COMPLETION% (vazamento de dados)
-    features_num = [
-        'Project Cost', 
-        'Project Benefit', 
-        'Year',
-        'Month',
-        'Duracao_Dias',
-        'Benefit_Cost_Ratio',  # Nova feature
-        'Custo_Por_Dia',
-        'Beneficio_Por_Dia',   # Nova feature
-        'Alto_Valor',          # Nova feature
-        'Projeto_Longo'        # Nova feature
-    ]
+    features_num = COLUNAS_NUMERICAS
 
     # Features categóricas
-    features_cat = [
-        'Project Type',
-        'Region',
-        'Department',
-        'Complexity',
-        'Phase'
-    ]
+    features_cat = COLUNAS_CATEGORICAS
 
     # Criar DataFrame com features
     X = pd.DataFrame()
@@ -125,22 +320,10 @@ def criar_features(data):
     return X, y, label_encoders
 
 
-def treinar_modelos(X, y):
-    """Treina e compara diferentes modelos - VERSÃO CORRIGIDA"""
-    print("\n🤖 Treinando modelos...")
-
-    # Dividir dados
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
-
-    # Normalizar features
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-
+def modelos_candidatos():
+    """Modelos comparados no treino, com os hiperparâmetros padrão"""
     # ✅ CORREÇÃO 4: MODELOS COM MELHOR BALANCEAMENTO
-    modelos = {
+    return {
         'Random Forest': RandomForestClassifier(
             n_estimators=200,           # Mais árvores
             max_depth=8,               # Mais profundidade
@@ -157,18 +340,182 @@ def treinar_modelos(X, y):
         )
     }
 
-    resultados = {}
 
+def _treinar_tarefa(tarefa):
+    """Ajusta um modelo (ajuste final ou uma dobra da CV) com as matrizes compartilhadas"""
+    X = matriz('X_train_scaled' if tarefa['escalado'] else 'X_train')
+    y = matriz('y_train')
+    modelo = clone(tarefa['modelo'])
+
+    if tarefa['dobra'] is None:
+        modelo.fit(X, y)
+        return {'modelo': modelo}
+
+    validacao = tarefa['validacao']
+    modelo.fit(X[tarefa['treino']], y[tarefa['treino']])
+    resultado = {'score': modelo.score(X[validacao], y[validacao])}
+    if tarefa['guardar_modelo']:
+        resultado['modelo'] = modelo
+        resultado['proba'] = modelo.predict_proba(X[validacao])[:, 1]
+    return resultado
+
+
+def combinar_dobras(modelos, max_arvores=None):
+    """
+    Junta os modelos das dobras em um único modelo, sem novo ajuste
+
+    Random Forest: as árvores das dobras formam uma floresta só (a média das
+    probabilidades é a média dos modelos das dobras). Com todas as árvores a
+    floresta fica k vezes maior, e a latência e o bundle crescem junto; com
+    max_arvores cada dobra entra com as primeiras max_arvores / k árvores
+    (árvores de uma floresta são independentes, então é uma amostra delas).
+    Logistic Regression: média dos coeficientes (média das log-odds).
+
+    Args:
+        modelos (list): Modelos ajustados nas dobras
+        max_arvores (int): Tamanho máximo da floresta combinada (None: todas)
+    """
+    combinado = copy.copy(modelos[0])
+    if hasattr(combinado, 'estimators_'):
+        por_dobra = [len(modelo.estimators_) for modelo in modelos]
+        if max_arvores is not None and max_arvores < sum(por_dobra):
+            # Divisão o mais igual possível; o resto vai para as primeiras dobras
+            base, resto = divmod(max_arvores, len(modelos))
+            por_dobra = [min(n, base + (i < resto)) for i, n in enumerate(por_dobra)]
+        combinado.estimators_ = [arvore for modelo, n in zip(modelos, por_dobra) for arvore in modelo.estimators_[:n]]
+        combinado.n_estimators = len(combinado.estimators_)
+    else:
+        combinado.coef_ = np.mean([modelo.coef_ for modelo in modelos], axis=0)
+        combinado.intercept_ = np.mean([modelo.intercept_ for modelo in modelos], axis=0)
+    return combinado
+
+
+def registrar_evento(caminho, evento):
+    """Acrescenta um evento (uma linha JSON) ao log do treino, gravando na hora"""
+    if not caminho:
+        return
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    evento = {'momento': time.strftime('%Y-%m-%dT%H:%M:%S'), **evento}
+    with open(caminho, 'a') as f:
+        f.write(json.dumps(evento, ensure_ascii=False, default=float) + '\n')
+
+
+def treinar_modelos(X, y, workers=None, modo='holdout', objetivo_threshold=None, busca=None,
+                    timeout_candidato=None, log_treino=None):
+    """
+    Treina e compara diferentes modelos - VERSÃO CORRIGIDA
+
+    Args:
+        X, y: Features e target
+        workers (int): Processos usados no treino e na validação cruzada
+            (padrão: variável TREINO_WORKERS ou número de CPUs)
+        modo (str): 'holdout' ajusta cada modelo no treino inteiro e avalia no
+            teste, além das 5 dobras da CV; 'dobras' ajusta só as 5 dobras, avalia
+            e escolhe o threshold pelas probabilidades fora da dobra e combina
+            os modelos das dobras no modelo final
+        objetivo_threshold (dict): Argumentos de escolher_threshold
+            (padrão: maior F1), ex. {'objetivo': 'custo', 'custo_fn': 5}
+        busca (dict): Se informado, busca os hiperparâmetros antes do treino;
+            argumentos de buscar_hiperparametros, ex. {'segundos': 600}
+        timeout_candidato (float): Segundos máximos de cada modelo candidato
+            (ajuste final + dobras); quem passar disso é descartado
+        log_treino (str): Arquivo JSON Lines que recebe as métricas de cada
+            candidato assim que ele termina
+    """
+    if modo not in MODOS_TREINO:
+        raise ValueError(f"Modo de treino desconhecido: {modo} (use {', '.join(MODOS_TREINO)})")
+    print(f"\n🤖 Treinando modelos (modo {modo})...")
+    inicio_treino = time.perf_counter()
+
+    # Dividir dados
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+
+    # Normalizar features
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    modelos = modelos_candidatos()
+
+    dobras = list(StratifiedKFold(n_splits=5).split(X_train, y_train))
+    matrizes = {
+        'X_train': np.asarray(X_train, dtype=np.float64),
+        'X_train_scaled': X_train_scaled,
+        'y_train': np.asarray(y_train)
+    }
+
+    leaderboard = None
+    if busca is not None:
+        print("\n🔎 Busca de hiperparâmetros (successive halving)...")
+        melhores, leaderboard = buscar_hiperparametros(modelos, matrizes, dobras, workers=workers, **busca)
+        print("\n🏁 Leaderboard (top 10):")
+        for linha in leaderboard[:10]:
+            print(f"  {linha['modelo']:<20} F1={linha['f1_medio']:.3f} (+/- {linha['f1_desvio']:.3f}) "
+                  f"rodada {linha['rodada']}, {linha['amostras_por_dobra']} projetos/dobra: {linha['parametros']}")
+        for nome, parametros in melhores.items():
+            modelos[nome].set_params(**parametros)
+            print(f"  ✅ {nome}: {parametros}")
+
+    # Ajuste final de cada modelo e as 5 dobras da validação cruzada são
+    # tarefas independentes, executadas em paralelo
+    reaproveitar = modo == 'dobras'
+    tarefas = []
     for nome, modelo in modelos.items():
+        escalado = nome == 'Logistic Regression'
+        if not reaproveitar:
+            tarefas.append({'nome': nome, 'modelo': modelo, 'escalado': escalado, 'dobra': None})
+        for i, (treino, validacao) in enumerate(dobras):
+            tarefas.append({'nome': nome, 'modelo': modelo, 'escalado': escalado, 'dobra': i,
+                            'treino': treino, 'validacao': validacao, 'guardar_modelo': reaproveitar})
+
+    workers = numero_workers(workers)
+    print(f"⚙️  {len(tarefas)} tarefas em {min(workers, len(tarefas))} worker(s)"
+          f"{f', timeout de {timeout_candidato:g} s por candidato' if timeout_candidato else ''}")
+    registrar_evento(log_treino, {'evento': 'inicio', 'modo': modo, 'candidatos': list(modelos),
+                                  'timeout_candidato': timeout_candidato})
+    inicio = time.perf_counter()
+    soma = 0.0
+    criterio = 'f1_oof' if reaproveitar else 'f1'
+
+    resultados = {}
+    descartados = []
+
+    # Cada candidato é avaliado assim que suas tarefas terminam, sem esperar os demais
+    for nome, execucoes in executar_em_grupos(_treinar_tarefa, tarefas, matrizes, workers,
+                                              timeout=timeout_candidato):
+        if execucoes is None:
+            descartados.append(nome)
+            print(f"\n⏰ {nome} descartado: passou de {timeout_candidato:g} s")
+            registrar_evento(log_treino, {'evento': 'descartado', 'modelo': nome, 'motivo': 'timeout',
+                                          'timeout_candidato': timeout_candidato})
+            continue
+
         print(f"\n📈 Treinando {nome}...")
+        segundos_modelo = [segundos for _, segundos in execucoes]
+        soma += sum(segundos_modelo)
+        execucoes_modelo = [resultado for resultado, _ in execucoes]
+        if reaproveitar:
+            modelos_dobras = [resultado['modelo'] for resultado in execucoes_modelo]
+            # Floresta do mesmo tamanho de um ajuste único (não k vezes maior)
+            modelo = combinar_dobras(modelos_dobras, max_arvores=getattr(modelos[nome], 'n_estimators', None))
+            if hasattr(modelo, 'estimators_'):
+                total = sum(len(m.estimators_) for m in modelos_dobras)
+                print(f"  🌲 Modelo combinado: {modelo.n_estimators} de {total} árvores das {len(dobras)} dobras")
+            # Probabilidade de cada projeto de treino dada pelo modelo que não o viu
+            proba_oof = np.empty(len(y_train))
+            for (_, validacao), resultado in zip(dobras, execucoes_modelo):
+                proba_oof[validacao] = resultado['proba']
+        else:
+            modelo = execucoes_modelo[0]['modelo']
+            execucoes_modelo = execucoes_modelo[1:]
 
-        # Treinar
+        # Avaliar no conjunto de teste
         if nome == 'Logistic Regression':
-            modelo.fit(X_train_scaled, y_train)
             y_pred = modelo.predict(X_test_scaled)
             y_proba = modelo.predict_proba(X_test_scaled)[:, 1]
         else:
-            modelo.fit(X_train, y_train)
             y_pred = modelo.predict(X_test)
             y_proba = modelo.predict_proba(X_test)[:, 1]
 
@@ -178,14 +525,12 @@ def treinar_modelos(X, y):
         rec = recall_score(y_test, y_pred)
         f1 = f1_score(y_test, y_pred)
 
-        # Cross-validation
-        if nome == 'Logistic Regression':
-            cv_scores = cross_val_score(modelo, X_train_scaled, y_train, cv=5)
-        else:
-            cv_scores = cross_val_score(modelo, X_train, y_train, cv=5)
+        # Cross-validation (mesmas dobras de cross_val_score com cv=5)
+        cv_scores = np.array([resultado['score'] for resultado in execucoes_modelo])
 
         resultados[nome] = {
             'modelo': modelo,
+            'parametros': modelos[nome].get_params(),
             'accuracy': acc,
             'precision': prec,
             'recall': rec,
@@ -195,6 +540,24 @@ def treinar_modelos(X, y):
             'y_proba': y_proba
         }
 
+        if leaderboard is not None:
+            resultados[nome]['leaderboard'] = [linha for linha in leaderboard if linha['modelo'] == nome]
+
+        if reaproveitar:
+            # Métricas fora da dobra: avaliam todo o treino sem novos ajustes
+            y_pred_oof = (proba_oof >= 0.5).astype(int)
+            resultados[nome].update({
+                'modelos_dobras': modelos_dobras,
+                'proba_oof': proba_oof,
+                'accuracy_oof': accuracy_score(y_train, y_pred_oof),
+                'precision_oof': precision_score(y_train, y_pred_oof),
+                'recall_oof': recall_score(y_train, y_pred_oof),
+                'f1_oof': f1_score(y_train, y_pred_oof)
+            })
+            print(f"  Fora da dobra: Accuracy={resultados[nome]['accuracy_oof']:.3f}, "
+                  f"F1={resultados[nome]['f1_oof']:.3f}")
+            print(f"  Teste (modelo combinado das dobras):")
+
         print(f"  Accuracy: {acc:.3f}")
         print(f"  Precision: {prec:.3f}")
         print(f"  Recall: {rec:.3f}")
@@ -207,41 +570,64 @@ def treinar_modelos(X, y):
         print(f"    [[{cm[0,0]}, {cm[0,1]}],")
         print(f"     [{cm[1,0]}, {cm[1,1]}]]")
 
-    # Escolher melhor modelo baseado em F1-Score
-    melhor_modelo_nome = max(resultados.keys(), key=lambda k: resultados[k]['f1'])
+        etapas = ([] if reaproveitar else ['ajuste final']) + [f"dobra {i + 1}" for i in range(len(dobras))]
+        print("  Tempo por tarefa: " + ", ".join(f"{e} {t:.2f} s" for e, t in zip(etapas, segundos_modelo)))
+
+        resultados[nome]['segundos'] = sum(segundos_modelo)
+        metricas = {chave: resultados[nome][chave] for chave in
+                    ('accuracy', 'precision', 'recall', 'f1', 'cv_mean', 'cv_std', 'f1_oof', 'segundos')
+                    if chave in resultados[nome]}
+        registrar_evento(log_treino, {'evento': 'candidato', 'modelo': nome, 'metricas': metricas,
+                                      'decorrido': time.perf_counter() - inicio})
+        lider = max(resultados, key=lambda k: resultados[k][criterio])
+        print(f"  🏁 Melhor até agora: {lider} ({criterio}={resultados[lider][criterio]:.3f})")
+
+    duracao_total = time.perf_counter() - inicio
+    print(f"\n⏱️  Tarefas: {duracao_total:.2f} s de relógio ({soma:.2f} s somando as tarefas)")
+    if not resultados:
+        raise RuntimeError(f"Nenhum modelo candidato terminou em {timeout_candidato:g} s")
+
+    # Escolher melhor modelo baseado em F1-Score (fora da dobra, se disponível)
+    melhor_modelo_nome = max(resultados.keys(), key=lambda k: resultados[k][criterio])
     melhor_modelo = resultados[melhor_modelo_nome]['modelo']
 
     print(f"\n🏆 Melhor modelo: {melhor_modelo_nome}")
+    if descartados:
+        print(f"   Descartados pelo timeout: {', '.join(descartados)}")
+    registrar_evento(log_treino, {'evento': 'fim', 'melhor': melhor_modelo_nome, 'descartados': descartados,
+                                  'decorrido': time.perf_counter() - inicio_treino})
 
     # ✅ CORREÇÃO 5: ANÁLISE DE THRESHOLD OTIMIZADO
-    y_proba_melhor = resultados[melhor_modelo_nome]['y_proba']
-
-    # Testar diferentes thresholds
-    thresholds = [0.3, 0.4, 0.5, 0.6, 0.7]
-    print("\n🎯 ANÁLISE DE THRESHOLDS:")
-
-    melhor_threshold = 0.5
-    melhor_f1_threshold = 0
-
-    for threshold in thresholds:
-        y_pred_threshold = (y_proba_melhor >= threshold).astype(int)
-        f1_threshold = f1_score(y_test, y_pred_threshold)
-        precision_threshold = precision_score(y_test, y_pred_threshold)
-        recall_threshold = recall_score(y_test, y_pred_threshold)
-
-        print(f"  Threshold {threshold}: F1={f1_threshold:.3f}, Precision={precision_threshold:.3f}, Recall={recall_threshold:.3f}")
-
-        if f1_threshold > melhor_f1_threshold:
-            melhor_f1_threshold = f1_threshold
-            melhor_threshold = threshold
-
-    print(f"\n🎯 Melhor threshold: {melhor_threshold} (F1={melhor_f1_threshold:.3f})")
+    # No modo 'dobras' o threshold vem das probabilidades fora da dobra
+    # (todo o treino, sem novo ajuste); no 'holdout', do conjunto de teste
+    if reaproveitar:
+        y_avaliacao = y_train
+        y_proba_melhor = resultados[melhor_modelo_nome]['proba_oof']
+    else:
+        y_avaliacao = y_test
+        y_proba_melhor = resultados[melhor_modelo_nome]['y_proba']
+
+    # Curva completa (uma ordenação) e escolha pelo objetivo configurado
+    curva = curva_threshold(y_avaliacao, y_proba_melhor)
+    melhor_threshold, indice, valor_objetivo = escolher_threshold(curva, **(objetivo_threshold or {}))
+    resultados[melhor_modelo_nome]['curva_threshold'] = curva
+
+    print(f"\n🎯 ANÁLISE DE THRESHOLDS ({len(curva['threshold'])} cortes avaliados):")
+    for referencia in [0.3, 0.4, 0.5, 0.6, 0.7]:
+        i = ponto_da_curva(curva, referencia)
+        print(f"  Threshold {referencia}: F1={curva['f1'][i]:.3f}, Precision={curva['precision'][i]:.3f}, "
+              f"Recall={curva['recall'][i]:.3f}")
+
+    descricao = (objetivo_threshold or {}).get('objetivo', 'f1')
+    print(f"\n🎯 Melhor threshold: {melhor_threshold:.4f} ({descricao}={valor_objetivo:.3f}; "
+          f"F1={curva['f1'][indice]:.3f}, Precision={curva['precision'][indice]:.3f}, "
+          f"Recall={curva['recall'][indice]:.3f})")
 
     # Relatório detalhado do melhor modelo com melhor threshold
     y_pred_otimizado = (y_proba_melhor >= melhor_threshold).astype(int)
 
     print("\n📊 Relatório de Classificação (Threshold Otimizado):")
-    print(classification_report(y_test, y_pred_otimizado, 
+    print(classification_report(y_avaliacao, y_pred_otimizado, 
                               target_names=['Fracasso', 'Sucesso']))
 
     # Feature importance (apenas para Random Forest)
@@ -254,46 +640,91 @@ def treinar_modelos(X, y):
         print("\n🎯 Top 10 Features mais importantes:")
         print(importancias.head(10))
 
+    print(f"\n⏱️  Treino: {len(tarefas)} ajustes de modelo em {time.perf_counter() - inicio_treino:.2f} s")
+
     return melhor_modelo, scaler, resultados, melhor_threshold
 
 
-def salvar_modelo(modelo, scaler, label_encoders, feature_names, threshold):
-    """Salva o modelo e componentes necessários - VERSÃO CORRIGIDA"""
+def salvar_modelo(modelo, scaler, label_encoders, feature_names, threshold, curva_threshold=None, extras=None):
+    """Salva o modelo e componentes necessários em um bundle único e versionado"""
     print("\n💾 Salvando modelo...")
 
-    # Criar diretório se não existir
-    os.makedirs('models', exist_ok=True)
-
-    # Salvar componentes
-    joblib.dump(modelo, 'models/modelo_projetos.pkl')
-    joblib.dump(scaler, 'models/scaler.pkl')
-    joblib.dump(label_encoders, 'models/label_encoders.pkl')
-    joblib.dump(feature_names, 'models/feature_names.pkl')
-    joblib.dump(threshold, 'models/threshold.pkl')  # ✅ Salvar threshold otimizado
+    # Modelo, scaler, encoders, features e threshold no mesmo arquivo,
+    # com manifesto e hash: não há como misturar artefatos de treinos diferentes.
+    # A curva precision/recall usada na escolha do threshold vai junto.
+    manifesto = salvar_bundle('models/modelo_projetos.bundle', modelo, scaler,
+                              label_encoders, feature_names, threshold, extras=extras,
+                              curva_threshold=curva_threshold)
 
-    print("✅ Modelo salvo em 'models/modelo_projetos.pkl'")
+    print(f"✅ Modelo salvo em 'models/modelo_projetos.bundle' (sha256 {manifesto['sha256'][:12]})")
     print(f"✅ Threshold otimizado salvo: {threshold}")
 
 
-def main():
-    """Função principal"""
+def salvar_leaderboard(leaderboard, caminho='models/leaderboard_busca.json'):
+    """Grava o leaderboard da busca de hiperparâmetros em JSON"""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'w') as f:
+        json.dump(leaderboard, f, indent=2, ensure_ascii=False)
+    print(f"✅ Leaderboard da busca salvo em '{caminho}' ({len(leaderboard)} configurações)")
+
+
+def main(caminho=CAMINHO_DADOS, tamanho_bloco=None, usar_cache=True, workers=None, modo='holdout',
+         objetivo_threshold=None, busca=None, timeout_candidato=None, log_treino=CAMINHO_LOG_TREINO):
+    """
+    Função principal
+
+    Args:
+        caminho (str): CSV de treino
+        tamanho_bloco (int): Se informado, lê o CSV em blocos desse tamanho
+        usar_cache (bool): Reaproveita os dados limpos em cache Parquet
+        workers (int): Processos do treino (padrão: TREINO_WORKERS ou número de CPUs)
+        modo (str): 'holdout' ou 'dobras' (ver treinar_modelos)
+        objetivo_threshold (dict): Argumentos de escolher_threshold (padrão: maior F1)
+        busca (dict): Argumentos de buscar_hiperparametros (None: hiperparâmetros fixos)
+        timeout_candidato (float): Segundos máximos por modelo candidato
+        log_treino (str): Log JSON Lines das métricas de cada candidato (None desativa)
+    """
     print("🚀 INICIANDO TREINAMENTO DO MODELO - VERSÃO CORRIGIDA")
     print("=" * 60)
 
-    # Carregar dados
-    df = pd.read_csv('data/Project Management Dataset.csv')
-
-    # Preparar dados
-    data = preparar_dados(df)
+    # Carregar e preparar dados
+    data = carregar_dados(caminho, tamanho_bloco,
+                          diretorio_cache=dataset.DIRETORIO_CACHE if usar_cache else None)
 
     # Criar features
     X, y, label_encoders = criar_features(data)
+    # Mesmo pipeline (cortes de quantis do treino + encoders) usado na predição
+    pipeline = PipelineFeatures(list(X.columns), label_encoders, data.attrs['cortes'])
 
     # Treinar modelos
-    modelo, scaler, resultados, threshold = treinar_modelos(X, y)
+    modelo, scaler, resultados, threshold = treinar_modelos(X, y, workers, modo, objetivo_threshold, busca,
+                                                            timeout_candidato, log_treino)
+    escolhido = next(r for r in resultados.values() if 'curva_threshold' in r)
+
+    # Estado usado pelas atualizações incrementais (src/model/incremental.py)
+    extras = {
+        **pipeline.para_manifesto(),
+        'amostras_vistas': int(scaler.n_samples_seen_),
+        'referencia_drift': referencia_drift(X, COLUNAS_CATEGORICAS),
+        'taxa_sucesso': float(np.mean(y))
+    }
+    if busca is not None:
+        leaderboard = sorted((linha for r in resultados.values() for linha in r['leaderboard']),
+                             key=lambda linha: (-linha['rodada'], -linha['f1_medio']))
+        salvar_leaderboard(leaderboard)
+        extras['hiperparametros'] = {k: v for k, v in escolhido['parametros'].items()
+                                     if isinstance(v, (str, int, float, bool, type(None)))}
+
+    # Exportar a Random Forest para o formato plano usado na predição
+    modelo_exportado = modelo
+    if hasattr(modelo, 'estimators_'):
+        modelo_exportado, diferenca = exportar_floresta(modelo, X)
+        print(f"\n🌲 Floresta exportada: {modelo_exportado.n_estimators} árvores, "
+              f"{len(modelo_exportado.feature)} nós (diferença máx. vs sklearn: {diferenca:.1e})")
 
     # Salvar modelo
-    salvar_modelo(modelo, scaler, label_encoders, list(X.columns), threshold)
+    salvar_modelo(modelo_exportado, scaler, label_encoders, list(X.columns), threshold,
+                  escolhido['curva_threshold'], extras)
 
     print("\n✅ Treinamento concluído com sucesso!")
     print("\n🔧 PRINCIPAIS CORREÇÕES APLICADAS:")
@@ -307,4 +738,43 @@ def main():
 
 
 if __name__ == "__main__":
-    modelo, scaler, label_encoders, resultados, threshold = main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Treina o modelo de predição de sucesso")
+    parser.add_argument('--dados', default=CAMINHO_DADOS, help="CSV de treino")
+    parser.add_argument('--bloco', type=int, default=None,
+                        help="Lê o CSV em blocos de N linhas (para arquivos maiores que a memória)")
+    parser.add_argument('--sem-cache', action='store_true',
+                        help="Refaz a limpeza do CSV sem ler nem gravar o cache Parquet")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Processos do treino e da validação cruzada (padrão: TREINO_WORKERS ou CPUs)")
+    parser.add_argument('--modo', choices=MODOS_TREINO, default='holdout',
+                        help="'dobras' reaproveita os modelos da validação cruzada em vez de um ajuste extra "
+                             "(a Random Forest final usa n_estimators árvores sorteadas entre as das dobras)")
+    parser.add_argument('--objetivo', choices=OBJETIVOS_THRESHOLD, default='f1',
+                        help="Critério de escolha do threshold")
+    parser.add_argument('--beta', type=float, default=1.0, help="Peso do recall no objetivo 'fbeta'")
+    parser.add_argument('--custo-fp', type=float, default=1.0,
+                        help="Objetivo 'custo': custo de prever sucesso para um projeto que fracassa")
+    parser.add_argument('--custo-fn', type=float, default=1.0,
+                        help="Objetivo 'custo': custo de prever fracasso para um projeto bem-sucedido")
+    parser.add_argument('--busca', action='store_true',
+                        help="Busca os hiperparâmetros por successive halving antes do treino")
+    parser.add_argument('--busca-segundos', type=float, default=None, help="Orçamento de tempo de relógio da busca")
+    parser.add_argument('--busca-cpu-segundos', type=float, default=None,
+                        help="Orçamento de tempo de CPU da busca (soma das tarefas)")
+    parser.add_argument('--busca-eta', type=int, default=3, help="Fator de corte entre rodadas da busca")
+    parser.add_argument('--timeout-candidato', type=float, default=None,
+                        help="Segundos máximos por modelo candidato; quem passar disso é descartado")
+    parser.add_argument('--log-treino', default=CAMINHO_LOG_TREINO,
+                        help="Log JSON Lines com as métricas de cada candidato ('' desativa)")
+    args = parser.parse_args()
+
+    busca = None
+    if args.busca:
+        busca = {'segundos': args.busca_segundos, 'cpu_segundos': args.busca_cpu_segundos, 'eta': args.busca_eta}
+    objetivo = {'objetivo': args.objetivo, 'beta': args.beta, 'custo_fp': args.custo_fp, 'custo_fn': args.custo_fn}
+    modelo, scaler, label_encoders, resultados, threshold = main(
+        args.dados, args.bloco, usar_cache=not args.sem_cache, workers=args.workers, modo=args.modo,
+        objetivo_threshold=objetivo, busca=busca, timeout_candidato=args.timeout_candidato,
+        log_treino=args.log_treino or None)
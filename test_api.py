@@ -129,6 +129,93 @@ def test_batch():
         print(f"   ❌ Erro: {response.status_code}")
 
 
+def test_stream():
+    """Testa predição em streaming de um CSV (formato de data/projetos.csv)"""
+    print("\n🌊 Testando predição em streaming (CSV)...")
+
+    with open("data/projetos.csv", "rb") as f:
+        response = requests.post(
+            f"{BASE_URL}/predict-stream",
+            data=f,
+            headers={"Content-Type": "text/csv"},
+            stream=True
+        )
+        linhas = [json.loads(linha) for linha in response.iter_lines() if linha]
+
+    if response.status_code == 200:
+        resumo = linhas[-1]['resumo']
+        print(f"   ✅ {len(linhas) - 1} resultados recebidos em streaming")
+        print(f"   ✅ Sucesso: {resumo['processados_com_sucesso']} de {resumo['total_projetos']} projetos")
+    else:
+        print(f"   ❌ Erro: {response.status_code}")
+
+def test_compacto():
+    """Testa o modo compacto: códigos de recomendação resolvidos pelo catálogo"""
+    print("\n📨 Testando resposta compacta...")
+    projeto = {
+        "project_cost": 50000.0,
+        "project_benefit": 500000.0,
+        "start_date": "2024-01-01",
+        "end_date": "2024-06-30",
+        "project_type": "INCOME GENERATION",
+        "region": "North",
+        "department": "eCommerce",
+        "complexity": "Low",
+        "phase": "Phase 4 - Implement"
+    }
+    response = requests.post(f"{BASE_URL}/predict?compacto=true", json=projeto)
+    catalogo = requests.get(f"{BASE_URL}/recomendacoes").json()["recomendacoes"]
+
+    if response.status_code == 200:
+        resultado = response.json()
+        print(f"   ✅ {len(response.content)} bytes: {resultado['probabilidade_sucesso']:.1%}, "
+              f"ROI {resultado['roi_esperado']:.1%}")
+        for codigo in resultado["recomendacoes"]:
+            print(f"      {codigo}: {catalogo[codigo]}")
+    else:
+        print(f"   ❌ Erro: {response.status_code}")
+
+def test_arrow():
+    """Testa predição colunar: tabela Arrow na ida e record batch na volta"""
+    print("\n🏹 Testando predição colunar (Arrow IPC)...")
+    try:
+        import pyarrow as pa
+    except ImportError:
+        print("   ⏭️  pyarrow não instalado")
+        return
+
+    tabela = pa.table({
+        "project_cost": [1500000.0, 50000.0, -1.0],
+        "project_benefit": [2500000.0, 500000.0, 100000.0],
+        "start_date": ["2024-03-01", "2024-01-01", "2024-01-01"],
+        "end_date": ["2024-09-30", "2024-06-30", "2024-12-31"],
+        "project_type": ["INCOME GENERATION", "INCOME GENERATION", "PROCESS IMPROVEMENT"],
+        "region": ["North", "North", "South"],
+        "department": ["eCommerce", "eCommerce", "Admin & BI"],
+        "complexity": ["High", "Low", "Medium"],
+        "phase": ["Phase 1 - Explore", "Phase 4 - Implement", "Phase 2 - Develop"]
+    })
+    corpo = pa.BufferOutputStream()
+    with pa.ipc.new_stream(corpo, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+
+    response = requests.post(
+        f"{BASE_URL}/predict-arrow",
+        data=corpo.getvalue().to_pybytes(),
+        headers={"Content-Type": "application/vnd.apache.arrow.stream"}
+    )
+
+    if response.status_code == 200:
+        resultados = pa.ipc.open_stream(response.content).read_all()
+        for linha in resultados.to_pylist():
+            if linha['erros']:
+                print(f"   ⚠️  Projeto {linha['projeto_id']}: bitmap de erros {linha['erros']}")
+            else:
+                print(f"   ✅ Projeto {linha['projeto_id']}: {linha['probabilidade_sucesso']:.1%} "
+                      f"(ROI {linha['roi_esperado']:.1%})")
+    else:
+        print(f"   ❌ Erro: {response.status_code}")
+
 if __name__ == "__main__":
     print("🚀 TESTE DA API DE PREDIÇÃO")
     print("=" * 50)
@@ -141,6 +228,9 @@ if __name__ == "__main__":
             test_prediction()
             test_endpoints()
             test_batch()
+            test_stream()
+            test_compacto()
+            test_arrow()
             print("\n✅ Todos os testes passaram!")
         else:
             print("\n❌ API não está respondendo. Verifique se está rodando.")
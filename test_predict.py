@@ -0,0 +1,1189 @@
+"""
+Testes do preditor (caminho individual x caminho em lote)
+Execute a partir da raiz do projeto, depois de treinar o modelo
+"""
+import json
+import os
+import sys
+import tempfile
+import warnings
+from datetime import datetime
+import numpy as np
+import pandas as pd
+warnings.filterwarnings('ignore')
+
+# Adicionar src ao path
+sys.path.append('src')
+
+from api import colunar, respostas
+from api.validacao import (ERRO_CAMPO_AUSENTE, ERRO_CATEGORIA, ERRO_CUSTO, ERRO_DATA, ERRO_MES, ERRO_PERIODO,
+                           ERRO_TIPO, colunas_dos_registros, filtrar, validar_colunas)
+from model.busca import buscar_hiperparametros
+from model.bundle import BundleInvalido, carregar_bundle, converter_artefatos_legados, salvar_bundle
+from model.cache import CachePredicoes
+from model.forest import FlorestaPlana, numba
+from model.predict import PreditorProjetos
+from model.recomendacoes import CATALOGO_RECOMENDACOES, MotorRecomendacoes, mensagens
+from model import dataset, paralelo
+from model.sketch import SketchQuantil
+from model.threshold import curva_threshold, escolher_threshold, ponto_da_curva
+from model.train import (CAMINHO_DADOS, carregar_dados, combinar_dobras, criar_features, definir_sucesso,
+                         modelos_candidatos, preparar_dados, preparar_dados_em_blocos, rotular_sucesso)
+
+preditor = PreditorProjetos()
+
+
+def projetos_do_csv(caminho='data/Project Management Dataset.csv'):
+    """Converte as linhas do CSV de treino no formato de entrada da API"""
+    df = pd.read_csv(caminho)
+    projetos = []
+    for _, row in df.iterrows():
+        start = pd.to_datetime(row['Start Date'])
+        end = pd.to_datetime(row['End Date'])
+        projetos.append({
+            'project_cost': float(row[' Project Cost '].replace(',', '')),
+            'project_benefit': float(row[' Project Benefit '].replace(',', '')),
+            'start_date': start.strftime('%Y-%m-%d'),
+            'end_date': end.strftime('%Y-%m-%d'),
+            'project_type': row['Project Type'],
+            'region': row['Region'],
+            'department': row['Department'],
+            'complexity': row['Complexity'],
+            'phase': row['Phase'],
+            'year': int(row['Year']),
+            'month': int(row['Month'])
+        })
+    return projetos
+
+
+def _preparar_entrada_pandas(dados_projeto):
+    """Referência: features de um projeto pelo caminho original com pandas (pd.to_datetime + DataFrame)"""
+    start_date = pd.to_datetime(dados_projeto['start_date'])
+    end_date = pd.to_datetime(dados_projeto['end_date'])
+    agora = datetime.now()
+    base = {
+        'Project Cost': dados_projeto['project_cost'],
+        'Project Benefit': dados_projeto['project_benefit'],
+        'Year': dados_projeto.get('year', agora.year),
+        'Month': dados_projeto.get('month', agora.month),
+        'Duracao_Dias': (end_date - start_date).days
+    }
+    preditor._codificar_categoricas(dados_projeto, base)
+    return pd.DataFrame([preditor.pipeline.calcular(base)])[preditor.feature_names]
+
+
+def test_linha_igual_dataframe():
+    """preparar_linha deve reproduzir o caminho original com pandas valor a valor"""
+    print("🔍 Comparando preparar_linha com o caminho pandas...")
+    df = pd.read_csv('data/Project Management Dataset.csv')
+    projetos = projetos_do_csv()
+
+    variacoes = []
+    for projeto, (_, row) in zip(projetos, df.iterrows()):
+        variacoes.append(projeto)
+        # Datas no formato original do CSV (M/D/YYYY) passam pelo pandas
+        variacoes.append(dict(projeto, start_date=row['Start Date'], end_date=row['End Date']))
+    variacoes.append(dict(projetos[0], complexity='Desconhecida', region='Centro'))
+    variacoes.append({k: v for k, v in projetos[1].items() if k not in ('year', 'month')})
+    variacoes.append(dict(projetos[2], year=None, month=None))
+
+    for projeto in variacoes:
+        rapido = preditor.preparar_linha(projeto)
+        referencia = _preparar_entrada_pandas(projeto).to_numpy(dtype=float)
+        assert rapido.dtype == np.float64
+        np.testing.assert_array_equal(rapido, referencia)
+    print(f"   ✅ {len(variacoes)} linhas idênticas")
+
+
+def test_tabelas_categoricas():
+    """As tabelas compiladas devem codificar como os LabelEncoders salvos"""
+    print("\n🔤 Comparando tabelas categóricas com os LabelEncoders...")
+    for cat_feature, encoder in preditor.label_encoders.items():
+        tabela, codigo_padrao, classe_padrao = preditor.tabelas_categoricas[cat_feature]
+        classes = list(encoder.classes_)
+        assert [tabela[c] for c in classes] == encoder.transform(classes).tolist()
+        assert codigo_padrao == encoder.transform([classes[0]])[0]
+        assert classe_padrao == classes[0]
+    print("   ✅ Tabelas consistentes")
+
+
+def test_lote_igual_individual():
+    """prever_lote deve produzir exatamente o mesmo resultado que prever"""
+    print("📦 Comparando prever_lote com prever...")
+    projetos = projetos_do_csv()
+
+    resultados_lote = preditor.prever_lote(projetos)
+
+    for projeto, resultado in zip(projetos, resultados_lote):
+        esperado = preditor.prever(projeto)
+        assert resultado['probabilidade_sucesso'] == esperado['probabilidade_sucesso']
+        assert resultado == esperado
+    print(f"   ✅ {len(projetos)} projetos idênticos")
+
+
+def test_lote_erros_por_projeto():
+    """Erros de um projeto não podem afetar os demais do lote"""
+    print("\n⚠️  Testando erros por projeto no lote...")
+    projetos = projetos_do_csv()[:3]
+    sem_duracao = dict(projetos[1], end_date=projetos[1]['start_date'])
+    sem_custo = {k: v for k, v in projetos[2].items() if k != 'project_cost'}
+    formato_livre = dict(projetos[0], start_date='01/02/2021')
+
+    resultados = preditor.prever_lote([projetos[0], sem_duracao, sem_custo, formato_livre])
+
+    assert 'erro' not in resultados[0]
+    assert 'division by zero' in resultados[1]['erro']
+    assert resultados[2] == {'erro': "'project_cost'"}
+    # Datas fora do padrão ISO seguem pelo caminho individual
+    assert resultados[3] == preditor.prever(formato_livre)
+    assert preditor.prever_lote([]) == []
+    print("   ✅ Erros reportados individualmente")
+
+
+class _PreditorDeTeste:
+    """Preditor falso: dobra o valor de cada projeto e registra os lotes recebidos"""
+
+    def __init__(self):
+        self.lotes = []
+        self.falhar = False
+
+    def prever_lote(self, dados_lote):
+        self.lotes.append(list(dados_lote))
+        if self.falhar:
+            raise RuntimeError("modelo indisponível")
+        return [{'erro': 'projeto inválido'} if dados < 0 else {'valor': dados * 2} for dados in dados_lote]
+
+
+def test_agrupador():
+    """Lotes cheios saem na hora, os demais após a janela; erros chegam a cada requisição"""
+    print("\n🧺 Testando agrupamento de predições...")
+    import asyncio
+    import time
+    from api.coalescer import AgrupadorPredicoes
+    from api.executor import ExecutorPredicoes
+
+    falso = _PreditorDeTeste()
+    executor = ExecutorPredicoes(max_workers=1)
+    agrupador = AgrupadorPredicoes(espera_maxima_ms=50, tamanho_maximo=4, executar=executor.executar)
+
+    async def cenario():
+        # Lote cheio: dispara sem esperar a janela, e a task fica referenciada até terminar
+        inicio = time.perf_counter()
+        tarefas = [asyncio.ensure_future(agrupador.prever(i, falso)) for i in range(4)]
+        await asyncio.sleep(0)
+        assert len(agrupador._lotes_em_execucao) == 1
+        assert await asyncio.gather(*tarefas) == [{'valor': 2 * i} for i in range(4)]
+        assert time.perf_counter() - inicio < 0.05 and falso.lotes == [[0, 1, 2, 3]]
+
+        # Lote incompleto: sai quando a janela expira
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(agrupador.prever(10, falso), agrupador.prever(11, falso))
+        assert resultados == [{'valor': 20}, {'valor': 22}]
+        assert time.perf_counter() - inicio >= 0.045 and falso.lotes[-1] == [10, 11]
+
+        # Projeto inválido: só a sua requisição recebe o erro
+        resultados = await asyncio.gather(agrupador.prever(5, falso), agrupador.prever(-1, falso),
+                                          return_exceptions=True)
+        assert resultados[0] == {'valor': 10}
+        assert isinstance(resultados[1], ValueError) and str(resultados[1]) == 'projeto inválido'
+
+        # Recarga no meio da janela: cada requisição é pontuada pelo preditor que tomou
+        novo = _PreditorDeTeste()
+        resultados = await asyncio.gather(agrupador.prever(3, falso), agrupador.prever(4, novo),
+                                          agrupador.prever(6, falso))
+        assert resultados == [{'valor': 6}, {'valor': 8}, {'valor': 12}]
+        assert falso.lotes[-1] == [3, 6] and novo.lotes == [[4]]
+
+        # Falha do modelo: todas as requisições do lote recebem a exceção
+        falso.falhar = True
+        resultados = await asyncio.gather(agrupador.prever(1, falso), agrupador.prever(2, falso),
+                                          return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in resultados)
+        await asyncio.sleep(0)  # Callback de conclusão da task do lote
+        assert agrupador._lotes_em_execucao == set()
+
+    try:
+        asyncio.run(cenario())
+    finally:
+        executor.encerrar()
+
+    metricas = agrupador.metricas()
+    assert metricas['lotes_processados'] == 6 and metricas['projetos_processados'] == 13
+    assert metricas['maior_lote'] == 4 and metricas['distribuicao_tamanhos'] == {'1': 1, '2': 4, '4': 1}
+    print(f"   ✅ {metricas['lotes_processados']} lotes, erros entregues a quem aguardava")
+
+
+def _api_de_teste():
+    """Módulo da API e um TestClient para ele (None, None se o httpx não estiver instalado)"""
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError:
+        return None, None
+    from api import main
+    return main, TestClient(main.app)
+
+
+def test_fila_cheia():
+    """Com a fila cheia o executor recusa a tarefa e a API responde 503 com Retry-After"""
+    print("\n🚦 Testando backpressure da fila de predições...")
+    import asyncio
+    import threading
+    from api.executor import ExecutorPredicoes, FilaCheia
+
+    executor = ExecutorPredicoes(max_workers=1, fila_maxima=1)
+    iniciada, liberar = threading.Event(), threading.Event()
+
+    def bloquear():
+        iniciada.set()
+        liberar.wait(10)
+        return 'ok'
+
+    # A tarefa bloqueante ocupa a única vaga da fila a partir de outra thread
+    ocupante = threading.Thread(target=lambda: asyncio.run(executor.executar(bloquear)))
+    ocupante.start()
+    try:
+        assert iniciada.wait(5)
+        try:
+            asyncio.run(executor.executar(sum, [1, 2]))
+            raise AssertionError("Tarefa aceita com a fila cheia")
+        except FilaCheia:
+            pass
+        assert executor.metricas()['pendentes'] == 1 and executor.rejeitadas == 1
+
+        main, cliente = _api_de_teste()
+        if main is None:
+            print("   ⏭️  httpx não instalado (endpoints não testados)")
+        else:
+            anterior, main.executor = main.executor, executor
+            try:
+                projeto = projetos_do_csv()[0]
+                for caminho, corpo in (('/predict', projeto), ('/predict-batch', {'projetos': [projeto]})):
+                    resposta = cliente.post(caminho, json=corpo)
+                    assert resposta.status_code == 503, (caminho, resposta.text)
+                    assert resposta.headers['Retry-After'] == '1'
+            finally:
+                main.executor = anterior
+    finally:
+        liberar.set()
+        ocupante.join()
+
+    assert executor.metricas()['pendentes'] == 0 and executor.executadas == 1
+    executor.encerrar()
+    print(f"   ✅ {executor.rejeitadas} tarefas recusadas com a fila cheia")
+
+
+def test_floresta_compartilhada():
+    """A floresta mapeada em memória deve reproduzir o predict_proba do sklearn"""
+    print("\n🌲 Comparando floresta compartilhada com o sklearn...")
+    legado = PreditorProjetos(caminho_bundle=None)
+    compartilhado = PreditorProjetos(compartilhado=True, caminho_bundle=None)
+    projetos = projetos_do_csv()
+    projetos += [dict(p, year=None) for p in projetos]  # NaN segue missing_go_to_left
+    X, _ = legado.preparar_lote(projetos)
+
+    esperado = legado.modelo.predict_proba(X)
+    np.testing.assert_allclose(compartilhado.modelo.predict_proba(X), esperado, rtol=0, atol=1e-12)
+
+    # Os dois motores da floresta plana devem concordar com o sklearn
+    arrays = compartilhado.modelo.arrays
+    motores = ['numpy'] + (['numba'] if numba is not None else [])
+    for motor in motores:
+        plana = FlorestaPlana(arrays, motor=motor)
+        np.testing.assert_allclose(plana.predict_proba(X), esperado, rtol=0, atol=1e-12)
+        np.testing.assert_allclose(plana.predict_proba(X[:1]), esperado[:1], rtol=0, atol=1e-12)
+    print(f"   ✅ {len(projetos)} projetos com as mesmas probabilidades")
+
+
+def test_bundle():
+    """O bundle deve reproduzir os pickles legados e recusar arquivos adulterados"""
+    print("\n📦 Testando bundle único do modelo...")
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = os.path.join(tmp, 'modelo.bundle')
+        manifesto = converter_artefatos_legados(destino=caminho)
+        assert len(manifesto['sha256']) == 64
+
+        legado = PreditorProjetos(caminho_bundle=None)
+        do_bundle = PreditorProjetos(caminho_bundle=caminho)
+        assert do_bundle.feature_names == legado.feature_names
+        assert do_bundle.threshold == legado.threshold
+
+        projetos = projetos_do_csv()
+        for a, b in zip(legado.prever_lote(projetos), do_bundle.prever_lote(projetos)):
+            assert abs(a['probabilidade_sucesso'] - b['probabilidade_sucesso']) < 1e-12
+            assert a['recomendacoes'] == b['recomendacoes']
+
+        # Um único byte alterado invalida o hash (conferido só quando pedido)
+        conteudo = bytearray(open(caminho, 'rb').read())
+        conteudo[-1] ^= 0xFF
+        with open(caminho, 'wb') as f:
+            f.write(conteudo)
+        assert carregar_bundle(caminho)['manifesto']['sha256'] == manifesto['sha256']
+        try:
+            carregar_bundle(caminho, verificar=True)
+            raise AssertionError("Bundle adulterado foi aceito")
+        except BundleInvalido:
+            pass
+
+        # Arquivo truncado é recusado mesmo sem conferir o hash
+        with open(caminho, 'wb') as f:
+            f.write(conteudo[:len(conteudo) // 2])
+        try:
+            carregar_bundle(caminho)
+            raise AssertionError("Bundle truncado foi aceito")
+        except BundleInvalido:
+            pass
+    print("   ✅ Bundle consistente e verificado")
+
+
+class _PreditorAquecimentoInvalido(PreditorProjetos):
+    """Carrega normalmente, mas devolve uma probabilidade impossível no aquecimento"""
+
+    def prever(self, dados_projeto):
+        return dict(super().prever(dados_projeto), probabilidade_sucesso=1.5)
+
+
+def test_recarga_modelo():
+    """Bundle novo troca o preditor; carga ou aquecimento com falha mantém o atual"""
+    print("\n🔄 Testando recarga do modelo...")
+    import time
+    from api.reload import RecarregadorModelo
+
+    legado = PreditorProjetos(caminho_bundle=None)
+
+    def salvar(caminho, threshold):
+        salvar_bundle(caminho, legado.modelo, legado.scaler, legado.label_encoders, legado.feature_names,
+                      threshold)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = os.path.join(tmp, 'modelo.bundle')
+        salvar(caminho, 0.5)
+        ativo = {'preditor': PreditorProjetos(caminho_bundle=caminho)}
+        versao_inicial = ativo['preditor'].versao_modelo
+        fabrica = {'criar': lambda: PreditorProjetos(caminho_bundle=caminho)}
+        recarregador = RecarregadorModelo(lambda: fabrica['criar'](), lambda novo: ativo.update(preditor=novo),
+                                          [caminho])
+
+        # Bundle válido: troca o preditor e a versão
+        salvar(caminho, 0.42)
+        estado = recarregador.recarregar()
+        assert ativo['preditor'].threshold == 0.42 and ativo['preditor'].versao_modelo != versao_inicial
+        assert estado['versao_modelo'] == ativo['preditor'].versao_modelo and recarregador.recargas == 1
+        aprovado = ativo['preditor']
+
+        # Falhas de carga (bundle truncado) e de aquecimento: o preditor atual continua
+        valido = os.path.join(tmp, 'valido.bundle')
+        salvar(valido, 0.42)
+        conteudo = open(caminho, 'rb').read()
+        with open(caminho, 'wb') as f:
+            f.write(conteudo[:-100])
+        falhas = [(lambda: PreditorProjetos(caminho_bundle=caminho), 'BundleInvalido'),
+                  (lambda: _PreditorAquecimentoInvalido(caminho_bundle=valido), 'probabilidade inválida')]
+        for criar, erro in falhas:
+            fabrica['criar'] = criar
+            try:
+                recarregador.recarregar()
+                raise AssertionError("Recarga com falha foi aceita")
+            except (BundleInvalido, ValueError):
+                pass
+            assert ativo['preditor'] is aprovado and erro in recarregador.estado()['ultimo_erro']
+        assert recarregador.recargas == 1
+
+        # Observador: bundle regravado é recarregado sozinho
+        fabrica['criar'] = lambda: PreditorProjetos(caminho_bundle=caminho)
+        recarregador.iniciar_observador(0.05)
+        try:
+            salvar(caminho, 0.37)
+            limite = time.monotonic() + 10
+            while recarregador.recargas < 2 and time.monotonic() < limite:
+                time.sleep(0.05)
+        finally:
+            recarregador.parar_observador()
+        assert ativo['preditor'].threshold == 0.37
+        assert recarregador.estado()['ultima_recarga']['motivo'] == 'arquivo alterado'
+        assert recarregador.estado()['ultimo_erro'] is None
+
+    # /admin/reload exige o ADMIN_TOKEN quando definido
+    main, cliente = _api_de_teste()
+    if main is None:
+        print("   ⏭️  httpx não instalado (/admin/reload não testado)")
+    else:
+        anterior = main.recarregador
+        main.recarregador = RecarregadorModelo(lambda: legado, lambda novo: None, [])
+        os.environ['ADMIN_TOKEN'] = 'segredo'
+        try:
+            assert cliente.post('/admin/reload').status_code == 403
+            assert cliente.post('/admin/reload', headers={'X-Admin-Token': 'outro'}).status_code == 403
+            assert main.recarregador.recargas == 0
+            resposta = cliente.post('/admin/reload', headers={'X-Admin-Token': 'segredo'})
+            assert resposta.status_code == 200 and resposta.json()['versao_modelo'] == legado.versao_modelo
+        finally:
+            del os.environ['ADMIN_TOKEN']
+            main.recarregador = anterior
+    print("   ✅ Troca, falhas de carga e aquecimento, observador e token conferidos")
+
+
+def test_cache():
+    """Projetos com as mesmas features reaproveitam o resultado guardado"""
+    print("\n🗃️  Testando cache de predições...")
+    com_cache = PreditorProjetos(cache=CachePredicoes(tamanho_maximo=2, ttl_segundos=60))
+    projeto = projetos_do_csv()[0]
+
+    primeiro = com_cache.prever(projeto)
+    # Nome diferente não muda as features: deve ser um acerto
+    segundo = com_cache.prever(dict(projeto, nome='Outro nome'))
+    assert segundo == primeiro and segundo is not primeiro
+    assert com_cache.cache.acertos == 1 and com_cache.cache.falhas == 1
+
+    # Alterar o resultado devolvido não contamina o cache
+    segundo['recomendacoes'].append('x')
+    assert com_cache.prever(projeto) == primeiro
+
+    # 'low' e 'High' têm o mesmo vetor de features (encoder cai na classe padrão),
+    # mas recomendações diferentes: a chave inclui as categorias das regras
+    for complexidade in ('High', 'low', 'High'):
+        variante = dict(projeto, complexity=complexidade)
+        assert com_cache.prever(variante) == preditor.prever(variante)
+
+    # prever_lote consulta e alimenta o mesmo cache
+    lote = com_cache.prever_lote([projeto, projetos_do_csv()[1]])
+    assert lote[0] == primeiro and lote[1] == preditor.prever(projetos_do_csv()[1])
+    assert len(com_cache.cache._itens) == 2
+    print(f"   ✅ {com_cache.cache.metricas()}")
+
+
+def test_rotulos():
+    """Rotulagem vetorizada deve repetir as regras originais linha a linha"""
+    print("\n🏷️  Testando rotulagem de sucesso...")
+
+    def original(status, completion):
+        if status == 'Completed':
+            return 1
+        elif status == 'In - Progress' and completion >= 0.7:
+            return 1
+        elif status == 'Cancelled' or status == 'On - Hold':
+            return 0
+        elif status == 'In - Progress' and completion < 0.3:
+            return 0
+        else:
+            return -1
+
+    df = pd.read_csv('data/Project Management Dataset.csv')
+    status = list(df['Status'])
+    completion = list(df['Completion%'].str.rstrip('%').astype(float) / 100)
+    # Limites das faixas, valores faltantes e status desconhecidos
+    for s in ['In - Progress', 'Completed', 'Cancelled', 'On - Hold', 'Outro', None]:
+        for c in [0.0, 0.29999, 0.3, 0.5, 0.69999, 0.7, 1.0, np.nan]:
+            status.append(s)
+            completion.append(c)
+
+    esperado = [original(s, c) for s, c in zip(status, completion)]
+    assert list(rotular_sucesso(pd.Series(status), pd.Series(completion))) == esperado
+    linhas = pd.DataFrame({'Status': status, 'Completion': completion})
+    assert list(linhas.apply(definir_sucesso, axis=1)) == esperado
+    print(f"   ✅ {len(esperado)} projetos rotulados igual à versão linha a linha")
+
+
+def test_dados_em_blocos():
+    """Leitura em blocos deve gerar as mesmas features da leitura completa"""
+    print("\n📦 Testando ingestão em blocos...")
+    X, y, encoders = criar_features(preparar_dados(pd.read_csv(CAMINHO_DADOS)))
+    X_blocos, y_blocos, encoders_blocos = criar_features(preparar_dados_em_blocos(CAMINHO_DADOS, tamanho_bloco=7))
+
+    pd.testing.assert_frame_equal(X.reset_index(drop=True), X_blocos, check_dtype=False)
+    assert np.array_equal(y.to_numpy(), y_blocos.to_numpy())
+    for col, le in encoders.items():
+        assert list(le.classes_) == list(encoders_blocos[col].classes_)
+    print(f"   ✅ {len(X_blocos)} projetos idênticos")
+
+
+def test_sketch_quantil():
+    """Sketch exato em poucos dados e com erro de posição pequeno em muitos"""
+    print("\n📐 Testando sketch de quantis...")
+    valores = np.random.default_rng(0).lognormal(mean=15, sigma=1, size=200_000)
+
+    pequeno = SketchQuantil(capacidade=1000)
+    pequeno.atualizar(valores[:500])
+    pequeno.atualizar([np.nan])
+    assert pequeno.exato and pequeno.quantil(0.75) == pd.Series(valores[:500]).quantile(0.75)
+
+    grande = SketchQuantil(capacidade=1000)
+    for bloco in np.array_split(valores, 37):
+        grande.atualizar(bloco)
+    assert not grande.exato and grande.tamanho() < 20_000
+    for q in (0.1, 0.5, 0.75, 0.99):
+        posicao = (valores <= grande.quantil(q)).mean()
+        assert abs(posicao - q) < 0.01, (q, posicao)
+    print(f"   ✅ {grande.n:,} valores em {grande.tamanho():,} itens guardados")
+
+
+def test_cache_dados_limpos():
+    """Segunda leitura vem do Parquet e gera as mesmas features"""
+    print("\n📦 Testando cache Parquet dos dados limpos...")
+    if dataset.pyarrow is None:
+        print("   ⏭️  pyarrow não instalado")
+        return
+
+    X, y, _ = criar_features(preparar_dados(pd.read_csv(CAMINHO_DADOS)))
+    with tempfile.TemporaryDirectory() as pasta:
+        primeira = carregar_dados(diretorio_cache=pasta)
+        cache = dataset.caminho_cache(CAMINHO_DADOS, pasta)
+        assert os.listdir(pasta) == [os.path.basename(cache)]
+        segunda = carregar_dados(diretorio_cache=pasta)
+        # Cortes gravados nos metadados do próprio schema (não dependem da versão do pandas)
+        metadados = dataset.pq.read_schema(cache).metadata
+        assert json.loads(metadados[dataset.CHAVE_ATTRS])['cortes'] == primeira.attrs['cortes']
+
+    pd.testing.assert_frame_equal(primeira, segunda)
+    assert segunda.attrs['cortes'] == primeira.attrs['cortes']
+    assert isinstance(segunda['Region'].dtype, pd.CategoricalDtype)
+    X_cache, y_cache, _ = criar_features(segunda)
+    pd.testing.assert_frame_equal(X.reset_index(drop=True), X_cache, check_dtype=False)
+    assert np.array_equal(y.to_numpy(), y_cache.to_numpy())
+    print(f"   ✅ {os.path.basename(cache)}")
+
+
+def _somar_linhas(linhas):
+    """Tarefa de teste: soma linhas da matriz compartilhada"""
+    X = paralelo.matriz('X')
+    return float(X[linhas].sum()), bool(X.flags.writeable)
+
+
+def test_tarefas_paralelas():
+    """Pool de processos devolve o mesmo que a execução sequencial"""
+    print("\n⚙️  Testando execução paralela das tarefas...")
+    X = np.arange(60, dtype=np.float64).reshape(20, 3)
+    tarefas = [np.arange(i, 20, 4) for i in range(4)]
+
+    sequencial = paralelo.executar_tarefas(_somar_linhas, tarefas, {'X': X}, workers=1)
+    em_pool = paralelo.executar_tarefas(_somar_linhas, tarefas, {'X': X}, workers=2)
+
+    assert [r for r, _ in em_pool] == [(X[t].sum(), False) for t in tarefas]
+    assert [r[0] for r, _ in sequencial] == [r[0] for r, _ in em_pool]
+    assert all(segundos >= 0 for _, segundos in em_pool)
+    assert paralelo._MATRIZES == {}
+    print(f"   ✅ {len(tarefas)} tarefas com a matriz mapeada somente-leitura")
+
+
+def _tarefa_do_grupo(tarefa):
+    """Tarefa de teste: dorme (grupo lento) ou soma as linhas da matriz compartilhada"""
+    if tarefa['nome'] == 'lento':
+        import time
+        time.sleep(60)
+    return float(paralelo.matriz('X')[tarefa['linhas']].sum())
+
+
+def test_grupos_com_timeout():
+    """Cada grupo sai assim que termina; o grupo lento é descartado sem travar os demais"""
+    print("\n⏰ Testando grupos de tarefas com timeout...")
+    import time
+    X = np.arange(60, dtype=np.float64).reshape(20, 3)
+    tarefas = [{'nome': 'lento', 'linhas': [0]}] + [{'nome': 'rapido', 'linhas': [i, i + 1]} for i in range(3)]
+
+    inicio = time.perf_counter()
+    grupos = list(paralelo.executar_em_grupos(_tarefa_do_grupo, tarefas, {'X': X}, workers=1, timeout=2))
+    assert time.perf_counter() - inicio < 30
+    assert grupos[0] == ('lento', None)
+    nome, execucoes = grupos[1]
+    assert nome == 'rapido' and [r for r, _ in execucoes] == [X[[i, i + 1]].sum() for i in range(3)]
+
+    # Sem timeout e com 1 worker: no próprio processo, na ordem dos grupos
+    tarefas = [{'nome': n, 'linhas': [i]} for i, n in enumerate(['a', 'b', 'a'])]
+    grupos = list(paralelo.executar_em_grupos(_tarefa_do_grupo, tarefas, {'X': X}, workers=1))
+    assert [(n, [r for r, _ in e]) for n, e in grupos] == [('a', [X[0].sum(), X[2].sum()]), ('b', [X[1].sum()])]
+    print("   ✅ Grupo lento descartado, os demais entregues")
+
+
+def test_combinar_dobras():
+    """Modelo combinado deve reproduzir a média dos modelos das dobras"""
+    print("\n🔁 Testando combinação dos modelos das dobras...")
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import StratifiedKFold
+
+    X, y, _ = criar_features(carregar_dados(diretorio_cache=None))
+    X, y = X.to_numpy(dtype=np.float64), y.to_numpy()
+    dobras = list(StratifiedKFold(n_splits=3).split(X, y))
+
+    florestas = [RandomForestClassifier(n_estimators=10, max_depth=4, random_state=i).fit(X[t], y[t])
+                 for i, (t, _) in enumerate(dobras)]
+    combinada = combinar_dobras(florestas)
+    assert combinada.n_estimators == 30
+    media = np.mean([f.predict_proba(X) for f in florestas], axis=0)
+    assert np.allclose(combinada.predict_proba(X), media, atol=1e-12)
+
+    X_escalado = (X - X.mean(axis=0)) / X.std(axis=0)
+    logisticas = [LogisticRegression(C=0.1).fit(X_escalado[t], y[t]) for t, _ in dobras]
+    combinada = combinar_dobras(logisticas)
+    log_odds = np.mean([m.decision_function(X_escalado) for m in logisticas], axis=0)
+    assert np.allclose(combinada.decision_function(X_escalado), log_odds)
+    # Floresta limitada: mesma quantidade de árvores de um ajuste único, repartida entre as dobras
+    reduzida = combinar_dobras(florestas, max_arvores=10)
+    assert reduzida.n_estimators == 10
+    assert [sum(a is b for a in reduzida.estimators_ for b in f.estimators_) for f in florestas] == [4, 3, 3]
+    assert combinar_dobras(florestas, max_arvores=100).n_estimators == 30
+    # Os modelos das dobras continuam intactos
+    assert all(len(f.estimators_) == 10 for f in florestas)
+    print("   ✅ Floresta e Logistic Regression combinadas sem novo ajuste")
+
+
+def test_curva_threshold():
+    """Curva em uma ordenação deve bater com o sklearn em todos os cortes"""
+    print("\n🎯 Testando curva de thresholds...")
+    from sklearn.metrics import f1_score, precision_score, recall_score
+
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, size=300)
+    # Probabilidades com empates (arredondadas)
+    proba = np.round(np.clip(0.3 * y + rng.random(300) * 0.7, 0, 1), 2)
+    curva = curva_threshold(y, proba)
+    assert len(curva['threshold']) == len(np.unique(proba)) + 1
+
+    for i, t in enumerate(curva['threshold']):
+        y_pred = (proba >= t).astype(int)
+        assert curva['tp'][i] == ((y_pred == 1) & (y == 1)).sum()
+        assert curva['fp'][i] == ((y_pred == 1) & (y == 0)).sum()
+        assert abs(curva['precision'][i] - precision_score(y, y_pred, zero_division=0)) < 1e-12
+        assert abs(curva['recall'][i] - recall_score(y, y_pred)) < 1e-12
+        assert abs(curva['f1'][i] - f1_score(y, y_pred)) < 1e-12
+        assert ponto_da_curva(curva, t) == i
+
+    # Maior F1 e menor custo por busca exaustiva
+    threshold, _, valor = escolher_threshold(curva)
+    assert abs(valor - max(f1_score(y, (proba >= t).astype(int)) for t in np.unique(proba))) < 1e-12
+    threshold, _, custo = escolher_threshold(curva, objetivo='custo', custo_fp=1, custo_fn=5)
+    custos = [((proba >= t) & (y == 0)).sum() + 5 * ((proba < t) & (y == 1)).sum()
+              for t in curva['threshold']]
+    assert custo == min(custos)
+
+    # A curva vai para o bundle junto com o threshold escolhido
+    legado = PreditorProjetos(caminho_bundle=None)
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = os.path.join(tmp, 'modelo.bundle')
+        salvar_bundle(caminho, legado.modelo, legado.scaler, legado.label_encoders, legado.feature_names,
+                      threshold, curva_threshold=curva)
+        artefatos = carregar_bundle(caminho)
+        assert artefatos['threshold'] == threshold
+        for nome, array in curva.items():
+            assert np.array_equal(artefatos['curva_threshold'][nome], array)
+    print(f"   ✅ {len(curva['threshold'])} cortes conferidos")
+
+
+def test_busca_hiperparametros():
+    """Successive halving corta configurações e respeita o orçamento"""
+    print("\n🔎 Testando busca de hiperparâmetros...")
+    from sklearn.model_selection import StratifiedKFold
+
+    X, y, _ = criar_features(carregar_dados(diretorio_cache=None))
+    X, y = X.to_numpy(dtype=np.float64), y.to_numpy()
+    matrizes = {'X_train': X, 'X_train_scaled': (X - X.mean(axis=0)) / X.std(axis=0), 'y_train': y}
+    dobras = list(StratifiedKFold(n_splits=3).split(X, y))
+    modelos = modelos_candidatos()
+    modelos['Random Forest'].set_params(n_estimators=5)
+    espaco = {'Random Forest': {'max_depth': [2, 4, 6]}, 'Logistic Regression': {'C': [0.1, 1.0]}}
+
+    melhores, leaderboard = buscar_hiperparametros(modelos, matrizes, dobras, espaco=espaco, min_amostras=20,
+                                                   workers=1)
+    assert len(leaderboard) == 5
+    assert {linha['modelo'] for linha in leaderboard[:2]} == {'Random Forest', 'Logistic Regression'}
+    assert leaderboard[0]['rodada'] == 2 and leaderboard[0]['amostras_por_dobra'] == len(dobras[0][0])
+    for nome, parametros in melhores.items():
+        assert parametros == next(l['parametros'] for l in leaderboard if l['modelo'] == nome)
+
+    # Orçamento mínimo: só a primeira rodada, com menos projetos por dobra
+    _, leaderboard = buscar_hiperparametros(modelos, matrizes, dobras, espaco=espaco, min_amostras=20,
+                                            cpu_segundos=1e-9, workers=1)
+    assert {linha['rodada'] for linha in leaderboard} == {1}
+    assert all(linha['amostras_por_dobra'] == 22 for linha in leaderboard)
+
+    # Rodadas com o treino inteiro desde o início: a segunda só corta, sem ajustes (nem orçamento)
+    _, leaderboard = buscar_hiperparametros(modelos, matrizes, dobras, espaco=espaco, min_amostras=10_000,
+                                            cpu_segundos=1e-9, workers=1)
+    assert leaderboard[0]['rodada'] == 2 and len(leaderboard) == 5
+    assert all(linha['amostras_por_dobra'] == len(dobras[0][0]) for linha in leaderboard)
+    print(f"   ✅ Melhores: {melhores}")
+
+
+def test_atualizacao_incremental():
+    """Lote novo atualiza scaler e floresta sem retreino; drift forte é recusado"""
+    print("\n🌱 Testando atualização incremental...")
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+    from model.incremental import atualizar_modelo, preparar_novos
+    from model.drift import calcular_psi, referencia_drift
+
+    df = pd.read_csv(CAMINHO_DADOS)
+    data = preparar_dados(df)
+    X, _, encoders = criar_features(data)
+    base = {'manifesto': {'cortes': data.attrs['cortes']}, 'feature_names': list(X.columns),
+            'label_encoders': encoders}
+    X_hist, y_hist, _ = preparar_novos(df.iloc[:70], base)
+    X_novo, y_novo, desconhecidas = preparar_novos(df.iloc[70:], base)
+    assert not desconhecidas and len(X_hist) + len(X_novo) == len(X)
+
+    referencia = referencia_drift(X_hist, ['Project Type', 'Region', 'Department', 'Complexity', 'Phase'])
+    assert max(calcular_psi(referencia, X_hist).values()) < 1e-6
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho_novos = os.path.join(tmp, 'novos.csv')
+        df.iloc[70:].to_csv(caminho_novos, index=False)
+        scaler = StandardScaler().fit(X_hist)
+        extras = {'cortes': data.attrs['cortes'], 'amostras_vistas': len(X_hist), 'referencia_drift': referencia}
+
+        floresta = modelos_candidatos()['Random Forest'].set_params(n_estimators=20).fit(X_hist.to_numpy(), y_hist)
+        caminho = os.path.join(tmp, 'floresta.bundle')
+        salvar_bundle(caminho, floresta, scaler, encoders, base['feature_names'], 0.5, extras=extras)
+        resumo = atualizar_modelo(caminho_novos, caminho, forcar=True)
+        assert resumo['atualizado'] and resumo['arvores_novas'] == round(20 * len(X_novo) / len(X_hist))
+
+        artefatos = carregar_bundle(caminho)
+        completo = StandardScaler().fit(pd.concat([X_hist, X_novo]))
+        assert np.allclose(artefatos['scaler'].mean_, completo.mean_)
+        assert np.allclose(artefatos['scaler'].scale_, completo.scale_)
+        assert artefatos['modelo'].n_estimators == 20 + resumo['arvores_novas']
+        assert artefatos['manifesto']['amostras_vistas'] == len(X)
+        assert artefatos['manifesto']['atualizacoes_incrementais'] == 1
+
+        logistica = LogisticRegression(C=0.1, class_weight='balanced').fit(scaler.transform(X_hist), y_hist)
+        caminho = os.path.join(tmp, 'logistica.bundle')
+        salvar_bundle(caminho, logistica, scaler, encoders, base['feature_names'], 0.5, extras=extras)
+        perda_antes = -np.mean(np.log(logistica.predict_proba(scaler.transform(X_novo))[np.arange(len(y_novo)), y_novo]))
+        assert atualizar_modelo(caminho_novos, caminho, forcar=True)['atualizado']
+        artefatos = carregar_bundle(caminho)
+        proba = artefatos['modelo'].predict_proba(artefatos['scaler'].transform(X_novo))
+        assert -np.mean(np.log(proba[np.arange(len(y_novo)), y_novo])) < perda_antes
+
+        # Custos 50x maiores: drift forte, o bundle não muda
+        drift = df.iloc[70:].copy()
+        drift[' Project Cost '] = [f"{float(v.replace(',', '')) * 50:,.2f}" for v in drift[' Project Cost ']]
+        drift.to_csv(caminho_novos, index=False)
+        versao = artefatos['manifesto']['sha256']
+        resumo = atualizar_modelo(caminho_novos, caminho)
+        assert resumo['retreino_completo'] and not resumo['atualizado']
+        assert resumo['psi']['Project Cost'] > 0.2
+        assert carregar_bundle(caminho)['manifesto']['sha256'] == versao
+
+        # Bundle sem a referência de drift (convertido dos pickles, ou anterior a ela): pede treino completo
+        salvar_bundle(caminho, logistica, scaler, encoders, base['feature_names'], 0.5,
+                      extras={k: v for k, v in extras.items() if k != 'referencia_drift'})
+        try:
+            atualizar_modelo(caminho_novos, caminho)
+            raise AssertionError("Bundle sem referencia_drift foi aceito")
+        except ValueError as e:
+            assert 'treino completo' in str(e)
+    print("   ✅ Scaler igual ao ajuste completo, floresta e logística atualizadas, drift detectado")
+
+
+def test_pipeline_features():
+    """Com os cortes salvos no bundle, a API calcula as mesmas features do treino"""
+    print("\n🧬 Testando pipeline de features treino/predição...")
+    from model.features import CORTES_LEGADOS
+
+    data = preparar_dados(pd.read_csv(CAMINHO_DADOS))
+    X, _, encoders = criar_features(data)
+    legado = PreditorProjetos(caminho_bundle=None)
+    assert legado.pipeline.legado and legado.pipeline.cortes == CORTES_LEGADOS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = os.path.join(tmp, 'modelo.bundle')
+        salvar_bundle(caminho, legado.modelo, legado.scaler, encoders, list(X.columns), legado.threshold,
+                      extras={'cortes': data.attrs['cortes']})
+        do_bundle = PreditorProjetos(caminho_bundle=caminho)
+        assert not do_bundle.pipeline.legado and do_bundle.pipeline.cortes == data.attrs['cortes']
+
+        projetos = projetos_do_csv()
+        X_api, validos = do_bundle.preparar_lote(projetos)
+        assert validos.all()
+        assert np.array_equal(X_api[data.index], X.to_numpy(dtype=np.float64))
+        for i in data.index[:10]:
+            assert np.array_equal(do_bundle.preparar_linha(projetos[i])[0], X_api[i])
+    print(f"   ✅ Features idênticas ao treino com cortes {data.attrs['cortes']}")
+
+
+def _ler_stream(dados, formato, tamanho_pedaco, tamanho_bloco):
+    """Blocos de ler_blocos para um corpo entregue em pedaços de tamanho_pedaco bytes"""
+    import asyncio
+    from api.streaming import ler_blocos
+
+    async def pedacos():
+        for inicio in range(0, len(dados), tamanho_pedaco):
+            yield dados[inicio:inicio + tamanho_pedaco]
+
+    async def coletar():
+        return [bloco async for bloco in ler_blocos(pedacos(), formato, tamanho_bloco)]
+
+    return asyncio.run(coletar())
+
+
+def test_stream_blocos():
+    """NDJSON e CSV lidos aos pedaços: registros cortados entre pedaços e linhas inválidas isoladas"""
+    print("\n🌊 Testando leitura em blocos do /predict-stream...")
+    from api.streaming import LinhaInvalida
+
+    projetos = projetos_do_csv()
+
+    # NDJSON com linhas em branco, JSON quebrado e um valor que não é objeto
+    linhas = [json.dumps(p, ensure_ascii=False) for p in projetos[:10]]
+    linhas[3:3] = ['{"project_cost": 1', '', '[1, 2]']
+    ndjson = ('\n'.join(linhas) + '\n').encode('utf-8')
+    for tamanho_pedaco in (1, 7, len(ndjson)):
+        blocos = _ler_stream(ndjson, 'ndjson', tamanho_pedaco, 4)
+        assert [len(b) for b in blocos] == [4, 4, 4]
+        itens = [item for bloco in blocos for item in bloco]
+        assert isinstance(itens[3], LinhaInvalida) and 'JSON inválido' in itens[3].mensagem
+        assert isinstance(itens[4], LinhaInvalida) and 'objeto JSON' in itens[4].mensagem
+        assert itens[:3] + itens[5:] == projetos[:10]
+
+    # CSV do dataset (BOM, valores com vírgulas entre aspas), um registro com campos a mais
+    # abrindo um bloco e um campo com quebra de linha
+    with open('data/Project Management Dataset.csv', 'rb') as f:
+        cabecalho, *registros = f.read().decode('utf-8').splitlines()
+    quebrado = '"Nome com\nquebra de linha"' + registros[0][registros[0].index(','):]
+    registros = registros[:5] + [','.join(['x'] * 30), quebrado] + registros[5:12]
+    csv = ('\n'.join([cabecalho] + registros) + '\n').encode('utf-8')
+    esperados = projetos[:5] + [None, projetos[0]] + projetos[5:12]
+    for tamanho_pedaco in (3, 50, len(csv)):
+        blocos = _ler_stream(csv, 'csv', tamanho_pedaco, 5)
+        assert [len(b) for b in blocos] == [5, 5, 4]
+        itens = [item for bloco in blocos for item in bloco]
+        for item, esperado in zip(itens, esperados):
+            if esperado is None:
+                assert isinstance(item, LinhaInvalida) and 'malformado' in item.mensagem
+            else:
+                assert {campo: item[campo] for campo in esperado} == esperado
+        assert itens[0]['completion'] == 0.77
+
+    # Endpoint: um resultado por linha do upload, erros no lugar e resumo no final
+    main, cliente = _api_de_teste()
+    if main is None:
+        print("   ⏭️  httpx não instalado (/predict-stream não testado)")
+        return
+    anterior, main.TAMANHO_BLOCO_STREAM = main.TAMANHO_BLOCO_STREAM, 4
+    try:
+        resposta = cliente.post('/predict-stream', content=ndjson, headers={'Content-Type': 'application/x-ndjson'})
+        linhas_resposta = [json.loads(linha) for linha in resposta.text.splitlines()]
+        resposta_csv = cliente.post('/predict-stream', content=csv, headers={'Content-Type': 'text/csv'})
+        linhas_csv = [json.loads(linha) for linha in resposta_csv.text.splitlines()]
+    finally:
+        main.TAMANHO_BLOCO_STREAM = anterior
+    assert resposta.status_code == 200 and resposta_csv.status_code == 200
+    assert linhas_resposta[-1] == {'resumo': {'total_projetos': 12, 'processados_com_sucesso': 10}}
+    assert [r['projeto_id'] for r in linhas_resposta[:-1]] == list(range(12))
+    assert 'erro' in linhas_resposta[3] and 'erro' in linhas_resposta[4]
+    validos = linhas_resposta[:3] + linhas_resposta[5:-1]
+    assert [r['probabilidade_sucesso'] for r in validos] == [
+        r['probabilidade_sucesso'] for r in preditor.prever_lote(projetos[:10])]
+    assert linhas_csv[-1]['resumo'] == {'total_projetos': 14, 'processados_com_sucesso': 13}
+    assert 'malformado' in linhas_csv[5]['erro']
+    print(f"   ✅ NDJSON e CSV em pedaços de 1 a {len(csv)} bytes, linhas inválidas isoladas")
+
+
+def _chamar_stream(main, mensagens):
+    """Chama o /predict-stream direto pelo ASGI; depois das mensagens dadas, o cliente desconecta"""
+    import asyncio
+    pendentes = list(mensagens)
+    enviados = []
+
+    async def receive():
+        if pendentes:
+            return pendentes.pop(0)
+        return {'type': 'http.disconnect'}
+
+    async def send(mensagem):
+        enviados.append(mensagem)
+
+    scope = {'type': 'http', 'asgi': {'version': '3.0', 'spec_version': '2.3'}, 'http_version': '1.1',
+             'method': 'POST', 'scheme': 'http', 'path': '/predict-stream', 'raw_path': b'/predict-stream',
+             'query_string': b'', 'root_path': '', 'headers': [(b'content-type', b'application/x-ndjson')],
+             'server': ('teste', 80), 'client': ('teste', 1234)}
+    asyncio.run(main.app(scope, receive, send))
+    corpo = b''.join(m.get('body', b'') for m in enviados if m['type'] == 'http.response.body')
+    return enviados[0]['status'], [json.loads(linha) for linha in corpo.decode('utf-8').splitlines()]
+
+
+def test_stream_fila_e_desconexao():
+    """Stream espera vaga na fila com prazo, recusa com a fila cheia e para quando o cliente desconecta"""
+    print("\n🛑 Testando fila e desconexão no /predict-stream...")
+    import asyncio
+    import threading
+    from api.executor import ExecutorPredicoes, FilaCheia
+
+    # Espera por vaga: o prazo vence com a fila cheia, e a tarefa roda assim que a vaga abre
+    executor = ExecutorPredicoes(max_workers=1, fila_maxima=1)
+    liberar = threading.Event()
+
+    async def cenario():
+        ocupante = asyncio.ensure_future(executor.executar(liberar.wait, 10))
+        await asyncio.sleep(0.05)
+        try:
+            await executor.executar(sum, [1], espera=0.05)
+            raise AssertionError("Tarefa aceita com a fila cheia")
+        except FilaCheia:
+            pass
+        aguardando = asyncio.ensure_future(executor.executar(sum, [1, 2], espera=10))
+        await asyncio.sleep(0.05)
+        assert executor.metricas()['aguardando_vaga'] == 1 and not aguardando.done()
+        liberar.set()
+        assert await aguardando == 3 and await ocupante is True
+
+    try:
+        asyncio.run(cenario())
+    finally:
+        liberar.set()
+        executor.encerrar()
+    assert executor.rejeitadas == 1 and executor.executadas == 2
+
+    main, _ = _api_de_teste()
+    if main is None:
+        print("   ⏭️  httpx não instalado (endpoint não testado)")
+        return
+    ndjson = [(json.dumps(p) + '\n').encode('utf-8') for p in projetos_do_csv()[:20]]
+    pontuados = []
+    original, tamanho_bloco = main._pontuar_registros, main.TAMANHO_BLOCO_STREAM
+
+    def contar(atual, registros):
+        pontuados.append(len(registros))
+        return original(atual, registros)
+
+    main._pontuar_registros, main.TAMANHO_BLOCO_STREAM = contar, 4
+    try:
+        # Desconexão durante o envio: só os blocos já recebidos são pontuados
+        status, linhas = _chamar_stream(main, [{'type': 'http.request', 'body': b''.join(ndjson[:8]),
+                                                'more_body': True}])
+        assert status == 200 and pontuados == [4, 4] and len(linhas) == 8 and 'resumo' not in linhas[-1]
+
+        # Corpo inteiro recebido e cliente desconectado: nenhum bloco a mais é pontuado
+        pontuados.clear()
+        status, linhas = _chamar_stream(main, [{'type': 'http.request', 'body': b''.join(ndjson)}])
+        assert status == 200 and pontuados == [] and linhas == []
+
+        # Fila já cheia: 503 antes de ler o upload
+        cheio = ExecutorPredicoes(max_workers=1, fila_maxima=0)
+        anterior, main.executor = main.executor, cheio
+        try:
+            status, _ = _chamar_stream(main, [{'type': 'http.request', 'body': b''.join(ndjson)}])
+        finally:
+            main.executor = anterior
+            cheio.encerrar()
+        assert status == 503 and pontuados == []
+    finally:
+        main._pontuar_registros, main.TAMANHO_BLOCO_STREAM = original, tamanho_bloco
+    print("   ✅ Espera com prazo, 503 com a fila cheia e upload abandonado não pontuado")
+
+
+def test_colunas_igual_lote():
+    """Tabela Arrow -> validar_colunas -> prever_colunas dá as probabilidades de prever_lote"""
+    print("\n🏹 Testando predição colunar (Arrow)...")
+    if colunar.pa is None:
+        print("   ⏭️  pyarrow não instalado")
+        return
+
+    projetos = projetos_do_csv()
+    df = pd.DataFrame(projetos)
+    df.loc[0, 'project_cost'] = -1.0
+    df.loc[1, 'end_date'] = df.loc[1, 'start_date']
+    df.loc[2, 'month'] = None
+    tabela = colunar.pa.Table.from_pandas(df, preserve_index=False)
+    corpo = colunar.pa.BufferOutputStream()
+    with colunar.pa.ipc.new_stream(corpo, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+
+    erros, colunas = validar_colunas(colunar.colunas_da_tabela(colunar.ler_tabela(corpo.getvalue(), 'arrow')))
+    assert erros[0] == ERRO_CUSTO and erros[1] == ERRO_PERIODO and not erros[2:].any()
+    assert colunas['month'][2] == projetos[2]['month']  # Mês da data de início
+
+    validos = erros == 0
+    previsoes = preditor.prever_colunas(filtrar(colunas, validos))
+    esperados = preditor.prever_lote([p for p, ok in zip(projetos, validos) if ok])
+    assert np.array_equal(previsoes['probabilidade_sucesso'], [r['probabilidade_sucesso'] for r in esperados])
+    assert np.array_equal(previsoes['sucesso'], [r['sucesso'] for r in esperados])
+    assert np.allclose(previsoes['roi_esperado'], [r['roi_esperado'] for r in esperados])
+
+    resposta = colunar.pa.ipc.open_stream(colunar.serializar_resultados(erros, validos, previsoes, {})).read_all()
+    assert resposta.num_rows == len(projetos) and resposta.column('sucesso').null_count == 2
+    print(f"   ✅ {int(validos.sum())} projetos idênticos, 2 rejeitados pelo bitmap")
+
+
+def test_validacao_colunar():
+    """Bitmap de erros por projeto e predição pelas colunas já validadas"""
+    print("\n🧮 Testando validação colunar do lote...")
+    projetos = projetos_do_csv()
+    base = projetos[0]
+    registros = projetos + [
+        dict(base, project_cost=0),
+        dict(base, region='Marte'),
+        dict(base, month=13, end_date=base['start_date']),
+        dict(base, start_date='01/03/2024'),
+        dict(base, project_benefit='muito'),
+        {campo: valor for campo, valor in base.items() if campo != 'phase'},
+        'não é um projeto'
+    ]
+    esperados = [ERRO_CUSTO, ERRO_CATEGORIA, ERRO_PERIODO | ERRO_MES, ERRO_DATA,
+                 ERRO_CAMPO_AUSENTE | ERRO_TIPO, ERRO_CAMPO_AUSENTE, ERRO_CAMPO_AUSENTE | ERRO_TIPO | ERRO_DATA]
+
+    colunas, erros = colunas_dos_registros(registros)
+    erros_colunas, colunas = validar_colunas(colunas, preditor.categorias_conhecidas())
+    erros |= erros_colunas
+    assert not erros[:len(projetos)].any()
+    assert erros[len(projetos):].tolist() == esperados
+
+    validos = erros == 0
+    assert preditor.prever_lote(projetos, filtrar(colunas, validos)) == preditor.prever_lote(projetos)
+
+    # Números em texto são convertidos como o Pydantic fazia; só o que não converte é erro
+    como_texto = dict(base, project_cost=str(base['project_cost']), project_benefit=f" {base['project_benefit']} ",
+                      year=str(base['year']), month=str(base['month']), completion='0')
+    colunas, erros = colunas_dos_registros([como_texto, dict(base, year='2021a'), dict(base, completion='nan')])
+    assert erros.tolist() == [0, ERRO_TIPO, ERRO_TIPO]
+    erros_colunas, colunas = validar_colunas(colunas, preditor.categorias_conhecidas())
+    assert erros_colunas[0] == 0
+    assert preditor.prever_lote([como_texto], filtrar(colunas, erros == 0)) == preditor.prever_lote([base])
+
+    # year/month inteiros, como no ProjetoDados: 2021.0 passa, 2021.5 não
+    _, erros = colunas_dos_registros([dict(base, year=2021.0, month=3.0), dict(base, year=2021.5),
+                                      dict(base, month='2.5')])
+    assert erros.tolist() == [0, ERRO_TIPO, ERRO_TIPO]
+
+    # O /predict recusa categorias desconhecidas como o lote, em vez de usar a classe padrão
+    _, cliente = _api_de_teste()
+    if cliente is not None:
+        resposta = cliente.post('/predict', json=dict(base, region='Marte'))
+        assert resposta.status_code == 400 and "region='Marte'" in resposta.json()['detail']
+        assert cliente.post('/predict', json=base).status_code == 200
+    print(f"   ✅ {len(esperados)} projetos inválidos marcados, {len(projetos)} idênticos ao prever_lote")
+
+
+def test_respostas_compactas():
+    """O preditor devolve códigos; a resposta completa traz os textos do catálogo e a compacta, os códigos"""
+    print("\n📨 Testando catálogo de recomendações e respostas compactas...")
+
+    resultados = preditor.prever_lote(projetos_do_csv())
+    catalogo = set(map(id, CATALOGO_RECOMENDACOES.values()))
+    for resultado in resultados:
+        assert all(codigo in CATALOGO_RECOMENDACOES for codigo in resultado['recomendacoes'])
+        detalhado = respostas.detalhar(resultado)
+        assert all(id(mensagem) in catalogo for mensagem in detalhado['recomendacoes'])
+        assert detalhado['recomendacoes'] == mensagens(resultado['recomendacoes'])
+        compacto = respostas.compactar(resultado)
+        assert set(compacto) == {'sucesso', 'probabilidade_sucesso', 'roi_esperado', 'recomendacoes'}
+        assert compacto['recomendacoes'] == resultado['recomendacoes']
+
+    assert json.loads(respostas.codificar(resultados)) == resultados
+
+    # NaN e infinitos viram null com ou sem orjson
+    nao_finitos = {'roi_esperado': float('nan'), 'valores': [float('inf'), -float('inf'), 1.5]}
+    esperado = {'roi_esperado': None, 'valores': [None, None, 1.5]}
+    rapido = respostas.orjson
+    try:
+        respostas.orjson = None
+        assert json.loads(respostas.codificar(nao_finitos)) == esperado
+    finally:
+        respostas.orjson = rapido
+    assert json.loads(respostas.codificar(nao_finitos)) == esperado
+
+    _, cliente = _api_de_teste()
+    if cliente is not None:
+        projeto = projetos_do_csv()[0]
+        completo = cliente.post('/predict', json=projeto).json()
+        compacto = cliente.post('/predict', params={'compacto': 'true'}, json=projeto).json()
+        assert completo['recomendacoes'] == mensagens(compacto['recomendacoes'])
+        # O schema documenta o corpo de verdade (a resposta já sai codificada)
+        resposta_200 = cliente.get('/openapi.json').json()['paths']['/predict']['post']['responses']['200']
+        assert set(resposta_200['content']) == {'application/json', 'application/msgpack'}
+        assert resposta_200['content']['application/json']['schema']['$ref'].endswith('/ResultadoPredicao')
+    assert respostas.formato_aceito(None) == 'json'
+    assert respostas.formato_aceito('text/html, application/msgpack;q=0.9') == (
+        'msgpack' if respostas.msgpack is not None else 'json')
+    print(f"   ✅ {len(resultados)} resultados com mensagens do catálogo ({len(CATALOGO_RECOMENDACOES)} códigos)")
+
+
+def test_motor_recomendacoes():
+    """Regras vetorizadas (máscaras) dão as mesmas mensagens que a avaliação por projeto"""
+    print("\n🧭 Testando motor de recomendações...")
+    projetos = projetos_do_csv()
+    X, _ = preditor.preparar_lote(projetos)
+    rng = np.random.default_rng(0)
+    # Razões e durações nos limites das regras, probabilidades em toda a faixa
+    linhas = rng.integers(0, len(X), size=2_000)
+    X = X[linhas]
+    X[:, preditor.feature_names.index('Benefit_Cost_Ratio')] = rng.choice([0.5, 1.0, 1.5, 1.6, 3.0, 5.0, 6.0], size=len(X))
+    X[:, preditor.feature_names.index('Duracao_Dias')] = rng.choice([10, 29, 30, 200, 365, 366], size=len(X))
+    probabilidades = rng.choice([0.1, 0.3, preditor.threshold, 0.5, 0.7, 0.9], size=len(X))
+
+    motor = preditor.motor_recomendacoes
+    categorias = motor.categorias_lote([dict(p, complexity=c) for p, c in zip(
+        [projetos[i] for i in linhas], rng.choice(['High', 'low', 'Medium', 'Alta'], size=len(X)))])
+    lote = motor.recomendacoes_lote(X, probabilidades, preditor.threshold, categorias)
+    assert lote == [motor.recomendacoes(X[i], probabilidades[i], preditor.threshold, categorias[i])
+                    for i in range(len(X))]
+    assert len({tuple(r) for r in lote}) > 50
+
+    # Sem a feature de duração, o grupo correspondente é ignorado; as categóricas
+    # vêm da entrada e não dependem das features
+    sem_duracao = [nome for nome in preditor.feature_names if nome != 'Duracao_Dias']
+    motor = MotorRecomendacoes(sem_duracao)
+    assert 'Duracao_Dias' not in [grandeza for grandeza, _ in motor.grupos]
+    assert 'Complexity' in [grandeza for grandeza, _ in motor.grupos]
+    print(f"   ✅ {len(X)} projetos, {len({tuple(r) for r in lote})} combinações de recomendações")
+
+
+def test_recomendacoes_categoricas():
+    """Regras de complexidade e tipo leem o valor informado, não a classe padrão do encoder"""
+    print("\n🏷️  Testando recomendações categóricas...")
+    projeto = projetos_do_csv()[0]
+    alta, baixa = 'COMPLEXIDADE_ALTA', 'COMPLEXIDADE_BAIXA'
+    tipos = {'TIPO_RECEITA', 'TIPO_PROCESSO'}
+
+    variantes = {
+        'HIGH': dict(projeto, complexity='HIGH'),
+        'low': dict(projeto, complexity='low'),
+        'desconhecida': dict(projeto, complexity='Altíssima'),
+        'tipo desconhecido': dict(projeto, project_type='income generation')
+    }
+    resultados = {nome: preditor.prever(dados)['recomendacoes'] for nome, dados in variantes.items()}
+
+    # Como no código original: complexidade sem diferenciar maiúsculas...
+    assert alta in resultados['HIGH'] and baixa not in resultados['HIGH']
+    assert baixa in resultados['low'] and alta not in resultados['low']
+    # ...valor desconhecido não gera recomendação de complexidade...
+    assert alta not in resultados['desconhecida'] and baixa not in resultados['desconhecida']
+    # ...e o tipo de projeto é comparado exatamente
+    assert not tipos & set(resultados['tipo desconhecido'])
+
+    # O caminho vetorizado segue as mesmas regras
+    lote = preditor.prever_lote(list(variantes.values()))
+    assert [r['recomendacoes'] for r in lote] == list(resultados.values())
+    print(f"   ✅ {len(variantes)} variantes com recomendações do valor informado")
+
+
+if __name__ == "__main__":
+    print("🚀 TESTE DO PREDITOR")
+    print("=" * 50)
+    test_linha_igual_dataframe()
+    test_tabelas_categoricas()
+    test_lote_igual_individual()
+    test_lote_erros_por_projeto()
+    test_agrupador()
+    test_fila_cheia()
+    test_floresta_compartilhada()
+    test_bundle()
+    test_recarga_modelo()
+    test_cache()
+    test_rotulos()
+    test_dados_em_blocos()
+    test_sketch_quantil()
+    test_cache_dados_limpos()
+    test_tarefas_paralelas()
+    test_grupos_com_timeout()
+    test_combinar_dobras()
+    test_curva_threshold()
+    test_busca_hiperparametros()
+    test_atualizacao_incremental()
+    test_pipeline_features()
+    test_stream_blocos()
+    test_stream_fila_e_desconexao()
+    test_colunas_igual_lote()
+    test_validacao_colunar()
+    test_respostas_compactas()
+    test_motor_recomendacoes()
+    test_recomendacoes_categoricas()
+    print("\n✅ Todos os testes passaram!")